@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import olah_data
+
+# ==== Kubus Metrik Entitas x Bulan ====
+METRIK = ["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]
+
+
+@dataclass(frozen=True)
+class Kubus:
+    """
+    Kubus padat entitas (mis. SPKLU atau Wilayah) x bulan x metrik.
+    `nilai[e, m, k]` = jumlah metrik k untuk entitas e pada bulan m,
+    `baris[e, m]` = banyak baris sumber di sel itu (untuk membedakan 0 dan "tidak ada data").
+    `kumulatif` / `baris_kumulatif` adalah prefix-sum sepanjang sumbu bulan dengan satu kolom nol
+    di depan, sehingga total rentang bulan [i, j] = kumulatif[:, j+1] - kumulatif[:, i].
+    `posisi` = label "Bulan Tahun" -> posisi pada sumbu bulan, untuk query rentang tanpa memindai periode.
+    """
+    kolom: str
+    entitas: pd.Index
+    periode: pd.DataFrame
+    nilai: np.ndarray
+    baris: np.ndarray
+    kumulatif: np.ndarray
+    baris_kumulatif: np.ndarray
+    dtypes: pd.Series
+    posisi: dict
+
+
+def bangun_kubus(df, kolom="Nama SPKLU"):
+    """
+    Bangun kubus dari frame yang sudah dinormalisasi (lihat olah_data.normalisasi_periode).
+    Cukup satu kali per versi data; semua ranking, KPI dan tren cukup mengiris kubus ini.
+    """
+    periode = olah_data.daftar_periode(df)
+    entitas = pd.Categorical(df[kolom])
+    kode_e = entitas.codes
+    kode_m = df["Bulan & Tahun"].cat.codes.to_numpy()
+    valid = (kode_e >= 0) & (kode_m >= 0)
+
+    n_e, n_m = len(entitas.categories), len(periode)
+    sel = kode_e[valid].astype(np.int64) * n_m + kode_m[valid]
+    angka = np.nan_to_num(df.loc[valid, METRIK].to_numpy(dtype=float))
+
+    nilai = np.stack(
+        [np.bincount(sel, weights=angka[:, k], minlength=n_e * n_m) for k in range(len(METRIK))],
+        axis=-1,
+    ).reshape(n_e, n_m, len(METRIK))
+    baris = np.bincount(sel, minlength=n_e * n_m).reshape(n_e, n_m)
+
+    # Prefix-sum per entitas sepanjang bulan (kolom nol di depan)
+    kumulatif = np.zeros((n_e, n_m + 1, len(METRIK)))
+    np.cumsum(nilai, axis=1, out=kumulatif[:, 1:])
+    baris_kumulatif = np.zeros((n_e, n_m + 1), dtype=np.int64)
+    np.cumsum(baris, axis=1, out=baris_kumulatif[:, 1:])
+
+    for arr in (nilai, baris, kumulatif, baris_kumulatif):
+        arr.setflags(write=False)
+    return Kubus(
+        kolom, pd.Index(entitas.categories, name=kolom), periode,
+        nilai, baris, kumulatif, baris_kumulatif, _tipe_total(df[METRIK].dtypes),
+        dict(zip(periode["Bulan & Tahun"], periode.index)),
+    )
+
+
+def _tipe_total(dtypes):
+    """Tipe hasil penjumlahan: integer -> int64, selain itu float64 (tipe sumber bisa sudah diturunkan)."""
+    return dtypes.map(lambda t: np.dtype(np.int64) if pd.api.types.is_integer_dtype(t) else np.dtype(np.float64))
+
+
+def _mask_bulan(kubus, bulan):
+    """Mask bulan dari satu label, daftar label, atau None (semua bulan)."""
+    if bulan is None or (isinstance(bulan, str) and bulan == "Semua"):
+        return slice(None)
+    label = [bulan] if isinstance(bulan, str) else list(bulan)
+    return kubus.periode["Bulan & Tahun"].isin(label).to_numpy()
+
+
+def _ke_frame(kubus, nilai, index):
+    df = pd.DataFrame(nilai, index=index, columns=METRIK)
+    return df.astype(kubus.dtypes)
+
+
+def total(kubus, bulan=None):
+    """
+    Total metrik per entitas untuk bulan terpilih (setara groupby(kolom).sum()).
+    Entitas tanpa baris data pada bulan itu tidak ikut, sama seperti groupby.
+    """
+    mask = _mask_bulan(kubus, bulan)
+    ada = kubus.baris[:, mask].sum(axis=1) > 0
+    nilai = kubus.nilai[:, mask].sum(axis=1)
+    return _ke_frame(kubus, nilai[ada], kubus.entitas[ada])
+
+
+def total_entitas(kubus, nama, bulan=None):
+    """Total metrik satu entitas (Series berindeks METRIK); 0 bila entitas tidak dikenal."""
+    if nama not in kubus.entitas:
+        return pd.Series(0.0, index=METRIK)
+    mask = _mask_bulan(kubus, bulan)
+    return pd.Series(kubus.nilai[kubus.entitas.get_loc(nama), mask].sum(axis=0), index=METRIK)
+
+
+def total_semua(kubus, bulan=None):
+    """Total metrik seluruh entitas (Series berindeks METRIK)."""
+    mask = _mask_bulan(kubus, bulan)
+    return pd.Series(kubus.nilai[:, mask].sum(axis=(0, 1)), index=METRIK)
+
+
+def tren(kubus, nama, hanya_ada=False):
+    """
+    Deret bulanan satu entitas, satu baris per bulan (bulan tanpa data bernilai 0).
+    Dengan `hanya_ada=True` hanya bulan yang punya data yang dikembalikan.
+    """
+    i = kubus.entitas.get_loc(nama)
+    df = kubus.periode[["key", "Bulan & Tahun"]].copy()
+    df[METRIK] = _ke_frame(kubus, kubus.nilai[i], df.index)
+    if hanya_ada:
+        df = df[kubus.baris[i] > 0]
+    return df
+
+
+# ==== Query Rentang Bulan (prefix-sum) ====
+def posisi_bulan(kubus, label):
+    """Posisi bulan `label` ("Bulan Tahun") pada sumbu bulan kubus (lookup dict, tanpa memindai periode)."""
+    return kubus.posisi[label]
+
+
+def _batas_rentang(kubus, awal, akhir):
+    i = 0 if awal is None else posisi_bulan(kubus, awal)
+    j = len(kubus.periode) - 1 if akhir is None else posisi_bulan(kubus, akhir)
+    return i, j + 1
+
+
+def total_rentang(kubus, awal=None, akhir=None):
+    """
+    Total metrik per entitas untuk bulan `awal` s.d. `akhir` (inklusif, label "Bulan Tahun"),
+    dihitung dari selisih dua kolom prefix-sum tanpa memindai bulan di antaranya.
+    Entitas tanpa baris data pada rentang itu tidak ikut, sama seperti groupby.
+    """
+    i, j = _batas_rentang(kubus, awal, akhir)
+    ada = kubus.baris_kumulatif[:, j] - kubus.baris_kumulatif[:, i] > 0
+    nilai = kubus.kumulatif[:, j] - kubus.kumulatif[:, i]
+    return _ke_frame(kubus, nilai[ada], kubus.entitas[ada])
+
+
+def total_entitas_rentang(kubus, nama, awal=None, akhir=None):
+    """Total metrik satu entitas untuk rentang bulan (Series berindeks METRIK), O(1)."""
+    if nama not in kubus.entitas:
+        return pd.Series(0.0, index=METRIK)
+    i, j = _batas_rentang(kubus, awal, akhir)
+    e = kubus.entitas.get_loc(nama)
+    return pd.Series(kubus.kumulatif[e, j] - kubus.kumulatif[e, i], index=METRIK)
+
+
+# ==== Ranking Top/Bottom-K ====
+def _pilih_k(nilai, k, atas=True):
+    """
+    Posisi K nilai terbesar (`atas`) atau terkecil, sudah urut dari peringkat 1.
+    Batas ke-K dicari dengan partisi O(n); hanya K calon yang diurutkan.
+    Nilai seri diputus oleh urutan asli, sama seperti nlargest/nsmallest(keep="first"); NaN diabaikan.
+    """
+    nilai = np.asarray(nilai, dtype=np.float64)
+    pos = np.flatnonzero(~np.isnan(nilai))
+    v = nilai[pos] if atas else -nilai[pos]
+    if k < len(v):
+        batas = np.partition(v, len(v) - k)[len(v) - k]
+        lebih = pos[v > batas]
+        sama = pos[v == batas][: k - len(lebih)]
+        pos = np.concatenate([lebih, sama])
+        v = nilai[pos] if atas else -nilai[pos]
+    return pos[np.lexsort((pos, -v))]
+
+
+def ranking(ringkasan, k=5, kolom=None):
+    """
+    Top-K dan bottom-K untuk setiap kolom metrik `ringkasan` (index = entitas) sekaligus.
+    `ringkasan` cukup hasil satu kali reduksi (mis. total() atau satu groupby().agg()).
+    Hasil: {kolom: {"atas": Series urut turun, "bawah": Series urut naik}}.
+    """
+    hasil = {}
+    for nama in kolom or ringkasan.columns:
+        s = ringkasan[nama]
+        hasil[nama] = {
+            "atas": s.iloc[_pilih_k(s.to_numpy(), k, atas=True)],
+            "bawah": s.iloc[_pilih_k(s.to_numpy(), k, atas=False)],
+        }
+    return hasil
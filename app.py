@@ -1,22 +1,30 @@
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
+import time
 import warnings
 import base64
-import folium
-import joblib
 import altair as alt
 import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import timedelta
 from plotly.subplots import make_subplots
-from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
+from streamlit_folium import st_folium
 from streamlit_option_menu import option_menu
 from statsmodels.tsa.arima.model import ARIMA
 from xgboost import XGBRegressor
 
+import agregasi
+import kecamatan
+import klaster
+import olah_data
+import peta
+import piramida
+import prediksi
+import registri_model
+import registri_spklu
+import sumber_data
+
 
 
 
@@ -30,6 +38,14 @@ st.set_page_config(
 st.set_page_config(layout="wide")
 warnings.filterwarnings("ignore")
 
+# ==== Hangatkan Cache Data ====
+# Ambil semua sheet (df2, df4, df5) sekaligus sebelum halaman pertama dirender
+sumber_data.hangatkan()
+# Model prediksi dimuat di thread latar, tanpa menahan render halaman
+registri_model.hangatkan()
+# Geometri kecamatan disederhanakan sekali saat aplikasi mulai, di thread latar
+kecamatan.hangatkan()
+
 # ==== Fungsi Konversi Gambar ke Base64 ====
 def get_base64_image(image_path):
     with open(image_path, "rb") as image_file:
@@ -81,6 +97,22 @@ with st.sidebar:
             }
         }
     )
+
+    # Tombol muat ulang: buang cache sheet lalu jalankan ulang halaman
+    if st.button("Muat Ulang Data", use_container_width=True):
+        try:
+            sumber_data.segarkan()
+            st.rerun()
+        except Exception as e:
+            st.warning(f"Gagal memuat ulang, memakai data terakhir: {e}")
+    terakhir = sumber_data.waktu_ambil("data2")
+    if terakhir:
+        st.caption(f"Data diambil {time.strftime('%d/%m/%Y %H:%M', time.localtime(terakhir))}")
+        with st.expander("Memori Data"):
+            for nama, memori in sumber_data.info_memori().items():
+                if memori:
+                    st.caption(f"{nama}: {memori[0] / 1024:,.0f} KB → {memori[1] / 1024:,.0f} KB")
+
     # Tambahkan copyright di bawah sidebar
     st.markdown(
         """
@@ -106,243 +138,294 @@ with st.sidebar:
     )
 
 # ==== Load Dataset ====
-url_data2 = "https://docs.google.com/spreadsheets/d/16cyvXwvucVb7EM1qiikZpbK8J8isbktuiw-MR1EJDEY/export?format=csv&gid=829004516"
-df2 = pd.read_csv(url_data2)
-df2.columns = df2.columns.str.strip()
+try:
+    df2 = sumber_data.muat_sheet("data2")
+except Exception as e:
+    st.error(f"Gagal memuat data: {e}")
+    st.stop()
+
+# ==== Agregasi Bersama ====
+# Kubus entitas x bulan x metrik dibangun sekali per versi data dan dibagi ke semua sesi;
+# ranking, KPI dan tren cukup mengiris kubus ini, tanpa groupby ulang atas df2.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def kubus_data(versi, _df, kolom="Nama SPKLU"):
+    return agregasi.bangun_kubus(_df, kolom)
+
+# Ramalan XGBoost sampai horizon maksimum, sekali per versi data & model; slider hanya memotong hasilnya
+@st.cache_resource(show_spinner=False, max_entries=4)
+def ramalan_data(versi, versi_model, _df5, _model_daily, _model_monthly):
+    return prediksi.ramalan(_df5, _model_daily, _model_monthly)
+
+# Ramalan semua SPKLU / ULP dalam satu batch, sekali per versi data, model & level entitas
+@st.cache_resource(show_spinner=False, max_entries=8)
+def ramalan_entitas_data(versi, versi_model, kolom, _df5, _model_daily, _model_monthly):
+    return prediksi.ramalan_entitas(_df5, _model_daily, _model_monthly, kolom)
+
+# Peta dasar (semua marker + popup, legenda warna kecamatan opsional) per periode & versi registri lokasi,
+# dibagi semua sesi
+@st.cache_resource(show_spinner=False, max_entries=32)
+def peta_data(versi, versi_lokasi, periode, warna, _df_map):
+    return peta.peta_dasar(_df_map, f"<em>Periode : {periode}</em>", warna=warna)
+
+# Lapisan choropleth kecamatan per periode, kolom warna dan level geometri (kecamatan.level_zoom)
+@st.cache_resource(show_spinner=False, max_entries=32)
+def lapisan_kecamatan_data(versi, versi_lokasi, periode, warna, level, _df_map):
+    return peta.lapisan_kecamatan(_df_map, warna, level)
+
+# Piramida grid titik (tiap baris df di lokasi SPKLU-nya) per versi data & registri lokasi,
+# dan peta kosong tempat sel grid ditampilkan
+@st.cache_resource(show_spinner=False, max_entries=8)
+def piramida_data(versi, versi_lokasi, kolom, _df):
+    return piramida.bangun(*registri_spklu.registri().koordinat(_df[kolom]))
+
+@st.cache_resource(show_spinner=False)
+def peta_sebaran_data():
+    return peta.peta_kosong()
+
+# Dimensi SPKLU (satu baris per SPKLU: Wilayah, kapasitas, kategori tertinggi) dan unit per kategori,
+# sekali per versi df4
+@st.cache_resource(show_spinner=False, max_entries=8)
+def charger_data(versi, _df4):
+    return olah_data.dimensi_spklu(_df4), olah_data.unit_kategori(_df4)
+
+# Klustering KMeans juga dibagi semua sesi, dikunci sidik fitur: fit ulang hanya bila data berubah
+@st.cache_resource(show_spinner=False, max_entries=16)
+def klaster_data(sidik, _X, _pendapatan, n_init=10):
+    return klaster.klaster(_X, _pendapatan, n_init=n_init)
+
+def klaster_level(df, fitur, n_init=10):
+    """Cluster & Level per baris df dari kolom `fitur` (hasil di-cache per sidik fitur)."""
+    X = df[fitur].fillna(0).to_numpy(dtype=float)
+    pendapatan = df["Total Pendapatan"].to_numpy(dtype=float)
+    return klaster_data(klaster.sidik_fitur(X, pendapatan, n_init=n_init), X, pendapatan, n_init=n_init)
 
 # ==== Halaman Berdasarkan Menu ====
 if selected == "Menu Utama":
     st.title("Dashboard Ringkasan SPKLU")
     st.write("Ringkasan Data Penjualan SPKLU se-Kota Bandung Raya")
 
-    # ==== Filter Bulan & Tahun ====
-    if 'Bulan & Tahun' in df2.columns:
-        # Mapping nama bulan Indonesia ke angka
-        bulan_map = {
-            "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
-            "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
-            "September": 9, "Oktober": 10, "November": 11, "Desember": 12
-        }
+    # Filter periode dan pilihan SPKLU berjalan sebagai fragment: mengganti salah satunya hanya
+    # menjalankan ulang bagian yang bergantung padanya, bukan seluruh halaman (data tidak dimuat ulang).
+    @st.fragment
+    def ringkasan_periode():
+        # ==== Filter Bulan & Tahun ====
+        if 'Bulan & Tahun' in df2.columns:
+            # Buat list opsi (kategori "Bulan & Tahun" sudah urut sesuai waktu sejak data dimuat)
+            bulan_tahun_list = df2['Bulan & Tahun'].cat.categories.tolist()
+            bulan_tahun_list.insert(0, "Semua")  # tambahkan opsi "Semua" di paling depan
+
+            # Selectbox dengan default "Semua"
+            selected_bulan_tahun = st.selectbox("Pilih Periode", bulan_tahun_list, index=0)
+
+            # Total per SPKLU untuk periode terpilih (irisan kubus)
+            kubus = kubus_data(df2.attrs.get("versi"), df2)
+            total_spklu = agregasi.total(kubus, selected_bulan_tahun)
+
+            # ==== Ringkasan Statistik ====
+            total_pendapatan = total_spklu['Total Pendapatan'].sum()
+            total_kwh = total_spklu['Jumlah KWH'].sum()
+            total_transaksi = total_spklu['Jumlah Transaksi'].sum()
+
+            # KPI Box
+            st.markdown("""
+                <style>
+                .metric-container {display: flex; justify-content: space-between; gap: 10px;}
+                .metric-box {flex: 1; border: 2px solid #F3FCFA; border-radius: 10px;
+                             padding: 20px; text-align: center; background-color: #FFFFFF;
+                             box-shadow: 2px 2px 8px rgba(0,0,0,0.05);}
+                .metric-box.wide {flex: 1.5;}
+                .metric-label {font-weight: bold; font-size: 18px; margin-bottom: 8px;}
+                .metric-value {font-size: 22px; color: #333;}
+                </style>
+            """, unsafe_allow_html=True)
 
-        # Pisahkan kolom Bulan & Tahun
-        df2[['Bulan', 'Tahun']] = df2['Bulan & Tahun'].str.split(" ", expand=True)
-        df2['Tahun'] = df2['Tahun'].astype(int)
-        df2['BulanNum'] = df2['Bulan'].map(bulan_map)
-
-        # Urutkan berdasarkan Tahun dan Bulan
-        df2 = df2.sort_values(by=['Tahun', 'BulanNum'])
-
-        # Buat list opsi (urut sesuai waktu)
-        bulan_tahun_list = df2['Bulan & Tahun'].unique().tolist()
-        bulan_tahun_list.insert(0, "Semua")  # tambahkan opsi "Semua" di paling depan
-
-        # Selectbox dengan default "Semua"
-        selected_bulan_tahun = st.selectbox("Pilih Periode", bulan_tahun_list, index=0)
-
-        # Filter DataFrame sesuai pilihan
-        filtered_df = df2 if selected_bulan_tahun == "Semua" else df2[df2['Bulan & Tahun'] == selected_bulan_tahun]
-
-        # ==== Ringkasan Statistik ====
-        total_pendapatan = filtered_df['Total Pendapatan'].sum()
-        total_kwh = filtered_df['Jumlah KWH'].sum()
-        total_transaksi = filtered_df['Jumlah Transaksi'].sum()
-
-        # KPI Box
-        st.markdown("""
-            <style>
-            .metric-container {display: flex; justify-content: space-between; gap: 10px;}
-            .metric-box {flex: 1; border: 2px solid #F3FCFA; border-radius: 10px;
-                         padding: 20px; text-align: center; background-color: #FFFFFF;
-                         box-shadow: 2px 2px 8px rgba(0,0,0,0.05);}
-            .metric-box.wide {flex: 1.5;}
-            .metric-label {font-weight: bold; font-size: 18px; margin-bottom: 8px;}
-            .metric-value {font-size: 22px; color: #333;}
-            </style>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-box">
-                    <div class="metric-label">Total KWH Terjual</div>
-                    <div class="metric-value">{total_kwh:,.0f}</div>
-                </div>
-                <div class="metric-box wide">
-                    <div class="metric-label">Total Pendapatan</div>
-                    <div class="metric-value">Rp{total_pendapatan:,.0f}</div>
-                </div>
-                <div class="metric-box">
-                    <div class="metric-label">Jumlah Transaksi</div>
-                    <div class="metric-value">{total_transaksi:,.0f}</div>
+            st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-box">
+                        <div class="metric-label">Total KWH Terjual</div>
+                        <div class="metric-value">{total_kwh:,.0f}</div>
+                    </div>
+                    <div class="metric-box wide">
+                        <div class="metric-label">Total Pendapatan</div>
+                        <div class="metric-value">Rp{total_pendapatan:,.0f}</div>
+                    </div>
+                    <div class="metric-box">
+                        <div class="metric-label">Jumlah Transaksi</div>
+                        <div class="metric-value">{total_transaksi:,.0f}</div>
+                    </div>
                 </div>
-            </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
 
-    # ==== Ranking SPKLU ====
-    st.subheader("Ranking SPKLU")
+        # ==== Ranking SPKLU ====
+        st.subheader("Ranking SPKLU")
 
-    def plot_top5(df, kolom, judul, warna):
-        top5 = df.groupby("Nama SPKLU")[kolom].sum().nlargest(5).sort_values()
+        def plot_top5(peringkat, kolom, judul, warna):
+            top5 = peringkat[kolom]["atas"].iloc[::-1]  # kecil di bawah, besar di atas
     
-        fig, ax = plt.subplots(figsize=(8, 5), facecolor="none")  # transparan
-        ax.set_facecolor("none")  # mengikuti background Streamlit
+            fig, ax = plt.subplots(figsize=(8, 5), facecolor="none")  # transparan
+            ax.set_facecolor("none")  # mengikuti background Streamlit
     
-        # Buat bar horizontal dengan rounded edge
-        bars = ax.barh(
-            top5.index,
-            top5.values,
-            color=warna,
-            edgecolor="black",
-            height=0.6
-        )
+            # Buat bar horizontal dengan rounded edge
+            bars = ax.barh(
+                top5.index,
+                top5.values,
+                color=warna,
+                edgecolor="black",
+                height=0.6
+            )
     
-        # Percantik style
-        ax.set_title(judul, fontsize=14, weight="bold", pad=15)
-        ax.set_xlabel(kolom, fontsize=12)
-        ax.set_ylabel("")
-        ax.grid(axis="x", linestyle="--", alpha=0.5)
+            # Percantik style
+            ax.set_title(judul, fontsize=14, weight="bold", pad=15)
+            ax.set_xlabel(kolom, fontsize=12)
+            ax.set_ylabel("")
+            ax.grid(axis="x", linestyle="--", alpha=0.5)
     
-        # Hilangkan spines (garis tepi)
-        for spine in ["top", "right", "left"]:
-            ax.spines[spine].set_visible(False)
+            # Hilangkan spines (garis tepi)
+            for spine in ["top", "right", "left"]:
+                ax.spines[spine].set_visible(False)
     
-        # Tambahkan label nilai di ujung bar
-        for bar in bars:
-            ax.text(
-                bar.get_width() + (0.01 * max(top5.values)),
-                bar.get_y() + bar.get_height()/2,
-                f"{int(bar.get_width()):,}",
-                va="center",
-                fontsize=10,
-                fontweight="bold",
-                color="black"
-            )
-
-        st.pyplot(fig)
-        plt.close(fig)
-
-
-    tab1, tab2, tab3 = st.tabs(["Total KWH Terjual", "Total Pendapatan", "Jumlah Transaksi"])
-    with tab2:
-        plot_top5(filtered_df, "Total Pendapatan", "Top 5 SPKLU Bedasarkan Total Pendapatan", "#FA8072")
-    with tab1:
-        plot_top5(filtered_df, "Jumlah KWH", "Top 5 SPKLU Bedasarkan Jumlah KWH Terjual", "lightgreen")
-    with tab3:
-        plot_top5(filtered_df, "Jumlah Transaksi", "Top 5 SPKLU Bedasarkan Jumlah Transaksi Terbanyak", "#FFBD31")
+            # Tambahkan label nilai di ujung bar
+            for bar in bars:
+                ax.text(
+                    bar.get_width() + (0.01 * max(top5.values)),
+                    bar.get_y() + bar.get_height()/2,
+                    f"{int(bar.get_width()):,}",
+                    va="center",
+                    fontsize=10,
+                    fontweight="bold",
+                    color="black"
+                )
 
+            st.pyplot(fig)
+            plt.close(fig)
 
 
+        # Top-5 semua metrik sekaligus dari total per SPKLU
+        peringkat = agregasi.ranking(total_spklu, k=5)
 
+        tab1, tab2, tab3 = st.tabs(["Total KWH Terjual", "Total Pendapatan", "Jumlah Transaksi"])
+        with tab2:
+            plot_top5(peringkat, "Total Pendapatan", "Top 5 SPKLU Bedasarkan Total Pendapatan", "#FA8072")
+        with tab1:
+            plot_top5(peringkat, "Jumlah KWH", "Top 5 SPKLU Bedasarkan Jumlah KWH Terjual", "lightgreen")
+        with tab3:
+            plot_top5(peringkat, "Jumlah Transaksi", "Top 5 SPKLU Bedasarkan Jumlah Transaksi Terbanyak", "#FFBD31")
 
+        # Pilihan SPKLU & peta ikut periode terpilih
+        pilih_spklu(total_spklu, selected_bulan_tahun)
 
-    # ==== Dropdown Pilihan SPKLU ====
-    st.markdown("<br>", unsafe_allow_html=True)
-    spklu_list = ["Silahkan pilih SPKLU"] + sorted(df2['Nama SPKLU'].unique().tolist())
-    pilihan_spklu = st.selectbox("Pilih SPKLU yang ingin ditampilkan", spklu_list)
+    @st.fragment
+    def pilih_spklu(total_spklu, selected_bulan_tahun):
+        # ==== Dropdown Pilihan SPKLU ====
+        st.markdown("<br>", unsafe_allow_html=True)
+        spklu_list = ["Silahkan pilih SPKLU"] + sorted(df2['Nama SPKLU'].unique().tolist())
+        pilihan_spklu = st.selectbox("Pilih SPKLU yang ingin ditampilkan", spklu_list)
 
-    # ==== Summary semua SPKLU untuk map ====
-    summary_all = filtered_df.groupby('Nama SPKLU', as_index=False).agg({
-        'Jumlah Transaksi': 'sum',
-        'Jumlah KWH': 'sum',
-        'Total Pendapatan': 'sum'
-    }).rename(columns={'Jumlah KWH': 'Total kWh'})
+        # ==== Summary semua SPKLU untuk map ====
+        summary_all = total_spklu.rename_axis('Nama SPKLU').reset_index().rename(columns={'Jumlah KWH': 'Total kWh'})
+        registri = registri_spklu.registri()
+        id_pilihan = registri.cari_id(pilihan_spklu) if pilihan_spklu != "Silahkan pilih SPKLU" else -1
 
-    # ==== Jika pilih salah satu SPKLU -> tampilkan ringkasannya ====
-    if pilihan_spklu != "Silahkan pilih SPKLU":
-        df_filter_spklu = summary_all[summary_all['Nama SPKLU'] == pilihan_spklu]
-        if not df_filter_spklu.empty:
-            row = df_filter_spklu.iloc[0]
+        # ==== Jika pilih salah satu SPKLU -> tampilkan ringkasannya ====
+        if pilihan_spklu != "Silahkan pilih SPKLU":
+            df_filter_spklu = summary_all[summary_all['Nama SPKLU'] == pilihan_spklu]
+            if not df_filter_spklu.empty:
+                row = df_filter_spklu.iloc[0]
 
 
 
 
-            st.markdown(f"""
-                <div style="font-size:24px; font-weight:bold; text-align:center; margin-top:10px;">
-                    {row['Nama SPKLU']}<br>Bulan : {selected_bulan_tahun}
-                </div>
-                <div class="metric-container">
-                    <div class="metric-box">
-                        <div class="metric-label">Total KWH Terjual</div>
-                        <div class="metric-value">{row['Total kWh']:,.0f}</div>
-                    </div>
-                    <div class="metric-box wide">
-                        <div class="metric-label">Total Pendapatan</div>
-                        <div class="metric-value">Rp{row['Total Pendapatan']:,.0f}</div>
+                st.markdown(f"""
+                    <div style="font-size:24px; font-weight:bold; text-align:center; margin-top:10px;">
+                        {row['Nama SPKLU']}<br>Bulan : {selected_bulan_tahun}
                     </div>
-                    <div class="metric-box">
-                        <div class="metric-label">Jumlah Transaksi</div>
-                        <div class="metric-value">{int(row['Jumlah Transaksi']):,}</div>
+                    <div class="metric-container">
+                        <div class="metric-box">
+                            <div class="metric-label">Total KWH Terjual</div>
+                            <div class="metric-value">{row['Total kWh']:,.0f}</div>
+                        </div>
+                        <div class="metric-box wide">
+                            <div class="metric-label">Total Pendapatan</div>
+                            <div class="metric-value">Rp{row['Total Pendapatan']:,.0f}</div>
+                        </div>
+                        <div class="metric-box">
+                            <div class="metric-label">Jumlah Transaksi</div>
+                            <div class="metric-value">{int(row['Jumlah Transaksi']):,}</div>
+                        </div>
                     </div>
-                </div>
-            """, unsafe_allow_html=True)
-
-    # ==== Peta Lokasi ====
-    st.title("Peta Lokasi SPKLU di Bandung")
-
-    spklu_locations = [
-        ["SPKLU PLN UP3 BANDUNG", -6.948691, 107.612196],
-        ["SPKLU PLN ULP BANDUNG UTARA", -6.920962, 107.608129],
-        ["SPKLU PLN ULP BANDUNG BARAT", -6.933869, 107.57143],
-        ["SPKLU PLN ULP BANDUNG TIMUR", -6.899030, 107.641179],
-        ["SPKLU PLN ULP CIJAWURA", -6.898929, 107.641115],
-        ["SPKLU PLN ULP UJUNGBERUNG", -6.9038, 107.6657],
-        ["SPKLU PLN ULP KOPO", -6.954014, 107.640576],
-        ["SPKLU PLN TRANS STUDIO MALL BANDUNG", -6.9254, 107.6365],
-        ["SPKLU PLN UID JAWA BARAT", -6.919962, 107.60901],
-        ["SPKLU POLDA JABAR", -6.936625, 107.7033697],
-        ["SPKLU PLN ICON HUB (BRAGA HERITAGE)", -6.919935, 107.609868],
-        ["SPKLU PLN UIP JBT", -6.938285, 107.627942],
-        ["SPKLU (ARISTA POWER) BYD BANDUNG", -6.93866, 107.6759],
-        ["SPKLU PLN GEOWISATA INN", -6.91758, 107.57838],
-        ["SPKLU ONE STOP CHARGING STATION SURAPATI", -6.898765, 107.62127],
-        ["SPKLU REST AREA KM 147 A RUAS PADALARANG - CILEUNYI",-6.967293, 107.681425],
-        ["SPKLU PLN MALAGA RESTO",-6.88534, 107.61274],
-        ["SPKLU PLN ICON PLUS BANDUNG", -6.908399, 107.631291],
-        ["SPKLU PLN TENTH AVENUE BANDUNG", -6.946393, 107.640999],
-        ["SPKLU PLN HOTEL NEWTON",-6.914804, 107.629904],
-        ["SPKLU PLN RS ADVENT BANDUNG", -6.89213, 107.603044],
-        ["SPKLU PLN TRANSMART CIPADUNG", -6.92571, 107.711582],
-        ["SPKLU PLN HOTEL CEMERLANG", -6.912288, 107.597528],
-        ["SPKLU PLN Best Western Hotel Setiabudhi Bandung", -6.861139, 107.595205],
-        ["SPKLU BALAI KOTA BANDUNG", -6.9112913, 107.6085796],
-        ["SPKLU PLN PODOMORO PARK", -6.975489985714249, 107.63678321534289]
-    ]
-
-    df_lokasi = pd.DataFrame(spklu_locations, columns=["NAMA_SPKLU", "LAT", "LON"])
-    df_map = pd.merge(df_lokasi, summary_all, left_on="NAMA_SPKLU", right_on="Nama SPKLU", how="left")
-    df_map[['Jumlah Transaksi','Total kWh','Total Pendapatan']] = df_map[['Jumlah Transaksi','Total kWh','Total Pendapatan']].fillna(0)
-
-    m = folium.Map(location=[-6.92, 107.62], zoom_start=12)
-    marker_cluster = MarkerCluster().add_to(m)
-
-    for _, row in df_map.iterrows():
-        popup_html = f"""
-        <div style="font-family: Arial; font-size: 13px; line-height: 1.5">
-            <strong>{row['NAMA_SPKLU']}</strong><br>
-            <em>Periode : {selected_bulan_tahun}</em><br><br>
-            <table style="width: 250px">
-                <tr><td>🔁 Jumlah Transaksi:</td><td><strong>{int(row['Jumlah Transaksi']):,}</strong></td></tr>
-                <tr><td>⚡ Total kWh:</td><td><strong>{row['Total kWh']:,.0f}</strong></td></tr>
-                <tr><td>💰 Total Pendapatan:</td><td><strong>Rp {row['Total Pendapatan']:,.0f}</strong></td></tr>
-            </table>
-        </div>
-        """
-        # Samakan format nama
-        nama_row = str(row["NAMA_SPKLU"]).strip().lower()
-        nama_pilihan = str(pilihan_spklu).strip().lower()
-        # === bedakan warna marker ===
-        if pilihan_spklu != "Silahkan pilih SPKLU" and nama_row == nama_pilihan:
-            icon_color = "red"   # warna khusus SPKLU terpilih
+                """, unsafe_allow_html=True)
+
+            # SPKLU terdekat dari KD-tree koordinat registri
+            if id_pilihan in registri.lokasi.index:
+                titik = registri.lokasi.loc[id_pilihan]
+                jarak, id_dekat = registri.terdekat(titik["LAT"], titik["LON"], k=4)
+                dekat = [
+                    f"{registri.lokasi.at[i, 'NAMA_SPKLU']} ({j:.1f} km)"
+                    for j, i in zip(jarak, id_dekat) if i != id_pilihan
+                ][:3]
+                st.caption("SPKLU terdekat: " + ", ".join(dekat))
+
+        # ==== Peta Lokasi ====
+        st.title("Peta Lokasi SPKLU di Bandung")
+
+        # Koordinat dari registri lokasi; nama di sheet digabung lewat ID lokasi, ULP dari Wilayah df4
+        df4 = sumber_data.muat_sheet("data4")
+        dimensi_spklu, _ = charger_data(df4.attrs.get("versi"), df4)
+        df_map = peta.gabung_lokasi(registri, summary_all, kunci="Nama SPKLU", dimensi=dimensi_spklu)
+        keterangan = f"<em>Periode : {selected_bulan_tahun}</em>"
+        warna = st.radio("Warna Kecamatan", ["Tanpa Warna", "Total kWh", "Total Pendapatan"], horizontal=True)
+
+        # Peta dasar dari cache per periode; pilihan SPKLU dan level zoom hanya mengganti layer sorotan dan
+        # choropleth (feature_group_to_add), jadi dokumen peta tidak dibangun dan dikirim ulang
+        warna = None if warna == "Tanpa Warna" else warna
+        m = peta_data(df2.attrs.get("versi"), registri.versi, selected_bulan_tahun, warna, df_map)
+        lapisan = [peta.sorotan(df_map, id_pilihan, keterangan)]
+        if warna:
+            zoom = (st.session_state.get("peta_spklu") or {}).get("zoom") or peta.ZOOM
+            lapisan.insert(0, peta.salinan(lapisan_kecamatan_data(
+                df2.attrs.get("versi"), registri.versi, selected_bulan_tahun, warna, kecamatan.level_zoom(zoom), df_map
+            )))
+        st_folium(peta.salinan(m), feature_group_to_add=lapisan, returned_objects=["zoom"], width=1100, height=700,
+                  key="peta_spklu")
+
+        # Total per wilayah: kecamatan (penempatan cache) dan ULP (dimensi SPKLU) sudah ada di df_map, cukup groupby
+        with st.expander("Total per Kecamatan & ULP"):
+            for level in ["Kecamatan", "ULP"]:
+                total = kecamatan.total_wilayah(df_map, ["Total kWh", "Total Pendapatan", "Jumlah Transaksi"], level)
+                st.dataframe(total.sort_values("Total kWh", ascending=False))
+
+    ringkasan_periode()
+
+    # Titik transaksi/charger diklaster di server: peta hanya menerima sel grid yang tampak pada
+    # zoom dan batas peta saat ini, jadi ukuran kiriman tidak ikut membesar dengan banyak titik.
+    # Geser/zoom peta hanya menjalankan ulang fragment ini.
+    @st.fragment
+    def sebaran_titik():
+        st.title("Sebaran Transaksi & Charger")
+        sumber = st.radio("Titik", ["Transaksi", "Charger"], horizontal=True, key="sebaran_sumber")
+        if sumber == "Transaksi":
+            df_titik, kolom, satuan = sumber_data.muat_sheet("data5"), "NAMA_SPKLU", "transaksi"
+        else:
+            df_titik, kolom, satuan = sumber_data.muat_sheet("data4"), "Nama SPKLU", "charger"
+        pir = piramida_data(df_titik.attrs.get("versi"), registri_spklu.registri().versi, kolom, df_titik)
+
+        # Tampilan terakhir yang dikirim balik peta (kosong pada render pertama)
+        tampilan = st.session_state.get("peta_sebaran") or {}
+        batas = tampilan.get("bounds") or {}
+        sw, ne = batas.get("_southWest") or {}, batas.get("_northEast") or {}
+        if None in (sw.get("lat"), sw.get("lng"), ne.get("lat"), ne.get("lng")):
+            batas = None
         else:
-            icon_color = "green" # default warna hijau
+            batas = (sw["lat"], sw["lng"], ne["lat"], ne["lng"])
+        zoom, sel = piramida.sel_tampak(pir, tampilan.get("zoom") or peta.ZOOM, batas)
 
-        folium.Marker(
-            location=[row['LAT'], row['LON']],
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=row['NAMA_SPKLU'],
-            icon=folium.Icon(color=icon_color, icon="bolt", prefix="fa")
-        ).add_to(marker_cluster)
+        st_folium(
+            peta.salinan(peta_sebaran_data()), feature_group_to_add=peta.lapisan_grid(sel, satuan),
+            returned_objects=["zoom", "bounds"], width=1100, height=500, key="peta_sebaran",
+        )
+        st.caption(f"{len(sel):,} sel grid tampak (zoom {zoom}) dari {int(pir[zoom]['jumlah'].sum()):,} {satuan}.")
 
-    folium_static(m, width=1100, height=700)
+    sebaran_titik()
 
 
 
@@ -353,10 +436,13 @@ elif selected == "Analisis":
     st.title("Analisis Data SPKLU")
 
     # Load Data4 (kapasitas & kategori)
-    url_data4 = "https://docs.google.com/spreadsheets/d/16cyvXwvucVb7EM1qiikZpbK8J8isbktuiw-MR1EJDEY/export?format=csv&gid=1731077450"    
-    df4 = pd.read_csv(url_data4)
-    df4.columns = df4.columns.str.strip()
+    df4 = sumber_data.muat_sheet("data4")
 
+    # Kubus SPKLU x bulan (dibagi semua tab)
+    kubus = kubus_data(df2.attrs.get("versi"), df2)
+    total_spklu = agregasi.total(kubus)
+
+    # Tab lazy: hanya tab yang sedang dibuka yang dijalankan, tab lain dilewati sampai dipilih
     tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "Ranking SPKLU", 
         "Compare SPKLU", 
@@ -365,58 +451,61 @@ elif selected == "Analisis":
         "Level Spklu",
         "Tren Bulanan Unit SPKLU",
         "Ulik SPKLU Lebih Dalam"    
-    ])
+    ], on_change="rerun", key="tab_analisis")
 
     # ============================
     # Tab 1 - Ranking
     # ============================
     with tab1:
-        st.subheader("Ranking SPKLU")
+        if tab1.open:
+            st.subheader("Ranking SPKLU")
 
-        # Pilihan ranking: 5 teratas / 5 terbawah
-        pilihan_ranking = st.radio("Pilih Ranking", ["5 Teratas", "5 Terbawah"], horizontal=True)
+            # Pilihan ranking: 5 teratas / 5 terbawah
+            pilihan_ranking = st.radio("Pilih Ranking", ["5 Teratas", "5 Terbawah"], horizontal=True)
 
-        def plot_ranking(df, kolom, judul, warna, ranking, bg_color="#D9F9FF"):
-            grouped = df.groupby("Nama SPKLU")[kolom].sum()
-            if ranking == "5 Teratas":
-                data = grouped.nlargest(5).sort_values(ascending=True)  # kecil di bawah, besar di atas
-            else:
-                data = grouped.nsmallest(5).sort_values(ascending=False)  # kecil di atas, besar di bawah
+            # Top-5 & bottom-5 semua metrik dalam satu kali jalan
+            peringkat = agregasi.ranking(total_spklu, k=5)
+
+            def plot_ranking(peringkat, kolom, judul, warna, ranking, bg_color="#D9F9FF"):
+                if ranking == "5 Teratas":
+                    data = peringkat[kolom]["atas"].iloc[::-1]  # kecil di bawah, besar di atas
+                else:
+                    data = peringkat[kolom]["bawah"].iloc[::-1]  # kecil di atas, besar di bawah
         
-            fig, ax = plt.subplots(figsize=(8, 5))
+                fig, ax = plt.subplots(figsize=(8, 5))
         
-            # Atur warna background agar sesuai background utama
-            fig.patch.set_facecolor(bg_color)
-            ax.set_facecolor(bg_color)
+                # Atur warna background agar sesuai background utama
+                fig.patch.set_facecolor(bg_color)
+                ax.set_facecolor(bg_color)
         
-            # Plot barh
-            data.plot(kind="barh", color=warna, ax=ax)
+                # Plot barh
+                data.plot(kind="barh", color=warna, ax=ax)
         
-            # Tambahan styling
-            ax.set_xlabel("")   # Hapus keterangan bawah (xlabel)
-            ax.set_ylabel("")
+                # Tambahan styling
+                ax.set_xlabel("")   # Hapus keterangan bawah (xlabel)
+                ax.set_ylabel("")
         
-            # Judul ditaruh tengah atas
-            ax.set_title(kolom, fontsize=14, weight="bold", loc="center", pad=15)
+                # Judul ditaruh tengah atas
+                ax.set_title(kolom, fontsize=14, weight="bold", loc="center", pad=15)
         
-            ax.tick_params(axis="x", labelsize=10)
-            ax.tick_params(axis="y", labelsize=10)
-            ax.grid(axis="x", linestyle="--", alpha=0.5)
+                ax.tick_params(axis="x", labelsize=10)
+                ax.tick_params(axis="y", labelsize=10)
+                ax.grid(axis="x", linestyle="--", alpha=0.5)
         
-            # Hapus spines biar lebih clean
-            for spine in ["top", "right"]:
-                ax.spines[spine].set_visible(False)
+                # Hapus spines biar lebih clean
+                for spine in ["top", "right"]:
+                    ax.spines[spine].set_visible(False)
         
-            st.pyplot(fig)
+                st.pyplot(fig)
 
 
-        # Tampilkan grafik berdasarkan pilihan        
-        plot_ranking(df2, "Jumlah Transaksi", "SPKLU", "#FFBD31", pilihan_ranking) 
-        st.divider()  # garis pemisah
-        plot_ranking(df2, "Jumlah KWH", "SPKLU", "lightgreen", pilihan_ranking)
-        st.divider()  # garis pemisah
-        plot_ranking(df2, "Total Pendapatan", "SPKLU", "#FA8072", pilihan_ranking)
-        st.divider()  # garis pemisah
+            # Tampilkan grafik berdasarkan pilihan        
+            plot_ranking(peringkat, "Jumlah Transaksi", "SPKLU", "#FFBD31", pilihan_ranking) 
+            st.divider()  # garis pemisah
+            plot_ranking(peringkat, "Jumlah KWH", "SPKLU", "lightgreen", pilihan_ranking)
+            st.divider()  # garis pemisah
+            plot_ranking(peringkat, "Total Pendapatan", "SPKLU", "#FA8072", pilihan_ranking)
+            st.divider()  # garis pemisah
         
 
 
@@ -425,157 +514,146 @@ elif selected == "Analisis":
     # Tab 2 - Membandingkan SPKLU
     # ============================
     with tab2:
-      st.subheader("Perbandingan Antar SPKLU")
-
-      # Urutan bulan
-      bulan_urut = {
-          "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
-          "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
-          "September": 9, "Oktober": 10, "November": 11, "Desember": 12
-      }
-
-      # Pisahkan kolom "Bulan & Tahun"
-      df2["Bulan"] = df2["Bulan & Tahun"].str.split(" ").str[0]
-      df2["Tahun"] = df2["Bulan & Tahun"].str.split(" ").str[1].astype(int)
-
-      # Tambahkan kolom "key" untuk urutan (Tahun * 12 + Bulan)
-      df2["key"] = df2["Tahun"] * 12 + df2["Bulan"].map(bulan_urut)
-
-      # Ambil daftar unik & urut
-      opsi_bulan_tahun = (
-          df2.sort_values("key")[["Bulan", "Tahun"]]
-          .drop_duplicates()
-          .assign(label=lambda x: x["Bulan"] + " " + x["Tahun"].astype(str))
-          ["label"].tolist()
-      )
-
-      # Dropdown dari - ke
-      col1, col2 = st.columns(2)
-      with col1:
-          start_option = st.selectbox("Dari Bulan", opsi_bulan_tahun, index=0)
-      with col2:
-          end_option = st.selectbox("Sampai Bulan", opsi_bulan_tahun, index=len(opsi_bulan_tahun)-1)
-
-      # Ambil key start & end
-      key_start = df2.loc[df2["Bulan & Tahun"] == start_option, "key"].iloc[0]
-      key_end = df2.loc[df2["Bulan & Tahun"] == end_option, "key"].iloc[0]
-
-      # Filter rentang
-      if key_start <= key_end:
-          df_bulan = df2[(df2["key"] >= key_start) & (df2["key"] <= key_end)]
-      else:
-          st.warning("Bulan awal harus sebelum atau sama dengan bulan akhir!")
-          df_bulan = df2.copy()
-
-
-      # Pilih SPKLU untuk perbandingan (pakai data yang sudah difilter bulan)
-      spklu_list = df_bulan["Nama SPKLU"].dropna().unique()
-      col1, col2 = st.columns(2)
-      spklu_a = col1.selectbox("Pilih SPKLU A", spklu_list, index=0, key="spklu_a")
-      spklu_b = col2.selectbox(
-          "Pilih SPKLU B",
-          spklu_list,
-          index=min(1, len(spklu_list) - 1) if len(spklu_list) > 1 else 0,
-          key="spklu_b"
-      )
-
-      # Filter data per SPKLU (pakai data bulan)
-      data_a = df_bulan[df_bulan["Nama SPKLU"] == spklu_a]
-      data_b = df_bulan[df_bulan["Nama SPKLU"] == spklu_b]
-
-      # Ringkasan
-      summary_a = {
-          "Jumlah Transaksi": int(data_a["Jumlah Transaksi"].sum()),
-          "Total kWh": float(data_a["Jumlah KWH"].sum()),
-          "Pendapatan": float(data_a["Total Pendapatan"].sum())
-      }
-      summary_b = {
-          "Jumlah Transaksi": int(data_b["Jumlah Transaksi"].sum()),
-          "Total kWh": float(data_b["Jumlah KWH"].sum()),
-          "Pendapatan": float(data_b["Total Pendapatan"].sum())
-      }
-
-      # Warna dari donut chart
-      palette = px.colors.qualitative.Set2
-      warna_map = {spklu_a: palette[0], spklu_b: palette[1]}
+      if tab2.open:
+          st.subheader("Perbandingan Antar SPKLU")
+
+          # Blok perbandingan sebagai fragment: pilihan bulan/SPKLU hanya menjalankan ulang blok ini
+          @st.fragment
+          def banding_spklu(kubus):
+              # Daftar periode urut + key (Tahun * 12 + Bulan), sudah dihitung saat data dimuat
+              periode = olah_data.daftar_periode(df2)
+              opsi_bulan_tahun = periode["Bulan & Tahun"].tolist()
+              key_map = dict(zip(periode["Bulan & Tahun"], periode["key"]))
+
+              # Dropdown dari - ke
+              col1, col2 = st.columns(2)
+              with col1:
+                  start_option = st.selectbox("Dari Bulan", opsi_bulan_tahun, index=0)
+              with col2:
+                  end_option = st.selectbox("Sampai Bulan", opsi_bulan_tahun, index=len(opsi_bulan_tahun)-1)
+
+              # Ambil key start & end
+              key_start = key_map[start_option]
+              key_end = key_map[end_option]
+
+              # Filter rentang (awal/akhir None = semua bulan)
+              if key_start <= key_end:
+                  awal, akhir = start_option, end_option
+              else:
+                  st.warning("Bulan awal harus sebelum atau sama dengan bulan akhir!")
+                  awal, akhir = None, None
+
+
+              # Pilih SPKLU untuk perbandingan (hanya yang punya data pada rentang bulan)
+              spklu_list = agregasi.total_rentang(kubus, awal, akhir).index.tolist()
+              col1, col2 = st.columns(2)
+              spklu_a = col1.selectbox("Pilih SPKLU A", spklu_list, index=0, key="spklu_a")
+              spklu_b = col2.selectbox(
+                  "Pilih SPKLU B",
+                  spklu_list,
+                  index=min(1, len(spklu_list) - 1) if len(spklu_list) > 1 else 0,
+                  key="spklu_b"
+              )
+
+              # Total per SPKLU pada rentang bulan (selisih prefix-sum)
+              data_a = agregasi.total_entitas_rentang(kubus, spklu_a, awal, akhir)
+              data_b = agregasi.total_entitas_rentang(kubus, spklu_b, awal, akhir)
+
+              # Ringkasan
+              summary_a = {
+                  "Jumlah Transaksi": int(data_a["Jumlah Transaksi"]),
+                  "Total kWh": float(data_a["Jumlah KWH"]),
+                  "Pendapatan": float(data_a["Total Pendapatan"])
+              }
+              summary_b = {
+                  "Jumlah Transaksi": int(data_b["Jumlah Transaksi"]),
+                  "Total kWh": float(data_b["Jumlah KWH"]),
+                  "Pendapatan": float(data_b["Total Pendapatan"])
+              }
+
+              # Warna dari donut chart
+              palette = px.colors.qualitative.Set2
+              warna_map = {spklu_a: palette[0], spklu_b: palette[1]}
       
-      # Buat dataframe ringkasan
-      df_summary = pd.DataFrame([summary_a, summary_b], index=[spklu_a, spklu_b])
-
-      # Fungsi untuk warnai index sesuai SPKLU
-      def color_index(val):
-          color = warna_map.get(val, "black")
-          return f"color: {color}; font-weight:bold"
-
-      # Styling dataframe -> warnai index sesuai donut
-      styled_df = (
-          df_summary.style
-          .set_table_styles(
-              [
-                  {"selector": "th.col0", "props": [("background-color", "#f5f5f5"), ("font-weight", "bold")]},
-                  {"selector": "td", "props": [("padding", "8px")]},
-              ]
-          )
-          .apply(lambda x: [f"color: {warna_map.get(i, 'black')}; font-weight:bold" for i in x.index], 
-                 axis=0, subset=pd.IndexSlice[:, :])
-          .format("{:,.0f}")
-      )
-
-      st.subheader("Ringkasan Perbandingan")
-      st.dataframe(styled_df, use_container_width=True)
-
-      # Buat subplot 1 baris 3 kolom
-      fig = make_subplots(rows=1, cols=3, specs=[[{'type':'domain'}, {'type':'domain'}, {'type':'domain'}]])
-
-      # Donut Transaksi
-      fig.add_trace(go.Pie(
-          labels=[spklu_a, spklu_b],
-          values=[summary_a["Jumlah Transaksi"], summary_b["Jumlah Transaksi"]],
-          hole=0.6,
-          marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
-          textinfo='percent',
-          showlegend=True
-      ), 1, 1)
-
-      # Donut kWh
-      fig.add_trace(go.Pie(
-          labels=[spklu_a, spklu_b],
-          values=[summary_a["Total kWh"], summary_b["Total kWh"]],
-          hole=0.6,
-          marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
-          textinfo='percent',
-          showlegend=False
-      ), 1, 2)
-
-      # Donut Pendapatan
-      fig.add_trace(go.Pie(
-          labels=[spklu_a, spklu_b],
-          values=[summary_a["Pendapatan"], summary_b["Pendapatan"]],
-          hole=0.6,
-          marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
-          textinfo='percent',
-          showlegend=False
-      ), 1, 3)
-
-      # Tambahkan judul per chart + rapikan layout
-      fig.update_layout(
-          annotations=[
-              dict(text="Transaksi", x=0.11, y=0.5, font_size=14, showarrow=False),
-              dict(text="Total kWh", x=0.50, y=0.5, font_size=14, showarrow=False),
-              dict(text="Pendapatan", x=0.90, y=0.5, font_size=14, showarrow=False)
-          ], 
-          margin=dict(t=20, b=20),
-          legend=dict(
-              orientation="h",
-              yanchor="bottom",
-              y=-0.15,
-              xanchor="center",
-              x=0.5
-          ),
-          height=350
-      )
-
-      st.plotly_chart(fig, use_container_width=True)
+              # Buat dataframe ringkasan
+              df_summary = pd.DataFrame([summary_a, summary_b], index=[spklu_a, spklu_b])
+
+              # Fungsi untuk warnai index sesuai SPKLU
+              def color_index(val):
+                  color = warna_map.get(val, "black")
+                  return f"color: {color}; font-weight:bold"
+
+              # Styling dataframe -> warnai index sesuai donut
+              styled_df = (
+                  df_summary.style
+                  .set_table_styles(
+                      [
+                          {"selector": "th.col0", "props": [("background-color", "#f5f5f5"), ("font-weight", "bold")]},
+                          {"selector": "td", "props": [("padding", "8px")]},
+                      ]
+                  )
+                  .apply(lambda x: [f"color: {warna_map.get(i, 'black')}; font-weight:bold" for i in x.index], 
+                         axis=0, subset=pd.IndexSlice[:, :])
+                  .format("{:,.0f}")
+              )
+
+              st.subheader("Ringkasan Perbandingan")
+              st.dataframe(styled_df, use_container_width=True)
+
+              # Buat subplot 1 baris 3 kolom
+              fig = make_subplots(rows=1, cols=3, specs=[[{'type':'domain'}, {'type':'domain'}, {'type':'domain'}]])
+
+              # Donut Transaksi
+              fig.add_trace(go.Pie(
+                  labels=[spklu_a, spklu_b],
+                  values=[summary_a["Jumlah Transaksi"], summary_b["Jumlah Transaksi"]],
+                  hole=0.6,
+                  marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
+                  textinfo='percent',
+                  showlegend=True
+              ), 1, 1)
+
+              # Donut kWh
+              fig.add_trace(go.Pie(
+                  labels=[spklu_a, spklu_b],
+                  values=[summary_a["Total kWh"], summary_b["Total kWh"]],
+                  hole=0.6,
+                  marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
+                  textinfo='percent',
+                  showlegend=False
+              ), 1, 2)
+
+              # Donut Pendapatan
+              fig.add_trace(go.Pie(
+                  labels=[spklu_a, spklu_b],
+                  values=[summary_a["Pendapatan"], summary_b["Pendapatan"]],
+                  hole=0.6,
+                  marker=dict(colors=[warna_map[spklu_a], warna_map[spklu_b]]),
+                  textinfo='percent',
+                  showlegend=False
+              ), 1, 3)
+
+              # Tambahkan judul per chart + rapikan layout
+              fig.update_layout(
+                  annotations=[
+                      dict(text="Transaksi", x=0.11, y=0.5, font_size=14, showarrow=False),
+                      dict(text="Total kWh", x=0.50, y=0.5, font_size=14, showarrow=False),
+                      dict(text="Pendapatan", x=0.90, y=0.5, font_size=14, showarrow=False)
+                  ], 
+                  margin=dict(t=20, b=20),
+                  legend=dict(
+                      orientation="h",
+                      yanchor="bottom",
+                      y=-0.15,
+                      xanchor="center",
+                      x=0.5
+                  ),
+                  height=350
+              )
+
+              st.plotly_chart(fig, use_container_width=True)
+
+          banding_spklu(kubus)
 
 
 
@@ -583,745 +661,636 @@ elif selected == "Analisis":
     # Tab 3 - KPerbandingan ULP
     # ============================
     with tab3:
-        st.subheader("Perbandingan Antar ULP di Kota Bandung")
+        if tab3.open:
+            st.subheader("Perbandingan Antar ULP di Kota Bandung")
     
-        # --- Merge Data2 dan Data4 berdasarkan Nama SPKLU ---
-        df_wilayah = df2.merge(df4, on="Nama SPKLU", how="left")
+            # --- Wilayah per baris df2 dari dimensi SPKLU (kunci integer, satu baris per SPKLU) ---
+            # df4 berisi satu baris per charger, jadi merge langsung akan menggandakan baris & total ULP
+            dimensi_spklu, _ = charger_data(df4.attrs.get("versi"), df4)
+            df_wilayah = olah_data.gabung_dimensi(df2, dimensi_spklu, ["Wilayah"])
+            kubus_wilayah = kubus_data(f"{df2.attrs.get('versi')}-{df4.attrs.get('versi')}", df_wilayah, "Wilayah")
     
-        # Urutan bulan
-        bulan_urut = {
-            "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
-            "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
-            "September": 9, "Oktober": 10, "November": 11, "Desember": 12
-        }
+            # Blok perbandingan sebagai fragment: pilihan bulan/wilayah hanya menjalankan ulang blok ini
+            @st.fragment
+            def banding_wilayah(kubus_wilayah):
+                # Dropdown rentang bulan (periode & key ikut dari df2)
+                periode = olah_data.daftar_periode(df2)
+                opsi_bulan_tahun = periode["Bulan & Tahun"].tolist()
     
-        # Pisahkan Bulan & Tahun
-        df_wilayah["Bulan"] = df_wilayah["Bulan & Tahun"].str.split(" ").str[0]
-        df_wilayah["Tahun"] = df_wilayah["Bulan & Tahun"].str.split(" ").str[1].astype(int)
-        df_wilayah["key"] = df_wilayah["Tahun"] * 12 + df_wilayah["Bulan"].map(bulan_urut)
+                col1, col2 = st.columns(2)
+                start_option = col1.selectbox("Dari Bulan", opsi_bulan_tahun, index=0, key="wil_start")
+                end_option = col2.selectbox("Sampai Bulan", opsi_bulan_tahun, index=len(opsi_bulan_tahun)-1, key="wil_end")
     
-        # Dropdown rentang bulan
-        opsi_bulan_tahun = (
-            df_wilayah.sort_values("key")[["Bulan", "Tahun"]]
-            .drop_duplicates()
-            .assign(label=lambda x: x["Bulan"] + " " + x["Tahun"].astype(str))
-            ["label"].tolist()
-        )
-    
-        col1, col2 = st.columns(2)
-        start_option = col1.selectbox("Dari Bulan", opsi_bulan_tahun, index=0, key="wil_start")
-        end_option = col2.selectbox("Sampai Bulan", opsi_bulan_tahun, index=len(opsi_bulan_tahun)-1, key="wil_end")
+                # Ambil key dari label yang dipilih
+                key_map = dict(zip(periode["Bulan & Tahun"], periode["key"]))
+                key_start = key_map[start_option]
+                key_end = key_map[end_option]
     
-        # Ambil key dari label yang dipilih
-        key_map = (
-            df_wilayah.assign(label=lambda x: x["Bulan"] + " " + x["Tahun"].astype(str))
-            .drop_duplicates(subset=["label"])
-            .set_index("label")["key"]
-            .to_dict()
-        )
-        key_start = key_map[start_option]
-        key_end = key_map[end_option]
-    
-        if key_start <= key_end:
-            df_bulan = df_wilayah[(df_wilayah["key"] >= key_start) & (df_wilayah["key"] <= key_end)]
-        else:
-            st.warning("Bulan awal harus <= bulan akhir!")
-            df_bulan = df_wilayah.copy()
+                if key_start <= key_end:
+                    awal, akhir = start_option, end_option
+                else:
+                    st.warning("Bulan awal harus <= bulan akhir!")
+                    awal, akhir = None, None
     
-        # Dropdown pilih wilayah (ULP)
-        wilayah_list = df_bulan["Wilayah"].dropna().unique()
-        col1, col2 = st.columns(2)
-        wilayah_a = col1.selectbox("Pilih Wilayah A", wilayah_list, index=0, key="wilayah_a")
-        wilayah_b = col2.selectbox(
-            "Pilih Wilayah B",
-            wilayah_list,
-            index=min(1, len(wilayah_list)-1) if len(wilayah_list) > 1 else 0,
-            key="wilayah_b"
-        )
+                # Dropdown pilih wilayah (ULP)
+                wilayah_list = agregasi.total_rentang(kubus_wilayah, awal, akhir).index.tolist()
+                col1, col2 = st.columns(2)
+                wilayah_a = col1.selectbox("Pilih Wilayah A", wilayah_list, index=0, key="wilayah_a")
+                wilayah_b = col2.selectbox(
+                    "Pilih Wilayah B",
+                    wilayah_list,
+                    index=min(1, len(wilayah_list)-1) if len(wilayah_list) > 1 else 0,
+                    key="wilayah_b"
+                )
     
-        # Filter data per wilayah
-        data_a = df_bulan[df_bulan["Wilayah"] == wilayah_a]
-        data_b = df_bulan[df_bulan["Wilayah"] == wilayah_b]
+                # Total per wilayah pada rentang bulan (selisih prefix-sum)
+                data_a = agregasi.total_entitas_rentang(kubus_wilayah, wilayah_a, awal, akhir)
+                data_b = agregasi.total_entitas_rentang(kubus_wilayah, wilayah_b, awal, akhir)
     
-        # Ringkasan
-        summary_a = {
-            "Jumlah Transaksi": int(data_a["Jumlah Transaksi"].sum()),
-            "Total kWh": float(data_a["Jumlah KWH"].sum()),
-            "Pendapatan": float(data_a["Total Pendapatan"].sum())
-        }
-        summary_b = {
-            "Jumlah Transaksi": int(data_b["Jumlah Transaksi"].sum()),
-            "Total kWh": float(data_b["Jumlah KWH"].sum()),
-            "Pendapatan": float(data_b["Total Pendapatan"].sum())
-        }
+                # Ringkasan
+                summary_a = {
+                    "Jumlah Transaksi": int(data_a["Jumlah Transaksi"]),
+                    "Total kWh": float(data_a["Jumlah KWH"]),
+                    "Pendapatan": float(data_a["Total Pendapatan"])
+                }
+                summary_b = {
+                    "Jumlah Transaksi": int(data_b["Jumlah Transaksi"]),
+                    "Total kWh": float(data_b["Jumlah KWH"]),
+                    "Pendapatan": float(data_b["Total Pendapatan"])
+                }
     
-        # Warna konsisten (tabel & donut)
-        warna_map = {
-            wilayah_a: px.colors.qualitative.Set2[0],
-            wilayah_b: px.colors.qualitative.Set2[1]
-        }
+                # Warna konsisten (tabel & donut)
+                warna_map = {
+                    wilayah_a: px.colors.qualitative.Set2[0],
+                    wilayah_b: px.colors.qualitative.Set2[1]
+                }
     
-        # ===== Tabel ringkasan dengan index berwarna =====
-        # Buat DataFrame ringkasan
-        df_summary = pd.DataFrame(
-            [summary_a, summary_b],
-            index=[wilayah_a, wilayah_b]
-        )
+                # ===== Tabel ringkasan dengan index berwarna =====
+                # Buat DataFrame ringkasan
+                df_summary = pd.DataFrame(
+                    [summary_a, summary_b],
+                    index=[wilayah_a, wilayah_b]
+                )
         
-        # Fungsi untuk mewarnai index (baris) sesuai ULP
-        def color_index(idxs):
-            """
-            idxs : Index / Series
-            Kembalikan list style dengan panjang sama
-            """
-            return [
-                f"color: {warna_map.get(v, 'black')}; font-weight: bold"
-                for v in idxs
-            ]
+                # Fungsi untuk mewarnai index (baris) sesuai ULP
+                def color_index(idxs):
+                    """
+                    idxs : Index / Series
+                    Kembalikan list style dengan panjang sama
+                    """
+                    return [
+                        f"color: {warna_map.get(v, 'black')}; font-weight: bold"
+                        for v in idxs
+                    ]
         
-        # Styling DataFrame
-        styled_df = (
-            df_summary.style
-            .set_table_styles([
-                {"selector": "th.col_heading", "props": [("background-color", "#f5f5f5"), ("padding", "4px")]},
-                {"selector": "th.row_heading", "props": [("text-align", "left"), ("padding", "4px")]},
-                {"selector": "td", "props": [("padding", "4px")]}  # jarak lebih rapat
-            ])
-            .apply_index(color_index, axis=0)  # warnai baris sesuai ULP
-            .format("{:,.0f}")  # format angka dengan ribuan
-        )
+                # Styling DataFrame
+                styled_df = (
+                    df_summary.style
+                    .set_table_styles([
+                        {"selector": "th.col_heading", "props": [("background-color", "#f5f5f5"), ("padding", "4px")]},
+                        {"selector": "th.row_heading", "props": [("text-align", "left"), ("padding", "4px")]},
+                        {"selector": "td", "props": [("padding", "4px")]}  # jarak lebih rapat
+                    ])
+                    .apply_index(color_index, axis=0)  # warnai baris sesuai ULP
+                    .format("{:,.0f}")  # format angka dengan ribuan
+                )
         
-        # Tampilkan di Streamlit
-        st.subheader("Ringkasan Perbandingan ULP di Kota Bandung")
-        st.dataframe(styled_df, use_container_width=True)
+                # Tampilkan di Streamlit
+                st.subheader("Ringkasan Perbandingan ULP di Kota Bandung")
+                st.dataframe(styled_df, use_container_width=True)
                    
     
-        # ===== Donut chart (warna mengikuti tabel) =====
-        fig = make_subplots(rows=1, cols=3, specs=[[{'type':'domain'}, {'type':'domain'}, {'type':'domain'}]])
+                # ===== Donut chart (warna mengikuti tabel) =====
+                fig = make_subplots(rows=1, cols=3, specs=[[{'type':'domain'}, {'type':'domain'}, {'type':'domain'}]])
     
-        cols = [warna_map[wilayah_a], warna_map[wilayah_b]]
+                cols = [warna_map[wilayah_a], warna_map[wilayah_b]]
     
-        fig.add_trace(go.Pie(
-            labels=[wilayah_a, wilayah_b],
-            values=[summary_a["Jumlah Transaksi"], summary_b["Jumlah Transaksi"]],
-            hole=0.6,
-            marker=dict(colors=cols),
-            textinfo='percent',
-            showlegend=True
-        ), 1, 1)
+                fig.add_trace(go.Pie(
+                    labels=[wilayah_a, wilayah_b],
+                    values=[summary_a["Jumlah Transaksi"], summary_b["Jumlah Transaksi"]],
+                    hole=0.6,
+                    marker=dict(colors=cols),
+                    textinfo='percent',
+                    showlegend=True
+                ), 1, 1)
     
-        fig.add_trace(go.Pie(
-            labels=[wilayah_a, wilayah_b],
-            values=[summary_a["Total kWh"], summary_b["Total kWh"]],
-            hole=0.6,
-            marker=dict(colors=cols),
-            textinfo='percent',
-            showlegend=False
-        ), 1, 2)
+                fig.add_trace(go.Pie(
+                    labels=[wilayah_a, wilayah_b],
+                    values=[summary_a["Total kWh"], summary_b["Total kWh"]],
+                    hole=0.6,
+                    marker=dict(colors=cols),
+                    textinfo='percent',
+                    showlegend=False
+                ), 1, 2)
     
-        fig.add_trace(go.Pie(
-            labels=[wilayah_a, wilayah_b],
-            values=[summary_a["Pendapatan"], summary_b["Pendapatan"]],
-            hole=0.6,
-            marker=dict(colors=cols),
-            textinfo='percent',
-            showlegend=False
-        ), 1, 3)
+                fig.add_trace(go.Pie(
+                    labels=[wilayah_a, wilayah_b],
+                    values=[summary_a["Pendapatan"], summary_b["Pendapatan"]],
+                    hole=0.6,
+                    marker=dict(colors=cols),
+                    textinfo='percent',
+                    showlegend=False
+                ), 1, 3)
     
-        fig.update_layout(
-            annotations=[
-                dict(text="Transaksi", x=0.11, y=0.52, font_size=14, showarrow=False),
-                dict(text="Total kWh", x=0.50, y=0.52, font_size=14, showarrow=False),
-                dict(text="Pendapatan", x=0.90, y=0.52, font_size=14, showarrow=False)
-            ],
-            # Legend & margin dipadatkan (jarak diperkecil)
-            legend=dict(orientation="h", yanchor="top", y=-0.05, xanchor="center", x=0.5),
-            margin=dict(t=20, b=10, l=10, r=10),
-            height=360,
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            uniformtext_minsize=12, uniformtext_mode="hide"
-        )
+                fig.update_layout(
+                    annotations=[
+                        dict(text="Transaksi", x=0.11, y=0.52, font_size=14, showarrow=False),
+                        dict(text="Total kWh", x=0.50, y=0.52, font_size=14, showarrow=False),
+                        dict(text="Pendapatan", x=0.90, y=0.52, font_size=14, showarrow=False)
+                    ],
+                    # Legend & margin dipadatkan (jarak diperkecil)
+                    legend=dict(orientation="h", yanchor="top", y=-0.05, xanchor="center", x=0.5),
+                    margin=dict(t=20, b=10, l=10, r=10),
+                    height=360,
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    uniformtext_minsize=12, uniformtext_mode="hide"
+                )
     
-        st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True)
+
+            banding_wilayah(kubus_wilayah)
 
     # ============================
     # Tab 4 - Kapasitas & Kategori
     # ============================
     with tab4:
-        st.subheader("Kapasitas & Kategori SPKLU")
-        # --- Agregasi df2: transaksi per SPKLU ---
-        df2_agg = df2.groupby("Nama SPKLU")[["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]].sum().reset_index()
-
-        # --- Agregasi df4: kapasitas max, rata-rata, jumlah tipe, dan kategori tertinggi ---
-        # --- Cleaning kolom Kapasitas jadi numerik ---
-        df4["Kapasitas"] = pd.to_numeric(
-            df4["Kapasitas"]
-                .astype(str)
-                .str.replace("kW", "", regex=False)
-                .str.replace("KW", "", regex=False)
-                .str.replace(",", "", regex=False)
-                .str.extract(r"(\d+)")[0],  # ambil hanya angka
-            errors="coerce"
-        )
-        # Mapping ranking kategori
-        kategori_rank = {
-            "Ultra Fast Charging": 3,
-            "Fast Charging": 2,
-            "Medium Charging": 1,
-            "Slow Charging": 0
-        }
-        def pilih_kategori(x):
-            # Buang NaN
-            x = x.dropna()
-            if x.empty:
-                return "Unknown"
-
-            # Map rank hanya yg valid
-            ranks = x.map(kategori_rank).fillna(0)
-
-            # Ambil kategori dengan rank tertinggi
-            best_idx = ranks.idxmax()
-            return x.loc[best_idx]
-
-        df4_agg = df4.groupby("Nama SPKLU").agg({
-            # kapasitas: total + variasi
-            "Kapasitas": ["max", "mean", lambda x: x.nunique()],
-            # kategori: ambil tertinggi
-            "Kategori": pilih_kategori
-        }).reset_index()
-
-        # rename kolom multiindex
-        df4_agg.columns = ["Nama SPKLU", "Kapasitas_Max", "Kapasitas_Mean", "Jumlah_Tipe", "Kategori"]
-        df4_agg = df4_agg.dropna(subset=["Kapasitas_Max", "Kapasitas_Mean"])
-
-        # --- Gabungkan df2 + df4 ---
-        df_merged = pd.merge(df2_agg, df4_agg, on="Nama SPKLU", how="left")
-
-        # --- One-hot encoding kategori ---
-        df_encoded = pd.get_dummies(df_merged, columns=["Kategori"])
-
-        # --- Pilih fitur untuk clustering ---
-        features = [
-            "Jumlah Transaksi",
-            "Jumlah KWH",
-            "Total Pendapatan",
-            "Kapasitas_Max",
-            "Kapasitas_Mean",
-            "Jumlah_Tipe"
-        ] + [col for col in df_encoded.columns if "Kategori_" in col]
-
-        # --- Standardisasi ---
-        from sklearn.preprocessing import StandardScaler
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df_encoded[features].fillna(0))
-
-        # --- K-Means ---
-        from sklearn.cluster import KMeans
-        kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-        df_encoded["Cluster"] = kmeans.fit_predict(X_scaled)
-
-        # Mapping cluster berdasarkan rata-rata pendapatan
-        cluster_order = df_encoded.groupby("Cluster")["Total Pendapatan"].mean().sort_values().index
-        mapping = {cluster_order[0]: "Rendah", cluster_order[1]: "Sedang", cluster_order[2]: "Tinggi"}
-        df_encoded["Level"] = df_encoded["Cluster"].map(mapping)
-
-        # --- Output ---
-        # === Bagian Rekomendasi (kotak kotak per level) ===
-        rekomendasi = {
-            "Tinggi": "SPKLU ini ramai digunakan. Tambah unit charger, upgrade kapasitas, atau buka cabang di lokasi serupa.",
-            "Sedang": "SPKLU memiliki potensi. Dorong dengan promosi, kerjasama merchant, atau peningkatan fasilitas.",
-            "Rendah": "SPKLU relatif sepi. Evaluasi lokasi, cek teknis, atau strategi marketing. Jika tetap rendah, pertimbangkan relokasi."
-        }
+        if tab4.open:
+            st.subheader("Kapasitas & Kategori SPKLU")
+            # --- Agregasi df2: transaksi per SPKLU ---
+            df2_agg = total_spklu.reset_index()
+
+            # --- Agregasi df4: kapasitas max, rata-rata, jumlah tipe, dan kategori tertinggi ---
+            # Kapasitas (kW) & rank kategori sudah dinormalisasi saat data dimuat; ringkasan dibagi dengan tab 7
+            dimensi_spklu, unit_kategori = charger_data(df4.attrs.get("versi"), df4)
+            df4_agg = dimensi_spklu[["Nama SPKLU", "Kapasitas_Max", "Kapasitas_Mean", "Jumlah_Tipe", "Kategori"]]
+            df4_agg = df4_agg.dropna(subset=["Kapasitas_Max", "Kapasitas_Mean"])
+
+            # --- Gabungkan df2 + df4 ---
+            df_merged = pd.merge(df2_agg, df4_agg, on="Nama SPKLU", how="left")
+
+            # --- One-hot encoding kategori ---
+            df_encoded = pd.get_dummies(df_merged, columns=["Kategori"])
+
+            # --- Pilih fitur untuk clustering ---
+            features = [
+                "Jumlah Transaksi",
+                "Jumlah KWH",
+                "Total Pendapatan",
+                "Kapasitas_Max",
+                "Kapasitas_Mean",
+                "Jumlah_Tipe"
+            ] + [col for col in df_encoded.columns if "Kategori_" in col]
+
+            # --- Standardisasi + K-Means (level dipetakan dari rata-rata pendapatan per cluster) ---
+            hasil_klaster = klaster_level(df_encoded, features, n_init=10)
+            df_encoded["Cluster"] = hasil_klaster.label
+            df_encoded["Level"] = hasil_klaster.level
+
+            # --- Output ---
+            # === Bagian Rekomendasi (kotak kotak per level) ===
+            rekomendasi = {
+                "Tinggi": "SPKLU ini ramai digunakan. Tambah unit charger, upgrade kapasitas, atau buka cabang di lokasi serupa.",
+                "Sedang": "SPKLU memiliki potensi. Dorong dengan promosi, kerjasama merchant, atau peningkatan fasilitas.",
+                "Rendah": "SPKLU relatif sepi. Evaluasi lokasi, cek teknis, atau strategi marketing. Jika tetap rendah, pertimbangkan relokasi."
+            }
 
-        df_tinggi = df_encoded.query("Level == 'Tinggi'").sort_values("Total Pendapatan", ascending=False)
-        df_sedang = df_encoded.query("Level == 'Sedang'").sort_values("Total Pendapatan", ascending=False)
-        df_rendah = df_encoded.query("Level == 'Rendah'").sort_values("Total Pendapatan", ascending=False)
+            df_tinggi = df_encoded.query("Level == 'Tinggi'").sort_values("Total Pendapatan", ascending=False)
+            df_sedang = df_encoded.query("Level == 'Sedang'").sort_values("Total Pendapatan", ascending=False)
+            df_rendah = df_encoded.query("Level == 'Rendah'").sort_values("Total Pendapatan", ascending=False)
+
+            tinggi = df_tinggi["Nama SPKLU"].tolist()
+            sedang = df_sedang["Nama SPKLU"].tolist()
+            rendah = df_rendah["Nama SPKLU"].tolist()
+
+            col1, col2, col3 = st.columns(3)
+
+            def buat_kotak(judul, data):
+                with st.container():
+                    st.markdown(f"### {judul}")
+                    st.markdown(
+                        f"""
+                        <div style="border:1px solid #ddd; border-radius:10px; padding:10px;
+                                    max-height:200px; overflow-y:auto; background-color:#FFFFFF; margin-bottom:15px;">
+                            {"".join([f"<p style='margin:5px 0;'>{item}</p>" for item in data])}
+                        </div>
+                        <p style='font-weight:bold; margin-top:5px;'>
+                            Jumlah Unit: {len(data)}
+                        </p>
+                        """,
+                        unsafe_allow_html=True
+                    )
+
+            with col1:
+                buat_kotak("Tinggi", tinggi)
+
+            with col2:
+                buat_kotak("Sedang", sedang)
+
+            with col3:
+                buat_kotak("Rendah", rendah)
 
-        tinggi = df_tinggi["Nama SPKLU"].tolist()
-        sedang = df_sedang["Nama SPKLU"].tolist()
-        rendah = df_rendah["Nama SPKLU"].tolist()
+            import plotly.express as px
+            # --- Pilih SPKLU ---
+            spklu_list = df4["Nama SPKLU"].unique()
+            selected_spklu = st.selectbox("Pilih SPKLU", spklu_list)
+
+            # --- Filter data sesuai pilihan ---
+            df_selected = df4[df4["Nama SPKLU"] == selected_spklu]
+
+            col1, col2 = st.columns(2)
+
+            # ambil palet Set2 dari plotly
+            set2_colors = px.colors.qualitative.Set2
+            color_map = {
+                "Standard": set2_colors[0],   # hijau (#66c2a5)
+                "Medium": set2_colors[1],     # oranye (#fc8d62)
+                "Fast": set2_colors[2],       # ungu kebiruan (#8da0cb)
+                "Ultra Fast": set2_colors[3]  # kuning (#e78ac3)
+            }
 
-        col1, col2, col3 = st.columns(3)
 
-        def buat_kotak(judul, data):
-            with st.container():
-                st.markdown(f"### {judul}")
-                st.markdown(
-                    f"""
-                    <div style="border:1px solid #ddd; border-radius:10px; padding:10px;
-                                max-height:200px; overflow-y:auto; background-color:#FFFFFF; margin-bottom:15px;">
-                        {"".join([f"<p style='margin:5px 0;'>{item}</p>" for item in data])}
-                    </div>
-                    <p style='font-weight:bold; margin-top:5px;'>
-                        Jumlah Unit: {len(data)}
-                    </p>
-                    """,
-                    unsafe_allow_html=True
+            with col1:
+                import plotly.express as px
+                kategori_order = ["Standard", "Medium", "Fast", "Ultra Fast"]
+
+                fig_bar = px.bar(
+                    df_selected,
+                    x="Kategori",
+                    y="Kapasitas",
+                    color="Kategori",
+                    text="Kapasitas",
+                    title=f"Kapasitas per Kategori - {selected_spklu}",
+                    #color_discrete_sequence=px.colors.qualitative.Set2,
+                    color_discrete_map=color_map,
+                    category_orders={"Kategori": kategori_order}
                 )
 
-        with col1:
-            buat_kotak("Tinggi", tinggi)
+                # Tambahkan ruang di atas batang agar label tidak kepotong
+                max_val = df_selected["Kapasitas"].max()
+                fig_bar.update_yaxes(range=[0, max_val * 1.25])  # 25% padding atas
 
-        with col2:
-            buat_kotak("Sedang", sedang)
+                # Atur margin frame
+                fig_bar.update_layout(margin=dict(t=60, b=40, l=40, r=40))
 
-        with col3:
-            buat_kotak("Rendah", rendah)
+                # Teks di atas batang
+                fig_bar.update_traces(textposition="outside", textfont_size=12)
 
-        import plotly.express as px
-        # --- Pilih SPKLU ---
-        spklu_list = df4["Nama SPKLU"].unique()
-        selected_spklu = st.selectbox("Pilih SPKLU", spklu_list)
+                st.plotly_chart(fig_bar, use_container_width=True)
 
-        # --- Filter data sesuai pilihan ---
-        df_selected = df4[df4["Nama SPKLU"] == selected_spklu]
+            with col2:
+                import plotly.graph_objects as go
 
-        col1, col2 = st.columns(2)
+                # Hitung jumlah unit per kategori
+                unit_per_kategori = unit_kategori.get(selected_spklu, pd.Series(dtype=int))
 
-        # ambil palet Set2 dari plotly
-        set2_colors = px.colors.qualitative.Set2
-        color_map = {
-            "Standard": set2_colors[0],   # hijau (#66c2a5)
-            "Medium": set2_colors[1],     # oranye (#fc8d62)
-            "Fast": set2_colors[2],       # ungu kebiruan (#8da0cb)
-            "Ultra Fast": set2_colors[3]  # kuning (#e78ac3)
-        }
-
-
-        with col1:
-            import plotly.express as px
-            kategori_order = ["Standard", "Medium", "Fast", "Ultra Fast"]
-
-            fig_bar = px.bar(
-                df_selected,
-                x="Kategori",
-                y="Kapasitas",
-                color="Kategori",
-                text="Kapasitas",
-                title=f"Kapasitas per Kategori - {selected_spklu}",
-                #color_discrete_sequence=px.colors.qualitative.Set2,
-                color_discrete_map=color_map,
-                category_orders={"Kategori": kategori_order}
-            )
-
-            # Tambahkan ruang di atas batang agar label tidak kepotong
-            max_val = df_selected["Kapasitas"].max()
-            fig_bar.update_yaxes(range=[0, max_val * 1.25])  # 25% padding atas
-
-            # Atur margin frame
-            fig_bar.update_layout(margin=dict(t=60, b=40, l=40, r=40))
-
-            # Teks di atas batang
-            fig_bar.update_traces(textposition="outside", textfont_size=12)
-
-            st.plotly_chart(fig_bar, use_container_width=True)
-
-        with col2:
-            import plotly.graph_objects as go
-
-            # Hitung jumlah unit per kategori
-            unit_per_kategori = df_selected["Kategori"].value_counts()
-
-            # Hitung total kapasitas (untuk teks tengah)
-            total_kapasitas = df_selected["Kapasitas"].sum()
+                # Hitung total kapasitas (untuk teks tengah)
+                total_kapasitas = df_selected["Kapasitas"].sum()
 
-            # Buat Donut Chart
-            fig = go.Figure(data=[go.Pie(
-                labels=unit_per_kategori.index,
-                values=unit_per_kategori.values,
-                hole=0.4,
-                textinfo='percent',
-                texttemplate='<br>%{percent:.1%}',  # tidak menampilkan jumlah unit
-                insidetextfont=dict(color="black"),
-                marker=dict(colors=[color_map[k] for k in unit_per_kategori.index])
-            )])
+                # Buat Donut Chart
+                fig = go.Figure(data=[go.Pie(
+                    labels=unit_per_kategori.index,
+                    values=unit_per_kategori.values,
+                    hole=0.4,
+                    textinfo='percent',
+                    texttemplate='<br>%{percent:.1%}',  # tidak menampilkan jumlah unit
+                    insidetextfont=dict(color="black"),
+                    marker=dict(colors=[color_map[k] for k in unit_per_kategori.index])
+                )])
 
-            # Tambahkan total kapasitas di tengah
-            fig.add_annotation(
-                text=f"<b>Total<br>{int(total_kapasitas)} kW</b>",  # tetap kapasitas
-                x=0.5, y=0.5,
-                font=dict(size=14, color="black"),
-                showarrow=False
-            )
+                # Tambahkan total kapasitas di tengah
+                fig.add_annotation(
+                    text=f"<b>Total<br>{int(total_kapasitas)} kW</b>",  # tetap kapasitas
+                    x=0.5, y=0.5,
+                    font=dict(size=14, color="black"),
+                    showarrow=False
+                )
 
-            # Layout
-            fig.update_layout(
-                title_text=f"Proporsi Kategori Charger - {selected_spklu}",
-                title_x=0.5,
-                margin=dict(l=10, r=10, t=40, b=10)
-            )
+                # Layout
+                fig.update_layout(
+                    title_text=f"Proporsi Kategori Charger - {selected_spklu}",
+                    title_x=0.5,
+                    margin=dict(l=10, r=10, t=40, b=10)
+                )
 
-            st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True)
     # ============================
     # Tab 5 - Level Spklu (Klustering berdasarkan level banyak jumlah transaksi)
     # ============================
     with tab5:
-        # --- Klustering SPKLU ---
-        st.subheader("Klustering SPKLU")
-
-        # --- Persiapan data ---
-        fitur_group = df2.groupby("Nama SPKLU")[["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]].sum().reset_index()
-
-        from sklearn.preprocessing import StandardScaler
-        from sklearn.cluster import KMeans
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(fitur_group[["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]])
-        kmeans = KMeans(n_clusters=3, random_state=42, n_init="auto")
-        fitur_group["Cluster"] = kmeans.fit_predict(X_scaled)
-
-        # Mapping cluster
-        cluster_order = fitur_group.groupby("Cluster")["Total Pendapatan"].mean().sort_values().index
-        mapping = {cluster_order[0]: "Rendah", cluster_order[1]: "Sedang", cluster_order[2]: "Tinggi"}
-        fitur_group["Level"] = fitur_group["Cluster"].map(mapping)
-
-        # === Bagian Rekomendasi (kotak kotak per level) ===
-        rekomendasi = {
-            "Tinggi": "SPKLU ini ramai digunakan. Tambah unit charger, upgrade kapasitas, atau buka cabang di lokasi serupa.",
-            "Sedang": "SPKLU memiliki potensi. Dorong dengan promosi, kerjasama merchant, atau peningkatan fasilitas.",
-            "Rendah": "SPKLU relatif sepi. Evaluasi lokasi, cek teknis, atau strategi marketing. Jika tetap rendah, pertimbangkan relokasi."
-        }
-
-        df_tinggi = fitur_group.query("Level == 'Tinggi'").sort_values("Total Pendapatan", ascending=False)
-        df_sedang = fitur_group.query("Level == 'Sedang'").sort_values("Total Pendapatan", ascending=False)
-        df_rendah = fitur_group.query("Level == 'Rendah'").sort_values("Total Pendapatan", ascending=False)
-        tinggi = df_tinggi["Nama SPKLU"].tolist()
-        sedang = df_sedang["Nama SPKLU"].tolist()
-        rendah = df_rendah["Nama SPKLU"].tolist()
-
-        col1, col2, col3 = st.columns(3)
-
-        def buat_kotak(judul, data):
-            with st.container():
-                st.markdown(f"### {judul}")
-                st.markdown(
-                    f"""
-                    <div style="border:1px solid #ddd; border-radius:10px; padding:10px;
-                                max-height:200px; overflow-y:auto; background-color:#FFFFFF; margin-bottom:15px;">
-                        {"".join([f"<p style='margin:5px 0;'>{item}</p>" for item in data])}
-                    </div>
-                    <p style='font-weight:bold; margin-top:5px;'>
-                        Jumlah Unit: {len(data)}
-                    </p>
-                    """,
-                    unsafe_allow_html=True
-                )
-
-        with col1:
-            buat_kotak("Tinggi", tinggi)
-
-        with col2:
-            buat_kotak("Sedang", sedang)
-
-        with col3:
-            buat_kotak("Rendah", rendah)
-
-        st.markdown("---")
-
-        # === Layout Bawah: Scatter kiri & Pie kanan ===
-        col_left, col_right = st.columns([2, 1])  # scatter lebih lebar
-
-        with col_left:
-            import plotly.express as px
-            label_map = {
-                "Tinggi": "Intensitas Tinggi",
-                "Sedang": "Intensitas Sedang",
-                "Rendah": "Intensitas Rendah"
+        if tab5.open:
+            # --- Klustering SPKLU ---
+            st.subheader("Klustering SPKLU")
+
+            # --- Persiapan data ---
+            fitur_group = total_spklu.reset_index()
+
+            # Standardisasi + K-Means, lalu mapping cluster ke level
+            hasil_klaster = klaster_level(fitur_group, ["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"], n_init="auto")
+            fitur_group["Cluster"] = hasil_klaster.label
+            fitur_group["Level"] = hasil_klaster.level
+
+            # === Bagian Rekomendasi (kotak kotak per level) ===
+            rekomendasi = {
+                "Tinggi": "SPKLU ini ramai digunakan. Tambah unit charger, upgrade kapasitas, atau buka cabang di lokasi serupa.",
+                "Sedang": "SPKLU memiliki potensi. Dorong dengan promosi, kerjasama merchant, atau peningkatan fasilitas.",
+                "Rendah": "SPKLU relatif sepi. Evaluasi lokasi, cek teknis, atau strategi marketing. Jika tetap rendah, pertimbangkan relokasi."
             }
-            fitur_group["Level Deskriptif"] = fitur_group["Level"].map(label_map)
-
-            fig1 = px.scatter(
-                fitur_group,
-                x="Jumlah Transaksi",
-                y="Jumlah KWH",
-                size="Total Pendapatan",
-                color="Level Deskriptif",
-                hover_data=["Nama SPKLU"],
-                color_discrete_map={
-                    "Intensitas Rendah (sepi penggunaan)": "lightcoral",
-                    "Intensitas Sedang (potensial berkembang)": "gold",
-                    "Intensitas Tinggi (ramai digunakan)": "seagreen"
-                },
-                category_orders={"Level Deskriptif": [
-                    "Intensitas Tinggi (ramai digunakan)",
-                    "Intensitas Sedang (potensial berkembang)",
-                    "Intensitas Rendah (sepi penggunaan)"]
+
+            df_tinggi = fitur_group.query("Level == 'Tinggi'").sort_values("Total Pendapatan", ascending=False)
+            df_sedang = fitur_group.query("Level == 'Sedang'").sort_values("Total Pendapatan", ascending=False)
+            df_rendah = fitur_group.query("Level == 'Rendah'").sort_values("Total Pendapatan", ascending=False)
+            tinggi = df_tinggi["Nama SPKLU"].tolist()
+            sedang = df_sedang["Nama SPKLU"].tolist()
+            rendah = df_rendah["Nama SPKLU"].tolist()
+
+            col1, col2, col3 = st.columns(3)
+
+            def buat_kotak(judul, data):
+                with st.container():
+                    st.markdown(f"### {judul}")
+                    st.markdown(
+                        f"""
+                        <div style="border:1px solid #ddd; border-radius:10px; padding:10px;
+                                    max-height:200px; overflow-y:auto; background-color:#FFFFFF; margin-bottom:15px;">
+                            {"".join([f"<p style='margin:5px 0;'>{item}</p>" for item in data])}
+                        </div>
+                        <p style='font-weight:bold; margin-top:5px;'>
+                            Jumlah Unit: {len(data)}
+                        </p>
+                        """,
+                        unsafe_allow_html=True
+                    )
+
+            with col1:
+                buat_kotak("Tinggi", tinggi)
+
+            with col2:
+                buat_kotak("Sedang", sedang)
+
+            with col3:
+                buat_kotak("Rendah", rendah)
+
+            st.markdown("---")
+
+            # === Layout Bawah: Scatter kiri & Pie kanan ===
+            col_left, col_right = st.columns([2, 1])  # scatter lebih lebar
+
+            with col_left:
+                import plotly.express as px
+                label_map = {
+                    "Tinggi": "Intensitas Tinggi",
+                    "Sedang": "Intensitas Sedang",
+                    "Rendah": "Intensitas Rendah"
                 }
-            )
-            st.plotly_chart(fig1, use_container_width=True, key="scatter_plot")
-
-        with col_right:
-            import plotly.graph_objects as go
-
-            # Hitung value counts
-            level_count = fitur_group["Level"].value_counts()
-
-            # Buat pie chart dengan donut style
-            fig2 = go.Figure(data=[go.Pie(
-                labels=level_count.index,
-                values=level_count.values,
-                hole=0.4,  # bikin jadi donut
-                marker=dict(colors=["lightcoral", "gold", "seagreen"]),
-                textinfo='percent'  # tampilkan label + persentase
-            )])
-
-            # Tambahkan total di tengah
-            fig2.add_annotation(
-                text=f"<b>Total<br>{level_count.sum()}</b>",
-                x=0.5, y=0.5,
-                font=dict(size=14, color="black"),
-                showarrow=False
-            )
+                fitur_group["Level Deskriptif"] = fitur_group["Level"].map(label_map)
+
+                fig1 = px.scatter(
+                    fitur_group,
+                    x="Jumlah Transaksi",
+                    y="Jumlah KWH",
+                    size="Total Pendapatan",
+                    color="Level Deskriptif",
+                    hover_data=["Nama SPKLU"],
+                    color_discrete_map={
+                        "Intensitas Rendah (sepi penggunaan)": "lightcoral",
+                        "Intensitas Sedang (potensial berkembang)": "gold",
+                        "Intensitas Tinggi (ramai digunakan)": "seagreen"
+                    },
+                    category_orders={"Level Deskriptif": [
+                        "Intensitas Tinggi (ramai digunakan)",
+                        "Intensitas Sedang (potensial berkembang)",
+                        "Intensitas Rendah (sepi penggunaan)"]
+                    }
+                )
+                st.plotly_chart(fig1, use_container_width=True, key="scatter_plot")
+
+            with col_right:
+                import plotly.graph_objects as go
+
+                # Hitung value counts
+                level_count = fitur_group["Level"].value_counts()
+
+                # Buat pie chart dengan donut style
+                fig2 = go.Figure(data=[go.Pie(
+                    labels=level_count.index,
+                    values=level_count.values,
+                    hole=0.4,  # bikin jadi donut
+                    marker=dict(colors=["lightcoral", "gold", "seagreen"]),
+                    textinfo='percent'  # tampilkan label + persentase
+                )])
+
+                # Tambahkan total di tengah
+                fig2.add_annotation(
+                    text=f"<b>Total<br>{level_count.sum()}</b>",
+                    x=0.5, y=0.5,
+                    font=dict(size=14, color="black"),
+                    showarrow=False
+                )
 
-            # Atur judul
-            fig2.update_layout(
-                title_text="Proporsi SPKLU per Level",
-                title_x=0.5
-            )
+                # Atur judul
+                fig2.update_layout(
+                    title_text="Proporsi SPKLU per Level",
+                    title_x=0.5
+                )
 
-            st.plotly_chart(fig2, use_container_width=True)
+                st.plotly_chart(fig2, use_container_width=True)
 
-        # Fitur 1: Informasi Lebih Lanjut
-        with st.expander("Informasi Seputar Clustering"):
+            # Fitur 1: Informasi Lebih Lanjut
+            with st.expander("Informasi Seputar Clustering"):
 
-            # --- Insight Clustering (Deskripsi Naratif) ---
+                # --- Insight Clustering (Deskripsi Naratif) ---
 
-            st.markdown("""
-            **Cluster Tinggi**
+                st.markdown("""
+                **Cluster Tinggi**
 
-            Menunjukkan SPKLU dengan **pendapatan, jumlah KWH, dan jumlah transaksi yang tinggi**.
-            Biasanya SPKLU di cluster ini merupakan **lokasi strategis** atau dengan **tingkat pemanfaatan optimal**.
+                Menunjukkan SPKLU dengan **pendapatan, jumlah KWH, dan jumlah transaksi yang tinggi**.
+                Biasanya SPKLU di cluster ini merupakan **lokasi strategis** atau dengan **tingkat pemanfaatan optimal**.
 
-            ---
+                ---
 
-            **Cluster Sedang**
-            SPKLU dengan **pendapatan, jumlah KWH, dan transaksi pada tingkat menengah**.
-            Artinya, potensi cukup baik namun masih bisa ditingkatkan, misalnya dengan promosi atau peningkatan kapasitas.
+                **Cluster Sedang**
+                SPKLU dengan **pendapatan, jumlah KWH, dan transaksi pada tingkat menengah**.
+                Artinya, potensi cukup baik namun masih bisa ditingkatkan, misalnya dengan promosi atau peningkatan kapasitas.
 
-            ---
+                ---
 
-            **Cluster Rendah**
-            SPKLU dengan **pendapatan, jumlah KWH, dan transaksi rendah**.
-            Biasanya ini menunjukkan **lokasi yang kurang strategis** atau masih **belum banyak dimanfaatkan** oleh pengguna kendaraan listrik.
-            """)
+                **Cluster Rendah**
+                SPKLU dengan **pendapatan, jumlah KWH, dan transaksi rendah**.
+                Biasanya ini menunjukkan **lokasi yang kurang strategis** atau masih **belum banyak dimanfaatkan** oleh pengguna kendaraan listrik.
+                """)
     
     
     # ============================
     # Tab 6 - Tren Bulanan Unit SPKLU
     # ============================
     with tab6:
-        st.subheader("Tren Bulanan Unit SPKLU")
-
-        # --- Pastikan kolom waktu tersedia tanpa duplikasi ---
-        if not {"Bulan", "Tahun", "BulanNum"}.issubset(df2.columns):
-            bulan_map = {
-                "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
-                "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
-                "September": 9, "Oktober": 10, "November": 11, "Desember": 12
-            }
-            df2[["Bulan", "Tahun"]] = df2["Bulan & Tahun"].str.split(" ", n=1, expand=True)
-            df2["Tahun"] = df2["Tahun"].astype(int)
-            df2["BulanNum"] = df2["Bulan"].map(bulan_map)
-
-        # --- Index bulan terurut + key numerik YYYYMM ---
-        bulan_index = (
-            df2[["Bulan & Tahun", "Bulan", "Tahun", "BulanNum"]]
-            .drop_duplicates()
-            .sort_values(["Tahun", "BulanNum"])
-            .assign(key=lambda d: d["Tahun"] * 100 + d["BulanNum"])
-        )
-        opsi_bulan = bulan_index["Bulan & Tahun"].tolist()
-        bulan2key = dict(zip(bulan_index["Bulan & Tahun"], bulan_index["key"]))
-
-        # --- Pilihan Unit & Rentang Bulan ---
-        c1, c2, c3 = st.columns([2, 1, 1])
-        with c1:
-            selected_spklu = st.selectbox("Pilih Unit SPKLU", sorted(df2["Nama SPKLU"].unique()))
-        with c2:
-            start_bulan = st.selectbox("Bulan Awal", opsi_bulan, index=0)
-        with c3:
-            end_bulan = st.selectbox("Bulan Akhir", opsi_bulan, index=len(opsi_bulan) - 1)
-
-        start_key, end_key = bulan2key[start_bulan], bulan2key[end_bulan]
-        lo, hi = (start_key, end_key) if start_key <= end_key else (end_key, start_key)
-
-        # --- Kalender bulan pada rentang (agar bulan kosong jadi 0) ---
-        kalender = bulan_index.loc[(bulan_index["key"] >= lo) & (bulan_index["key"] <= hi), ["key", "Bulan & Tahun"]]
-
-        # --- Agregasi per bulan untuk unit terpilih ---
-        df_unit = df2[df2["Nama SPKLU"] == selected_spklu].copy()
-        df_unit["key"] = df_unit["Tahun"] * 100 + df_unit["BulanNum"]
-
-        agg = (
-            df_unit.groupby("key", as_index=False)
-            .agg({
-                "Total Pendapatan": "sum",
-                "Jumlah KWH": "sum",
-                "Jumlah Transaksi": "sum"
-            })
-        )
-
-        # --- Gabungkan dengan kalender & isi nol untuk bulan tanpa data ---
-        df_tren = kalender.merge(agg, on="key", how="left").fillna(0.0)
-        df_tren["BulanLabel"] = df_tren["Bulan & Tahun"]  # pakai label Indonesia asli
-        order_x = df_tren["BulanLabel"].tolist()
+        if tab6.open:
+            st.subheader("Tren Bulanan Unit SPKLU")
+
+            # --- Index bulan terurut + key numerik (dari normalisasi saat load) ---
+            bulan_index = olah_data.daftar_periode(df2)
+            opsi_bulan = bulan_index["Bulan & Tahun"].tolist()
+            bulan2key = dict(zip(bulan_index["Bulan & Tahun"], bulan_index["key"]))
+
+            # --- Pilihan Unit & Rentang Bulan ---
+            c1, c2, c3 = st.columns([2, 1, 1])
+            with c1:
+                selected_spklu = st.selectbox("Pilih Unit SPKLU", sorted(df2["Nama SPKLU"].unique()))
+            with c2:
+                start_bulan = st.selectbox("Bulan Awal", opsi_bulan, index=0)
+            with c3:
+                end_bulan = st.selectbox("Bulan Akhir", opsi_bulan, index=len(opsi_bulan) - 1)
+
+            start_key, end_key = bulan2key[start_bulan], bulan2key[end_bulan]
+            lo, hi = (start_key, end_key) if start_key <= end_key else (end_key, start_key)
+
+            # --- Deret bulanan unit terpilih dari kubus (bulan tanpa data sudah bernilai 0) ---
+            df_tren = agregasi.tren(kubus, selected_spklu)
+            df_tren = df_tren[(df_tren["key"] >= lo) & (df_tren["key"] <= hi)].reset_index(drop=True)
+            df_tren["BulanLabel"] = df_tren["Bulan & Tahun"]  # pakai label Indonesia asli
+            order_x = df_tren["BulanLabel"].tolist()
 
-        import plotly.express as px
+            import plotly.express as px
 
-        col_a, col_b, col_c = st.columns(3)
+            col_a, col_b, col_c = st.columns(3)
 
-        # Grafik 1: Total Pendapatan
-        with col_a:
-            fig_pendapatan = px.line(
-                df_tren, x="BulanLabel", y="Total Pendapatan", markers=True,
-                title="Total Pendapatan",
-                category_orders={"BulanLabel": order_x},
-                color_discrete_sequence=["#FA8072"]
-            )
-            fig_pendapatan.update_traces(
-                line=dict(width=3),
-                marker=dict(size=8),
-                hovertemplate="Periode=%{x}<br>Pendapatan=Rp%{y:,.0f}<extra></extra>"
-            )
-            fig_pendapatan.update_yaxes(tickformat=",")
-            fig_pendapatan.update_layout(margin=dict(t=50, b=10, l=10, r=10),
-                xaxis_title=None,   # Hilangkan label X
-                yaxis_title=None    # Hilangkan label Y
-            )
-            st.plotly_chart(fig_pendapatan, use_container_width=True)
-
-        # Grafik 2: Jumlah KWH
-        with col_b:
-            fig_kwh = px.line(
-                df_tren, x="BulanLabel", y="Jumlah KWH", markers=True,
-                title="Jumlah KWH",
-                category_orders={"BulanLabel": order_x},
-                color_discrete_sequence=["lightgreen"]
-            )
-            fig_kwh.update_traces(
-                line=dict(width=3),
-                marker=dict(size=8),
-                hovertemplate="Periode=%{x}<br>KWH=%{y:,.0f}<extra></extra>"
-            )
-            fig_kwh.update_yaxes(tickformat=",")
-            fig_kwh.update_layout(margin=dict(t=50, b=10, l=10, r=10),
-                xaxis_title=None,   # Hilangkan label X
-                yaxis_title=None    # Hilangkan label Y
-            )
-            st.plotly_chart(fig_kwh, use_container_width=True)
-
-        # Grafik 3: Jumlah Transaksi
-        with col_c:
-            fig_transaksi = px.line(
-                df_tren, x="BulanLabel", y="Jumlah Transaksi", markers=True,
-                title="Jumlah Transaksi",
-                category_orders={"BulanLabel": order_x},
-                color_discrete_sequence=["#FFBD31"]
-            )
-            fig_transaksi.update_traces(
-                line=dict(width=3),
-                marker=dict(size=8),
-                hovertemplate="Periode=%{x}<br>Transaksi=%{y:,.0f}<extra></extra>"
-            )
-            fig_transaksi.update_yaxes(tickformat=",")
-            fig_transaksi.update_layout(margin=dict(t=50, b=10, l=10, r=10),
-                xaxis_title=None,   # Hilangkan label X
-                yaxis_title=None    # Hilangkan label Y
-            )
-            st.plotly_chart(fig_transaksi, use_container_width=True)
+            # Grafik 1: Total Pendapatan
+            with col_a:
+                fig_pendapatan = px.line(
+                    df_tren, x="BulanLabel", y="Total Pendapatan", markers=True,
+                    title="Total Pendapatan",
+                    category_orders={"BulanLabel": order_x},
+                    color_discrete_sequence=["#FA8072"]
+                )
+                fig_pendapatan.update_traces(
+                    line=dict(width=3),
+                    marker=dict(size=8),
+                    hovertemplate="Periode=%{x}<br>Pendapatan=Rp%{y:,.0f}<extra></extra>"
+                )
+                fig_pendapatan.update_yaxes(tickformat=",")
+                fig_pendapatan.update_layout(margin=dict(t=50, b=10, l=10, r=10),
+                    xaxis_title=None,   # Hilangkan label X
+                    yaxis_title=None    # Hilangkan label Y
+                )
+                st.plotly_chart(fig_pendapatan, use_container_width=True)
+
+            # Grafik 2: Jumlah KWH
+            with col_b:
+                fig_kwh = px.line(
+                    df_tren, x="BulanLabel", y="Jumlah KWH", markers=True,
+                    title="Jumlah KWH",
+                    category_orders={"BulanLabel": order_x},
+                    color_discrete_sequence=["lightgreen"]
+                )
+                fig_kwh.update_traces(
+                    line=dict(width=3),
+                    marker=dict(size=8),
+                    hovertemplate="Periode=%{x}<br>KWH=%{y:,.0f}<extra></extra>"
+                )
+                fig_kwh.update_yaxes(tickformat=",")
+                fig_kwh.update_layout(margin=dict(t=50, b=10, l=10, r=10),
+                    xaxis_title=None,   # Hilangkan label X
+                    yaxis_title=None    # Hilangkan label Y
+                )
+                st.plotly_chart(fig_kwh, use_container_width=True)
+
+            # Grafik 3: Jumlah Transaksi
+            with col_c:
+                fig_transaksi = px.line(
+                    df_tren, x="BulanLabel", y="Jumlah Transaksi", markers=True,
+                    title="Jumlah Transaksi",
+                    category_orders={"BulanLabel": order_x},
+                    color_discrete_sequence=["#FFBD31"]
+                )
+                fig_transaksi.update_traces(
+                    line=dict(width=3),
+                    marker=dict(size=8),
+                    hovertemplate="Periode=%{x}<br>Transaksi=%{y:,.0f}<extra></extra>"
+                )
+                fig_transaksi.update_yaxes(tickformat=",")
+                fig_transaksi.update_layout(margin=dict(t=50, b=10, l=10, r=10),
+                    xaxis_title=None,   # Hilangkan label X
+                    yaxis_title=None    # Hilangkan label Y
+                )
+                st.plotly_chart(fig_transaksi, use_container_width=True)
 
-        # Opsional: lihat data
-        with st.expander("Lihat Data Tren Bulanan"):
-            st.dataframe(
-                df_tren[["Bulan & Tahun", "Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]],
-                hide_index=True  # index disembunyikan
-            )
+            # Opsional: lihat data
+            with st.expander("Lihat Data Tren Bulanan"):
+                st.dataframe(
+                    df_tren[["Bulan & Tahun", "Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]],
+                    hide_index=True  # index disembunyikan
+                )
 
     # ============================
     # Tab 7 - Ulik SPKLU Lebih Dalam
     # ============================
     with tab7:
-        st.subheader("🔎 Ulik SPKLU Lebih Dalam")
+        if tab7.open:
+            st.subheader("🔎 Ulik SPKLU Lebih Dalam")
 
-        # --- Pilih SPKLU ---
-        selected_spklu = st.selectbox("Pilih SPKLU", sorted(df2["Nama SPKLU"].unique()))
+            # --- Pilih SPKLU ---
+            selected_spklu = st.selectbox("Pilih SPKLU", sorted(df2["Nama SPKLU"].unique()))
 
-        # --- Filter data ---
-        df_spklu = df2[df2["Nama SPKLU"] == selected_spklu].copy()
+            # --- Filter data ---
+            total_unit = agregasi.total_entitas(kubus, selected_spklu)
 
-        # Pastikan ada kolom Bulan & Tahun terpisah
-        if "BulanNum" not in df_spklu.columns:
-            bulan_map = {
-                "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
-                "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
-                "September": 9, "Oktober": 10, "November": 11, "Desember": 12
-            }
-            df_spklu[["Bulan", "Tahun"]] = df_spklu["Bulan & Tahun"].str.split(" ", n=1, expand=True)
-            df_spklu["Tahun"] = df_spklu["Tahun"].astype(int)
-            df_spklu["BulanNum"] = df_spklu["Bulan"].map(bulan_map)
-            df_spklu["key"] = df_spklu["Tahun"] * 100 + df_spklu["BulanNum"]
-
-        # --- Ringkasan ---
-        total_trx = int(df_spklu["Jumlah Transaksi"].sum())
-        total_kwh = float(df_spklu["Jumlah KWH"].sum())
-        total_pendapatan = float(df_spklu["Total Pendapatan"].sum())
-
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Total Transaksi", f"{total_trx:,.0f}")
-        c2.metric("Total kWh", f"{total_kwh:,.0f}")
-        c3.metric("Total Pendapatan", f"Rp {total_pendapatan:,.0f}")
-
-        st.markdown("---")
-
-        # --- Tren Bulanan (line chart) ---
-        df_tren = (
-            df_spklu.groupby(["key", "Bulan & Tahun"])
-            .agg({"Jumlah Transaksi":"sum", "Jumlah KWH":"sum", "Total Pendapatan":"sum"})
-            .reset_index()
-            .sort_values("key")
-        )
+            # --- Ringkasan ---
+            total_trx = int(total_unit["Jumlah Transaksi"])
+            total_kwh = float(total_unit["Jumlah KWH"])
+            total_pendapatan = float(total_unit["Total Pendapatan"])
 
-        fig_line = px.line(
-            df_tren, x="Bulan & Tahun", y=["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"],
-            markers=True,
-            title=f"Tren Bulanan - {selected_spklu}"
-        )
-        fig_line.update_traces(line=dict(width=3))
-        fig_line.update_layout(margin=dict(t=40, b=20, l=10, r=10), xaxis_title=None, yaxis_title=None)
-        st.plotly_chart(fig_line, use_container_width=True)
-
-        st.markdown("---")
-
-        # --- Distribusi per Charger (bar) ---
-        if "Charger_ID" in df2.columns:
-            df_charger = df2[df2["Nama SPKLU"] == selected_spklu].groupby("Charger_ID").agg({
-                "Jumlah Transaksi":"sum", "Jumlah KWH":"sum", "Total Pendapatan":"sum"
-            }).reset_index()
-
-            fig_bar = px.bar(
-                df_charger, x="Charger_ID", y="Jumlah Transaksi", text="Jumlah Transaksi",
-                title=f"Distribusi Transaksi per Charger - {selected_spklu}",
-                color="Jumlah Transaksi", color_continuous_scale="Blues"
-            )
-            fig_bar.update_traces(textposition="outside")
-            st.plotly_chart(fig_bar, use_container_width=True)
-
-        # --- Donut per Kategori Charger (pakai df4) ---
-        df_kat = df4[df4["Nama SPKLU"] == selected_spklu]
-        if not df_kat.empty:
-            kategori_count = df_kat["Kategori"].value_counts()
-
-            fig_donut = go.Figure(data=[go.Pie(
-                labels=kategori_count.index,
-                values=kategori_count.values,
-                hole=0.5,
-                textinfo="percent+label"
-            )])
-            fig_donut.update_layout(
-                title=f"Proporsi Kategori Charger - {selected_spklu}",
-                margin=dict(t=40, b=20, l=20, r=20)
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Total Transaksi", f"{total_trx:,.0f}")
+            c2.metric("Total kWh", f"{total_kwh:,.0f}")
+            c3.metric("Total Pendapatan", f"Rp {total_pendapatan:,.0f}")
+
+            st.markdown("---")
+
+            # --- Tren Bulanan (line chart) ---
+            df_tren = agregasi.tren(kubus, selected_spklu, hanya_ada=True)
+
+            fig_line = px.line(
+                df_tren, x="Bulan & Tahun", y=["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"],
+                markers=True,
+                title=f"Tren Bulanan - {selected_spklu}"
             )
-            st.plotly_chart(fig_donut, use_container_width=True)
+            fig_line.update_traces(line=dict(width=3))
+            fig_line.update_layout(margin=dict(t=40, b=20, l=10, r=10), xaxis_title=None, yaxis_title=None)
+            st.plotly_chart(fig_line, use_container_width=True)
+
+            st.markdown("---")
+
+            # --- Distribusi per Charger (bar) ---
+            if "Charger_ID" in df2.columns:
+                df_charger = df2[df2["Nama SPKLU"] == selected_spklu].groupby("Charger_ID", observed=True).agg({
+                    "Jumlah Transaksi":"sum", "Jumlah KWH":"sum", "Total Pendapatan":"sum"
+                }).reset_index()
+
+                fig_bar = px.bar(
+                    df_charger, x="Charger_ID", y="Jumlah Transaksi", text="Jumlah Transaksi",
+                    title=f"Distribusi Transaksi per Charger - {selected_spklu}",
+                    color="Jumlah Transaksi", color_continuous_scale="Blues"
+                )
+                fig_bar.update_traces(textposition="outside")
+                st.plotly_chart(fig_bar, use_container_width=True)
+
+            # --- Donut per Kategori Charger (pakai df4) ---
+            _, unit_kategori = charger_data(df4.attrs.get("versi"), df4)
+            kategori_count = unit_kategori.get(selected_spklu)
+            if kategori_count is not None:
+
+                fig_donut = go.Figure(data=[go.Pie(
+                    labels=kategori_count.index,
+                    values=kategori_count.values,
+                    hole=0.5,
+                    textinfo="percent+label"
+                )])
+                fig_donut.update_layout(
+                    title=f"Proporsi Kategori Charger - {selected_spklu}",
+                    margin=dict(t=40, b=20, l=20, r=20)
+                )
+                st.plotly_chart(fig_donut, use_container_width=True)
 
 
 
@@ -1336,22 +1305,19 @@ elif selected == "Prediksi":
     st.write("Prediksi menggunakan model Machine Learning (XGBoost) dan Prophet (opsional).")
 
     # ============ Load Model ============
-    model_daily = joblib.load("model_daily.pkl")
-    model_monthly = joblib.load("model_monthly.pkl")
+    # Dari registri: format native XGBoost, dimuat sekali per proses dan dibagi semua sesi
+    model_daily = registri_model.model("harian")
+    model_monthly = registri_model.model("bulanan")
     
     # ==== Load Dataset ====
-    url_data5 = "https://docs.google.com/spreadsheets/d/16cyvXwvucVb7EM1qiikZpbK8J8isbktuiw-MR1EJDEY/export?format=csv&gid=2075790964"
-    df5 = pd.read_csv(url_data5)
-    df5.columns = df5.columns.str.strip()
+    df5 = sumber_data.muat_sheet("data5")
 
     if "TGL BAYAR" not in df5.columns:
         st.error("Kolom 'TGL BAYAR' tidak ditemukan pada dataset.")
         st.stop()
 
-    df5 = df5.dropna(subset=["TGL BAYAR"]).copy()
-    df5["TGL BAYAR"] = pd.to_datetime(df5["TGL BAYAR"], errors="coerce")
-    df5 = df5.dropna(subset=["TGL BAYAR"])
-    df5["Tanggal"] = df5["TGL BAYAR"].dt.normalize()
+    # Deret harian/bulanan + ramalan horizon maksimum, sekali per versi data & model
+    hasil_ramalan = ramalan_data(df5.attrs.get("versi"), registri_model.versi(), df5, model_daily, model_monthly)
 
     # Styling global
     plt.style.use("default")
@@ -1363,21 +1329,21 @@ elif selected == "Prediksi":
     plt.rcParams["ytick.color"] = "#444444"
     plt.rcParams["grid.color"] = "#cccccc"
     
-    # Tabs Harian & Bulanan
-    tab1, tab2 = st.tabs(["Harian", "Bulanan"])
+    # Tabs Harian, Bulanan & per SPKLU
+    tab1, tab2, tab3 = st.tabs(["Harian", "Bulanan", "Per SPKLU"])
 
     # ========================
     # TAB 1: Prediksi Harian
     # ========================
     with tab1:
         st.subheader("Prediksi Harian (XGBoost)")
-        daily = df5.groupby("Tanggal")["No"].nunique().rename("y").reset_index()
+        daily = hasil_ramalan["harian"]
 
-        if len(daily) < 14:
+        if len(daily) < prediksi.MIN_HARI:
             st.warning("Data harian terlalu sedikit (minimal 14 hari).")
             st.stop()
 
-        s = daily.set_index("Tanggal")["y"].asfreq("D").fillna(0)
+        s = hasil_ramalan["s"]
 
         # Visualisasi historis
         fig, ax = plt.subplots(figsize=(15, 4))
@@ -1388,57 +1354,32 @@ elif selected == "Prediksi":
         plt.tight_layout()
         st.pyplot(fig)
 
-        # Pilihan horizon
-        horizon = st.slider("Pilih Prediksi Harian", 1, 30, 7)
-
-        # Fitur untuk prediksi
-        df_feat = s.to_frame().reset_index().rename(columns={"Tanggal": "ds", "y": "y"})
-        df_feat["dayofweek"] = df_feat["ds"].dt.dayofweek
-        df_feat["month"] = df_feat["ds"].dt.month
-        for L in [1, 2, 3, 7]:
-            df_feat[f"lag{L}"] = df_feat["y"].shift(L)
-        df_feat = df_feat.dropna().reset_index(drop=True)
-
-        FEATURES = ["dayofweek", "month", "lag1", "lag2", "lag3", "lag7"]
-
-        # Prediksi berulang
-        last_ds = df_feat["ds"].iloc[-1]
-        series = df_feat.set_index("ds")["y"].copy()
-        preds = []
-        for h in range(1, horizon + 1):
-            nxt = last_ds + timedelta(days=h)
-            row = {
-                "dayofweek": nxt.dayofweek,
-                "month": nxt.month,
-                "lag1": series.iloc[-1],
-                "lag2": series.iloc[-2] if len(series) >= 2 else series.iloc[-1],
-                "lag3": series.iloc[-3] if len(series) >= 3 else series.iloc[-1],
-                "lag7": series.iloc[-7] if len(series) >= 7 else series.iloc[-1],
-            }
-            yhat = float(model_daily.predict(pd.DataFrame([row])[FEATURES])[0])
-            preds.append((nxt, max(0, yhat)))
-            series.loc[nxt] = yhat
+        # Slider horizon sebagai fragment yang hanya memotong ramalan cache (tanpa memanggil model)
+        @st.fragment
+        def prediksi_harian(s, pred_harian):
+            # Pilihan horizon
+            horizon = st.slider("Pilih Prediksi Harian", 1, prediksi.HORIZON_HARIAN, 7)
+            df_pred = pred_harian.head(horizon)
+            st.dataframe(df_pred, hide_index=True)
+
+            fig, ax = plt.subplots(figsize=(15, 5))
+            ax.plot(s.index, s.values, label="Historis", color="#e63946")
+            ax.plot(df_pred["Tanggal"], df_pred["Prediksi"], "--o", label="Forecast", color="#457b9d")
+            ax.legend()
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            st.pyplot(fig)
 
-        df_pred = pd.DataFrame(preds, columns=["Tanggal", "Prediksi"])
-        st.dataframe(df_pred, hide_index=True)
-
-        fig, ax = plt.subplots(figsize=(15, 5))
-        ax.plot(s.index, s.values, label="Historis", color="#e63946")
-        ax.plot(df_pred["Tanggal"], df_pred["Prediksi"], "--o", label="Forecast", color="#457b9d")
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
+        prediksi_harian(s, hasil_ramalan["pred_harian"])
 
     # ========================
     # TAB 2: Prediksi Bulanan
     # ========================
     with tab2:
         st.subheader("Prediksi Bulanan (XGBoost)")
-        df5["Periode"] = df5["TGL BAYAR"].dt.to_period("M").dt.to_timestamp(how="start")
-        monthly = df5.groupby("Periode")["No"].nunique().rename("y").reset_index()
+        monthly = hasil_ramalan["bulanan"]
 
-        if len(monthly) < 6:
+        if len(monthly) < prediksi.MIN_BULAN:
             st.warning("Data bulanan terlalu sedikit (butuh ≥ 6 titik).")
             st.stop()
 
@@ -1450,47 +1391,88 @@ elif selected == "Prediksi":
         plt.tight_layout()
         st.pyplot(fig)
 
-        # Pilihan horizon
-        horizon_m = st.slider("Pilih Prediksi Bulan Kedepan", 1, 24, 6)
-
-        # Siapkan fitur bulanan
-        dfm = monthly.rename(columns={"Periode": "ds", "y": "y"})
-        dfm["month"] = dfm["ds"].dt.month
-        dfm["year"] = dfm["ds"].dt.year
-        for L in [1, 2, 3, 6, 12]:
-            dfm[f"lag{L}"] = dfm["y"].shift(L)
-        dfm = dfm.dropna().reset_index(drop=True)
-
-        FEATURES_M = ["month", "year", "lag1", "lag2", "lag3", "lag6", "lag12"]
-
-        # Prediksi berulang
-        last_ds = dfm["ds"].iloc[-1]
-        cur = dfm.set_index("ds")["y"].copy()
-        preds_m = []
-        for h in range(1, horizon_m + 1):
-            nxt = (last_ds + pd.offsets.MonthBegin(h))
-            row = {
-                "month": nxt.month, "year": nxt.year,
-                "lag1": cur.iloc[-1],
-                "lag2": cur.iloc[-2] if len(cur) >= 2 else cur.iloc[-1],
-                "lag3": cur.iloc[-3] if len(cur) >= 3 else cur.iloc[-1],
-                "lag6": cur.iloc[-6] if len(cur) >= 6 else cur.iloc[-1],
-                "lag12": cur.iloc[-12] if len(cur) >= 12 else cur.iloc[-1],
-            }
-            yhat = float(model_monthly.predict(pd.DataFrame([row])[FEATURES_M])[0])
-            preds_m.append((nxt, max(0, yhat)))
-            cur.loc[nxt] = yhat
+        # Sama seperti harian: slider horizon bulanan hanya memotong ramalan cache
+        @st.fragment
+        def prediksi_bulanan(monthly, pred_bulanan):
+            # Pilihan horizon
+            horizon_m = st.slider("Pilih Prediksi Bulan Kedepan", 1, prediksi.HORIZON_BULANAN, 6)
+            if pred_bulanan is None:
+                st.warning("Data bulanan terlalu sedikit untuk fitur lag 12 bulan.")
+                return
+            df_pred_m = pred_bulanan.head(horizon_m)
+            st.dataframe(df_pred_m, hide_index=True)
+
+            fig, ax = plt.subplots(figsize=(12, 5))
+            ax.plot(monthly["Periode"], monthly["y"], label="Historis", color="#e63946")
+            ax.plot(df_pred_m["Periode"], df_pred_m["Forecast"], "--o", label="Forecast (XGB)", color="#457b9d")
+            ax.legend()
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            st.pyplot(fig)
 
-        df_pred_m = pd.DataFrame(preds_m, columns=["Periode", "Forecast"])
-        st.dataframe(df_pred_m, hide_index=True)
+        prediksi_bulanan(monthly, hasil_ramalan["pred_bulanan"])
 
-        fig, ax = plt.subplots(figsize=(12, 5))
-        ax.plot(monthly["Periode"], monthly["y"], label="Historis", color="#e63946")
-        ax.plot(df_pred_m["Periode"], df_pred_m["Forecast"], "--o", label="Forecast (XGB)", color="#457b9d")
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
+    # ========================
+    # TAB 3: Prediksi per SPKLU / ULP
+    # ========================
+    with tab3:
+        st.subheader("Prediksi per SPKLU (XGBoost)")
+
+        # Semua entitas diramal sekaligus dan di-cache; pilihan di fragment ini hanya mengiris hasilnya
+        @st.fragment
+        def prediksi_entitas(df5):
+            col1, col2 = st.columns(2)
+            with col1:
+                level = st.radio("Level", list(prediksi.ENTITAS), horizontal=True, key="entitas_level")
+            with col2:
+                jenis = st.radio("Periode", ["Harian", "Bulanan"], horizontal=True, key="entitas_periode")
+
+            hasil = ramalan_entitas_data(
+                df5.attrs.get("versi"), registri_model.versi(), prediksi.ENTITAS[level],
+                df5, model_daily, model_monthly,
+            )
+            harian = jenis == "Harian"
+            pred = hasil["pred_harian"] if harian else hasil["pred_bulanan"]
+            if pred is None:
+                st.warning("Data terlalu sedikit untuk prediksi per entitas pada periode ini.")
+                return
+
+            entitas = [str(e) for e in hasil["entitas"]]
+            if harian:
+                horizon = st.slider("Pilih Prediksi Harian", 1, prediksi.HORIZON_HARIAN, 7, key="entitas_horizon_h")
+                waktu, riwayat, langkah = hasil["tanggal"], hasil["harian"], hasil["langkah_harian"]
+            else:
+                horizon = st.slider("Pilih Prediksi Bulan Kedepan", 1, prediksi.HORIZON_BULANAN, 6, key="entitas_horizon_b")
+                waktu, riwayat, langkah = hasil["periode"], hasil["bulanan"], hasil["langkah_bulanan"]
+
+            # Ringkasan semua entitas: total prediksi sepanjang horizon
+            ringkasan = pd.DataFrame({
+                level: entitas,
+                "Total Prediksi": pred[:, :horizon].sum(axis=1).round(1),
+                "Rata-rata Prediksi": pred[:, :horizon].mean(axis=1).round(2),
+                "Rata-rata Historis": riwayat.mean(axis=1).round(2),
+            }).sort_values("Total Prediksi", ascending=False)
+            st.dataframe(ringkasan, hide_index=True)
+            total = hasil["total_harian"] if harian else hasil["total_bulanan"]
+            st.caption(f"Prediksi per {level} adalah bagian dari prediksi total "
+                       f"({total[:horizon].sum():,.1f} transaksi dalam {horizon} {'hari' if harian else 'bulan'}), "
+                       f"dibagi menurut porsi dan pola masing-masing.")
+
+            pilihan = st.selectbox(f"Pilih {level}", entitas, key="entitas_pilihan")
+            i = entitas.index(pilihan)
+            df_pred = pd.DataFrame({"Tanggal" if harian else "Periode": langkah[:horizon], "Prediksi": pred[i, :horizon]})
+            st.dataframe(df_pred, hide_index=True)
+
+            fig, ax = plt.subplots(figsize=(15, 5))
+            ax.plot(waktu, riwayat[i], label="Historis", color="#e63946")
+            ax.plot(langkah[:horizon], pred[i, :horizon], "--o", label="Forecast", color="#457b9d")
+            ax.set_title(f"{pilihan} — Jumlah Transaksi {jenis}")
+            ax.legend()
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            st.pyplot(fig)
+
+        prediksi_entitas(df5)
 
 elif selected == "Tentang":
     st.title('Tentang Dashboard SPKLU')
@@ -1560,6 +1542,7 @@ elif selected == "Tentang":
         st.write("""
         - Menyediakan proyeksi jumlah transaksi atau konsumsi energi (KWh).
         - Dibangun menggunakan metode analisis data prediktif.
+        - Tersedia juga prediksi per SPKLU dan per ULP.
         """)
     with st.expander("Meet The Team Behind This Project"):
         st.image("creator.jpg", width=400, caption="Tim Pengembang Dashboard SPKLU")  # contoh path foto tim
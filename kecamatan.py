@@ -0,0 +1,155 @@
+import json
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# ==== Geometri Kecamatan (pra-sederhana per zoom) ====
+# Poligon asli ~1,5 MB; untuk peta cukup disederhanakan sekitar satu piksel layar pada zoom tujuan.
+# Penyederhanaan memakai coverage_simplify (batas bersama antar-kecamatan disederhanakan sekali, jadi tidak
+# muncul celah/tumpang tindih), lalu koordinat dibulatkan ke grid desimal sesuai toleransi.
+# Tiap level dipakai sampai zoom level berikutnya, jadi galat batas paling besar ~2 piksel
+# (level terakhir dipakai sampai zoom maksimum peta).
+FILE_KECAMATAN = os.environ.get("SPKLU_KECAMATAN", "kecamatan_bandung_ulp.geojson")
+ZOOM_LEVEL = (12, 14, 16)
+
+_fitur = None       # (properti per kecamatan, array poligon asli, STRtree poligon)
+_geojson = {}       # zoom level -> FeatureCollection sederhana (dict)
+_penempatan = {}    # versi registri lokasi -> kecamatan per SPKLU
+_kunci = threading.Lock()
+
+
+def toleransi(zoom):
+    """Ukuran satu piksel (derajat) pada `zoom` Web Mercator: batas detail yang masih terlihat."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def desimal(tol):
+    """Banyak desimal koordinat supaya langkah grid tidak lebih dari setengah toleransi."""
+    return max(0, math.ceil(-math.log10(tol / 2)))
+
+
+def level_zoom(zoom):
+    """Level pra-sederhana untuk `zoom` peta: level terbesar yang tidak melebihi zoom (minimal level terkecil)."""
+    cocok = [z for z in ZOOM_LEVEL if z <= zoom]
+    return cocok[-1] if cocok else ZOOM_LEVEL[0]
+
+
+def _muat():
+    global _fitur
+    if _fitur is None:
+        with open(FILE_KECAMATAN) as f:
+            fitur = json.load(f)["features"]
+        properti = [dict(ft["properties"]) for ft in fitur]
+        geom = np.array([shapely.geometry.shape(ft["geometry"]) for ft in fitur])
+        _fitur = (properti, geom, shapely.STRtree(geom))
+    return _fitur
+
+
+def _sederhanakan(geom, zoom):
+    tol = toleransi(zoom)
+    grid = 10.0 ** -desimal(tol)
+    hasil = shapely.set_precision(shapely.coverage_simplify(geom, tol), grid)
+    # Snap ke grid sudah dilakukan set_precision; pembulatan ulang membuat angka JSON-nya pendek
+    return shapely.transform(hasil, lambda xy: np.round(xy, desimal(tol)))
+
+
+def geometri(zoom=ZOOM_LEVEL[0]):
+    """
+    FeatureCollection kecamatan untuk `zoom` peta (lihat level_zoom), dibangun sekali per level
+    (semua level sekaligus lewat hangatkan) dan dibagi semua sesi. Properti asli ditambah "idx"
+    (posisi kecamatan, kunci nilai choropleth).
+    """
+    level = level_zoom(zoom)
+    with _kunci:
+        if level not in _geojson:
+            properti, geom, _ = _muat()
+            _geojson[level] = {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "properties": {**p, "idx": i}, "geometry": shapely.geometry.mapping(g)}
+                    for i, (p, g) in enumerate(zip(properti, _sederhanakan(geom, level)))
+                ],
+            }
+        return _geojson[level]
+
+
+def hangatkan():
+    """
+    Bangun geometri sederhana semua level (dan STRtree penempatan) di thread latar saat aplikasi mulai,
+    sehingga peta berwarna dan perubahan zoom tidak menunggu penyederhanaan poligon.
+    """
+    if all(z in _geojson for z in ZOOM_LEVEL):
+        return
+
+    def _coba():
+        try:
+            for zoom in ZOOM_LEVEL:
+                geometri(zoom)
+        except Exception as e:
+            logger.warning("Geometri kecamatan gagal dihangatkan: %s", e)
+
+    threading.Thread(target=_coba, daemon=True).start()
+
+
+def kecamatan_titik(lat, lon):
+    """
+    Posisi kecamatan yang memuat tiap titik (lat, lon); -1 bila di luar semua kecamatan.
+    Kandidat poligon diambil dari STRtree (kotak batas), lalu diuji tepat; titik di batas dua
+    kecamatan masuk ke kecamatan dengan posisi terkecil.
+    """
+    _, _, pohon = _muat()
+    titik = shapely.points(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    i_titik, i_poligon = pohon.query(titik, predicate="within")
+    idx = np.full(len(titik), -1, dtype=np.int64)
+    urut = np.lexsort((i_poligon, i_titik))
+    pertama = np.unique(i_titik[urut], return_index=True)[1]
+    idx[i_titik[urut][pertama]] = i_poligon[urut][pertama]
+    return idx
+
+
+def penempatan(registri):
+    """
+    Kecamatan tiap SPKLU di registri lokasi (index "ID Lokasi"): "Kode Kecamatan" (posisi fitur GeoJSON,
+    -1 di luar) dan "Kecamatan" (kosong bila di luar). Dihitung sekali per versi registri; total per
+    kecamatan cukup groupby atas kolom ini. ULP tidak diambil dari GeoJSON (propertinya tidak terisi),
+    tetapi dari Wilayah dimensi SPKLU (lihat peta.gabung_lokasi).
+    """
+    with _kunci:
+        if registri.versi not in _penempatan:
+            properti, _, _ = _muat()
+            idx = kecamatan_titik(registri.lokasi["LAT"], registri.lokasi["LON"])
+            nama = np.array([p.get("nama_kecamatan") for p in properti] + [None], dtype=object)
+            _penempatan[registri.versi] = pd.DataFrame(
+                {"Kode Kecamatan": idx, "Kecamatan": nama[idx]}, index=registri.lokasi.index
+            )
+        return _penempatan[registri.versi]
+
+
+def total_wilayah(df_map, kolom, level="Kecamatan"):
+    """
+    Jumlah `kolom` dan banyak SPKLU per `level` ("Kecamatan" / "ULP") dari df_map hasil peta.gabung_lokasi;
+    SPKLU tanpa nilai `level` tidak dihitung.
+    """
+    grup = df_map.groupby(level)
+    hasil = grup[kolom].sum()
+    hasil["Jumlah SPKLU"] = grup.size()
+    return hasil
+
+
+def nilai_kecamatan(df_map, kolom):
+    """
+    Seperti total_wilayah per kecamatan, tetapi satu baris untuk setiap fitur GeoJSON
+    (index = posisi kecamatan, kecamatan tanpa SPKLU bernilai 0), untuk choropleth.
+    """
+    properti, _, _ = _muat()
+    hasil = total_wilayah(df_map[df_map["Kode Kecamatan"] >= 0], kolom, "Kode Kecamatan")
+    hasil = hasil.reindex(range(len(properti)), fill_value=0)
+    hasil.insert(0, "Kecamatan", [p.get("nama_kecamatan") for p in properti])
+    return hasil
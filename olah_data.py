@@ -0,0 +1,235 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ==== Skema Tipe Data ====
+# Tipe per kolom: "kategori" (category), "teks" (string biasa), "angka" (diturunkan ke tipe terkecil)
+SKEMA = {
+    "data2": {
+        "Nama SPKLU": "kategori", "Bulan & Tahun": "kategori", "Charger_ID": "kategori",
+        "Jumlah Transaksi": "angka", "Jumlah KWH": "angka", "Total Pendapatan": "angka",
+    },
+    "data4": {
+        "Nama SPKLU": "kategori", "Wilayah": "kategori", "Kategori": "kategori", "Kapasitas": "kategori",
+    },
+    "data5": {
+        "No": "angka", "TGL BAYAR": "teks", "NAMA_SPKLU": "kategori", "UNITUP": "kategori",
+    },
+    "excel": {
+        "No": "angka", "UNITUP": "kategori", "NAMA_SPKLU": "kategori", "TGL BAYAR": "teks",
+        "PEMKWH": "angka", "RP PERKWH": "angka", "RPKWH": "angka", "RPTOTAL": "angka",
+    },
+}
+
+
+def argumen_pembaca(skema, kolom_mentah):
+    """
+    Argumen `usecols` dan `dtype` untuk read_csv/read_excel dari nama kolom mentah
+    (nama di file bisa mengandung spasi di tepi).
+    """
+    dipakai = [k for k in kolom_mentah if str(k).strip() in skema]
+    tipe = {"kategori": "category", "teks": str}
+    dtype = {k: tipe[skema[str(k).strip()]] for k in dipakai if skema[str(k).strip()] in tipe}
+    return {"usecols": dipakai, "dtype": dtype}
+
+
+def turunkan_angka(s):
+    """Turunkan kolom numerik ke tipe terkecil yang tidak mengubah nilainya."""
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+    if pd.api.types.is_float_dtype(s):
+        nilai = s.to_numpy()
+        if not np.isnan(nilai).any() and (nilai % 1 == 0).all():
+            return pd.to_numeric(s.astype(np.int64), downcast="integer")
+        if np.array_equal(nilai.astype(np.float32).astype(np.float64), nilai, equal_nan=True):
+            return s.astype(np.float32)
+    return s
+
+
+def terapkan_skema(df, skema):
+    """
+    Turunkan kolom "angka" dan catat memori frame sebelum/sesudah (byte) di df.attrs["memori"].
+    "Sebelum" adalah perkiraan memori bila dibaca tanpa skema (string biasa, angka 64-bit).
+    """
+    sebelum = 0
+    for kolom in df.columns:
+        jenis = skema.get(kolom)
+        if jenis == "kategori":
+            sebelum += df[kolom].astype(str).memory_usage(deep=True, index=False)
+        elif jenis == "angka":
+            sebelum += len(df) * 8
+            df[kolom] = turunkan_angka(df[kolom])
+        else:
+            sebelum += df[kolom].memory_usage(deep=True, index=False)
+    df.attrs["memori"] = (int(sebelum), int(df.memory_usage(deep=True, index=False).sum()))
+    return df
+
+
+# ==== Normalisasi Periode "Bulan & Tahun" ====
+# Mapping nama bulan Indonesia ke angka
+BULAN_MAP = {
+    "Januari": 1, "Februari": 2, "Maret": 3, "April": 4,
+    "Mei": 5, "Juni": 6, "Juli": 7, "Agustus": 8,
+    "September": 9, "Oktober": 10, "November": 11, "Desember": 12
+}
+
+
+def tabel_periode(label):
+    """
+    Tabel periode dari label unik "Bulan Tahun", terurut secara waktu.
+    Kolom: Bulan & Tahun, Bulan, Tahun, BulanNum, key (Tahun*12+BulanNum), Periode (Period[M]).
+    Label yang tidak bisa dibaca dibuang.
+    """
+    tabel = pd.DataFrame({"Bulan & Tahun": pd.Index(label, dtype=object).unique()})
+    bagian = tabel["Bulan & Tahun"].astype(str).str.strip().str.split(" ", n=1, expand=True)
+    tabel["Bulan"] = bagian[0]
+    tabel["Tahun"] = pd.to_numeric(bagian[1] if 1 in bagian else None, errors="coerce")
+    tabel["BulanNum"] = tabel["Bulan"].map(BULAN_MAP)
+    tabel = tabel.dropna(subset=["Tahun", "BulanNum"])
+    tabel["Tahun"] = tabel["Tahun"].astype(int)
+    tabel["BulanNum"] = tabel["BulanNum"].astype(int)
+    tabel["key"] = tabel["Tahun"] * 12 + tabel["BulanNum"]
+    tabel["Periode"] = pd.PeriodIndex.from_fields(year=tabel["Tahun"], month=tabel["BulanNum"], freq="M")
+    return tabel.sort_values("key").reset_index(drop=True)
+
+
+def normalisasi_periode(df, kolom="Bulan & Tahun"):
+    """
+    Parse kolom "Bulan & Tahun" sekali saat data dimuat.
+    String hanya dipecah per label unik (bukan per baris), lalu hasilnya disebar lewat kode kategori.
+    Kolom `kolom` menjadi kategori terurut secara waktu, dan ditambahkan kolom
+    Bulan, Tahun, BulanNum, key dan Periode. Urutan baris tidak diubah.
+    """
+    tabel = tabel_periode(df[kolom].dropna())
+    kode = pd.Index(tabel["Bulan & Tahun"]).get_indexer(df[kolom])
+    if (kode < 0).any():
+        logger.warning("%d baris dengan %s tidak valid dibuang", int((kode < 0).sum()), kolom)
+        df = df[kode >= 0]
+        kode = kode[kode >= 0]
+
+    df = df.copy()
+    df[kolom] = pd.Categorical.from_codes(kode, categories=tabel["Bulan & Tahun"], ordered=True)
+    df["Bulan"] = pd.Categorical(
+        tabel["Bulan"].to_numpy()[kode],
+        categories=[b for b in BULAN_MAP if b in set(tabel["Bulan"])],
+        ordered=True,
+    )
+    df["Tahun"] = tabel["Tahun"].to_numpy()[kode]
+    df["BulanNum"] = tabel["BulanNum"].to_numpy()[kode]
+    df["key"] = tabel["key"].to_numpy()[kode]
+    df["Periode"] = pd.PeriodIndex(tabel["Periode"]).take(kode)
+    return df.reset_index(drop=True)
+
+
+def daftar_periode(df, kolom="Bulan & Tahun"):
+    """Tabel periode untuk frame yang sudah dinormalisasi (dibaca dari kategori, tanpa scan baris)."""
+    return tabel_periode(df[kolom].cat.categories)
+
+
+# ==== Normalisasi Charger (Kapasitas & Kategori) ====
+# Ranking kategori charger; label pendek ("Fast") dan panjang ("Fast Charging") dianggap sama
+KATEGORI_RANK = {
+    "ultra fast": 3,
+    "fast": 2,
+    "medium": 1,
+    "slow": 0,
+    "standard": 0,
+}
+
+
+def kapasitas_kw(label):
+    """
+    Kapasitas numerik (kW) dari label seperti "22kW", "60 kW" atau "7,4 KW" (koma = desimal).
+    Label tanpa angka menjadi NaN.
+    """
+    angka = pd.Series(label, dtype=object).astype(str).str.extract(r"(\d+(?:[.,]\d+)?)")[0]
+    return pd.to_numeric(angka.str.replace(",", ".", regex=False), errors="coerce").to_numpy(dtype=float)
+
+
+def rank_kategori(label):
+    """Rank ordinal kategori charger (lihat KATEGORI_RANK); label tidak dikenal bernilai -1."""
+    kunci = (
+        pd.Series(label, dtype=object).astype(str).str.strip().str.lower()
+        .str.replace(r"\s+charging$", "", regex=True)
+    )
+    return kunci.map(KATEGORI_RANK).fillna(-1).to_numpy(dtype=np.int8)
+
+
+def _per_kategori(s, fungsi, kosong):
+    """Terapkan `fungsi` pada label unik (kategori) saja, lalu sebar ke baris lewat kode kategori."""
+    kat = pd.Categorical(s)
+    hasil = fungsi(kat.categories)
+    return np.append(hasil, kosong).astype(hasil.dtype)[kat.codes]
+
+
+def ringkasan_charger(df):
+    """
+    Ringkasan per SPKLU dari df4 yang sudah disiapkan, hanya dengan reduksi grup:
+    Kapasitas_Max, Kapasitas_Mean, Jumlah_Tipe (kapasitas berbeda) dan Kategori tertinggi
+    ("Unknown" bila SPKLU tidak punya kategori).
+    """
+    grup = df.groupby("Nama SPKLU", observed=True)
+    ringkas = grup["Kapasitas"].agg(["max", "mean", "nunique"])
+    ringkas.columns = ["Kapasitas_Max", "Kapasitas_Mean", "Jumlah_Tipe"]
+
+    # Kategori tertinggi: urutkan rank turun (stabil, seri -> baris pertama), ambil baris pertama per SPKLU
+    urut = df[df["Kategori"].notna()].sort_values("Rank Kategori", ascending=False, kind="stable")
+    tertinggi = urut.groupby("Nama SPKLU", observed=True)["Kategori"].first()
+    ringkas["Kategori"] = tertinggi.astype(object).reindex(ringkas.index).fillna("Unknown")
+    return ringkas
+
+
+def dimensi_spklu(df):
+    """
+    Tabel dimensi SPKLU dari df4: satu baris per SPKLU dengan kunci integer "ID SPKLU" (index),
+    Wilayah (ULP; baris pertama bila charger tersebar), ringkasan kapasitas dan kategori tertinggi.
+    """
+    dim = ringkasan_charger(df)
+    dim.insert(0, "Wilayah", df.groupby("Nama SPKLU", observed=True)["Wilayah"].first())
+    dim = dim.reset_index()
+    dim.index.name = "ID SPKLU"
+    return dim
+
+
+def gabung_dimensi(df, dim, kolom):
+    """
+    Tempel `kolom` dari tabel dimensi ke frame fakta lewat kunci integer "ID SPKLU" (tanpa merge),
+    sehingga hasilnya tetap satu baris per baris df. SPKLU yang tidak ada di dimensi mendapat ID -1
+    dan nilai kosong.
+    """
+    kode = pd.Index(dim["Nama SPKLU"]).get_indexer(df["Nama SPKLU"])
+    df = df.copy()
+    df["ID SPKLU"] = kode
+    for k in kolom:
+        df[k] = dim[k].reindex(kode).set_axis(df.index)
+    return df
+
+
+def unit_kategori(df):
+    """Jumlah unit charger per (SPKLU, Kategori), hanya pasangan yang ada (pengganti value_counts per SPKLU)."""
+    return df.groupby(["Nama SPKLU", "Kategori"], observed=True).size()
+
+
+# ==== Persiapan per Sheet ====
+def siapkan_data2(df):
+    """Persiapan data transaksi bulanan (df2) yang dijalankan sekali per pengambilan."""
+    if "Bulan & Tahun" in df.columns:
+        df = normalisasi_periode(df)
+    return df
+
+
+def siapkan_data4(df):
+    """
+    Persiapan data charger (df4) yang dijalankan sekali per pengambilan:
+    Kapasitas menjadi angka kW dan ditambah kolom ordinal "Rank Kategori".
+    Parsing hanya per label unik, bukan per baris.
+    """
+    df = df.copy()
+    if "Kapasitas" in df.columns:
+        df["Kapasitas"] = _per_kategori(df["Kapasitas"], kapasitas_kw, np.nan)
+    if "Kategori" in df.columns:
+        df["Rank Kategori"] = _per_kategori(df["Kategori"], rank_kategori, -1)
+    return df
@@ -0,0 +1,175 @@
+import copy
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.colormap import LinearColormap
+from folium.plugins import MarkerCluster
+
+import kecamatan
+
+# ==== Peta Lokasi SPKLU ====
+# Peta dasar (semua marker + popup) dibangun sekali per periode dan di-cache oleh halaman;
+# SPKLU terpilih hanya ditandai lewat satu FeatureGroup kecil di atas peta dasar.
+PUSAT = [-6.92, 107.62]
+ZOOM = 12
+KOLOM_NILAI = ["Jumlah Transaksi", "Total kWh", "Total Pendapatan"]
+
+POPUP = """
+<div style="font-family: Arial; font-size: 13px; line-height: 1.5">
+    <strong>{nama}</strong><br>
+    {periode}<br><br>
+    <table style="width: 250px">
+        <tr><td>🔁 Jumlah Transaksi:</td><td><strong>{transaksi:,}</strong></td></tr>
+        <tr><td>⚡ Total kWh:</td><td><strong>{kwh}</strong></td></tr>
+        <tr><td>💰 Total Pendapatan:</td><td><strong>Rp {pendapatan:,.0f}</strong></td></tr>
+    </table>
+</div>
+"""
+
+
+def gabung_lokasi(registri, summary, kunci="NAMA_SPKLU", dimensi=None):
+    """
+    Lokasi registri (ID Lokasi, NAMA_SPKLU, LAT, LON) + kecamatan (penempatan cache) + nilai ringkasan
+    per SPKLU, digabung lewat ID lokasi (nama di sheet dicocokkan ke registri); SPKLU tanpa transaksi bernilai 0.
+    Bila `dimensi` (olah_data.dimensi_spklu) diisi, kolom "ULP" = Wilayah SPKLU di df4 (kosong bila tidak ada).
+    """
+    nilai = summary[KOLOM_NILAI].groupby(registri.id_kolom(summary[kunci])).sum()
+    df_map = registri.lokasi.join(kecamatan.penempatan(registri)).join(nilai)
+    if dimensi is not None:
+        id_lokasi = registri.id_kolom(dimensi["Nama SPKLU"])
+        ulp = pd.Series(dimensi["Wilayah"].astype(object).to_numpy(), index=id_lokasi)
+        df_map["ULP"] = ulp[(id_lokasi >= 0) & ~ulp.index.duplicated()]
+    df_map = df_map.reset_index()
+    df_map[KOLOM_NILAI] = df_map[KOLOM_NILAI].fillna(0)
+    return df_map
+
+
+def popup_html(df_map, periode, format_kwh="{:,.0f}"):
+    """
+    HTML popup semua baris df_map dalam satu lintasan atas array kolom.
+    `periode` = baris keterangan periode (HTML), `format_kwh` = format angka kWh.
+    """
+    transaksi = df_map["Jumlah Transaksi"].to_numpy(dtype=np.float64).astype(np.int64)
+    kwh = df_map["Total kWh"].to_numpy(dtype=np.float64)
+    pendapatan = df_map["Total Pendapatan"].to_numpy(dtype=np.float64)
+    return [
+        POPUP.format(nama=n, periode=periode, transaksi=t, kwh=format_kwh.format(k), pendapatan=p)
+        for n, t, k, p in zip(df_map["NAMA_SPKLU"].to_numpy(), transaksi.tolist(), kwh.tolist(), pendapatan.tolist())
+    ]
+
+
+def _marker(nama, lat, lon, html, warna):
+    return folium.Marker(
+        location=[lat, lon],
+        popup=folium.Popup(html, max_width=300),
+        tooltip=nama,
+        icon=folium.Icon(color=warna, icon="bolt", prefix="fa"),
+    )
+
+
+def _nilai_warna(df_map, kolom):
+    nilai = kecamatan.nilai_kecamatan(df_map, ["Total kWh", "Total Pendapatan"])
+    skala = LinearColormap(["#f7fbff", "#6baed6", "#08306b"], vmin=0, vmax=max(float(nilai[kolom].max()), 1.0),
+                           caption=f"{kolom} per Kecamatan")
+    return nilai, skala
+
+
+def legenda_kecamatan(df_map, kolom):
+    """Legenda warna choropleth kecamatan untuk `kolom` (skala yang sama dengan lapisan_kecamatan)."""
+    return _nilai_warna(df_map, kolom)[1]
+
+
+def lapisan_kecamatan(df_map, kolom, zoom=ZOOM):
+    """
+    FeatureGroup choropleth kecamatan berwarna menurut jumlah `kolom` SPKLU di dalamnya, dengan geometri
+    pra-sederhana untuk `zoom`. Dikirim ke st_folium lewat `feature_group_to_add`, sehingga ganti level
+    zoom hanya mengganti lapisan ini, bukan peta dasar.
+    """
+    nilai, skala = _nilai_warna(df_map, kolom)
+    warna = [skala(v) for v in nilai[kolom].tolist()]
+
+    # Geometri dibagi dengan cache kecamatan; hanya properti tooltip yang dibuat per peta (satu lintasan array)
+    fc = kecamatan.geometri(zoom)
+    fitur = [
+        {**f, "properties": {
+            "idx": f["properties"]["idx"], "Kecamatan": nama, "Jumlah SPKLU": jumlah,
+            "Total kWh": f"{kwh:,.0f}", "Total Pendapatan": f"Rp {pendapatan:,.0f}",
+        }}
+        for f, nama, jumlah, kwh, pendapatan in zip(
+            fc["features"], nilai["Kecamatan"].tolist(),
+            nilai["Jumlah SPKLU"].to_numpy(dtype=np.int64).tolist(),
+            nilai["Total kWh"].to_numpy(dtype=np.float64).tolist(),
+            nilai["Total Pendapatan"].to_numpy(dtype=np.float64).tolist(),
+        )
+    ]
+
+    fg = folium.FeatureGroup(name="Kecamatan")
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": fitur},
+        name="Kecamatan",
+        style_function=lambda f: {
+            "fillColor": warna[f["properties"]["idx"]], "fillOpacity": 0.6, "color": "#555555", "weight": 1,
+        },
+        highlight_function=lambda f: {"weight": 3, "fillOpacity": 0.8},
+        tooltip=folium.GeoJsonTooltip(["Kecamatan", "Jumlah SPKLU", "Total kWh", "Total Pendapatan"]),
+    ).add_to(fg)
+    return fg
+
+
+def peta_dasar(df_map, periode, format_kwh="{:,.0f}", warna=None):
+    """
+    Peta dengan semua SPKLU (marker hijau dalam MarkerCluster); bila `warna` diisi ("Total kWh" /
+    "Total Pendapatan"), peta diberi legenda warna kecamatan untuk kolom itu (lapisannya sendiri
+    dari lapisan_kecamatan, sesuai zoom).
+    """
+    m = folium.Map(location=PUSAT, zoom_start=ZOOM)
+    if warna:
+        legenda_kecamatan(df_map, warna).add_to(m)
+    cluster = MarkerCluster().add_to(m)
+    nama = df_map["NAMA_SPKLU"].to_numpy()
+    for n, lat, lon, html in zip(nama, df_map["LAT"].tolist(), df_map["LON"].tolist(),
+                                 popup_html(df_map, periode, format_kwh)):
+        _marker(n, lat, lon, html, "green").add_to(cluster)
+    return m
+
+
+def peta_kosong():
+    """Peta tanpa lapisan, untuk lapisan yang dikirim terpisah lewat `feature_group_to_add`."""
+    return folium.Map(location=PUSAT, zoom_start=ZOOM)
+
+
+def lapisan_grid(sel, satuan="titik"):
+    """
+    FeatureGroup lingkaran untuk sel piramida (lat, lon, jumlah): satu lingkaran per sel di titik pusatnya,
+    ukuran menurut log banyak titik.
+    """
+    fg = folium.FeatureGroup(name="Sel grid")
+    for jumlah, lat, lon in zip(sel["jumlah"].tolist(), sel["lat"].tolist(), sel["lon"].tolist()):
+        folium.CircleMarker(
+            location=[lat, lon], radius=6 + 4 * float(np.log10(jumlah)), weight=1, color="#1d3557",
+            fill=True, fill_color="#457b9d", fill_opacity=0.6, tooltip=f"{jumlah:,} {satuan}",
+        ).add_to(fg)
+    return fg
+
+
+def salinan(m):
+    """
+    Salinan peta cache untuk dirender: render folium menambah script ke elemen peta,
+    jadi peta bersama tidak boleh dirender langsung. ID elemen ikut tersalin, sehingga HTML
+    hasil render tetap sama antar-rerun dan komponen peta di browser tidak dimuat ulang.
+    """
+    return copy.deepcopy(m)
+
+
+def sorotan(df_map, id_pilihan, periode, format_kwh="{:,.0f}"):
+    """
+    FeatureGroup berisi marker merah untuk SPKLU dengan ID lokasi `id_pilihan`;
+    kosong bila tidak ada. Dikirim ke st_folium lewat `feature_group_to_add`.
+    """
+    fg = folium.FeatureGroup(name="SPKLU terpilih")
+    cocok = df_map[df_map["ID Lokasi"] == id_pilihan]
+    for n, lat, lon, html in zip(cocok["NAMA_SPKLU"].to_numpy(), cocok["LAT"].tolist(), cocok["LON"].tolist(),
+                                 popup_html(cocok, periode, format_kwh)):
+        _marker(n, lat, lon, html, "red").add_to(fg)
+    return fg
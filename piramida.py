@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# ==== Piramida Grid Titik (klaster sisi server per zoom) ====
+# Titik dikelompokkan ke sel grid Web Mercator berukuran tetap di layar untuk setiap zoom. Level terhalus
+# dihitung dari titik, level di atasnya dari level di bawahnya (2x2 sel digabung), jadi biaya titik hanya
+# dibayar sekali. Peta hanya menerima sel yang tampak: jumlahnya dibatasi ukuran layar, bukan banyak titik.
+ZOOM_MIN = 8
+ZOOM_MAX = 18
+UKURAN_SEL = 64   # piksel layar per sisi sel
+
+
+def _mercator(lat, lon):
+    """(lat, lon) derajat -> koordinat Web Mercator ternormalisasi (x, y) di [0, 1)."""
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    s = np.sin(np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)
+    return x, y
+
+
+def sel_per_sisi(zoom):
+    """Banyak sel per sisi dunia pada `zoom` (256 piksel per tile)."""
+    return 2 ** zoom * 256 // UKURAN_SEL
+
+
+def _indeks_sel(x, y, zoom):
+    n = sel_per_sisi(zoom)
+    return np.clip((x * n).astype(np.int64), 0, n - 1), np.clip((y * n).astype(np.int64), 0, n - 1)
+
+
+def _rapikan(level):
+    """Level mentah (jumlah & jumlahan koordinat per sel) -> sel dengan titik pusat rata-rata."""
+    sel = level.reset_index()
+    sel["lat"] = sel.pop("sum_lat") / sel["jumlah"]
+    sel["lon"] = sel.pop("sum_lon") / sel["jumlah"]
+    return sel
+
+
+def bangun(lat, lon, bobot=None, zoom_min=ZOOM_MIN, zoom_max=ZOOM_MAX):
+    """
+    Piramida sel untuk titik (lat, lon): dict zoom -> DataFrame (cx, cy, jumlah, bobot, lat, lon),
+    dengan `jumlah` = banyak titik, `bobot` = jumlah `bobot` titik (default 1) dan (lat, lon) = pusat rata-rata
+    titik di sel. Titik tanpa koordinat dilewati.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    bobot = np.ones(len(lat)) if bobot is None else np.asarray(bobot, dtype=np.float64)
+    ada = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon, bobot = lat[ada], lon[ada], bobot[ada]
+
+    cx, cy = _indeks_sel(*_mercator(lat, lon), zoom_max)
+    level = pd.DataFrame({
+        "cx": cx, "cy": cy, "jumlah": np.ones(len(lat), dtype=np.int64), "bobot": bobot, "sum_lat": lat, "sum_lon": lon,
+    }).groupby(["cx", "cy"]).sum()
+
+    piramida = {}
+    for zoom in range(zoom_max, zoom_min - 1, -1):
+        piramida[zoom] = _rapikan(level)
+        induk = level.index.get_level_values("cx") // 2, level.index.get_level_values("cy") // 2
+        level = level.groupby([induk[0].rename("cx"), induk[1].rename("cy")]).sum()
+    return piramida
+
+
+def sel_tampak(piramida, zoom, batas=None):
+    """
+    Sel piramida pada `zoom` (dibatasi ke level yang ada) yang tampak dalam `batas`
+    (selatan, barat, utara, timur); semua sel level itu bila `batas` None.
+    """
+    zoom = int(min(max(zoom, min(piramida)), max(piramida)))
+    sel = piramida[zoom]
+    if batas is None:
+        return zoom, sel
+    selatan, barat, utara, timur = batas
+    x0, y0 = _indeks_sel(*_mercator([utara], [barat]), zoom)
+    x1, y1 = _indeks_sel(*_mercator([selatan], [timur]), zoom)
+    tampak = sel["cx"].between(x0[0], x1[0]) & sel["cy"].between(y0[0], y1[0])
+    return zoom, sel[tampak.to_numpy()]
+
+
+if __name__ == "__main__":
+    # Ukuran kiriman tetap datar: jumlah sel tampak vs. banyak titik
+    import time
+
+    rng = np.random.default_rng(0)
+    batas = (-6.98, 107.55, -6.85, 107.75)
+    for n in (10_000, 100_000, 1_000_000):
+        lat = rng.normal(-6.92, 0.03, n)
+        lon = rng.normal(107.62, 0.04, n)
+        mulai = time.perf_counter()
+        p = bangun(lat, lon)
+        bangun_detik = time.perf_counter() - mulai
+        mulai = time.perf_counter()
+        _, sel = sel_tampak(p, 12, batas)
+        print(f"{n:>9,} titik: bangun {bangun_detik:6.2f} s, sel tampak zoom 12 = {len(sel):3d} "
+              f"({(time.perf_counter() - mulai) * 1000:.2f} ms)")
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+# ==== Prediksi Rekursif Berbasis Array (XGBoost) ====
+# Urutan kolom fitur harus sama dengan saat model dilatih
+FITUR_HARIAN = ["dayofweek", "month", "lag1", "lag2", "lag3", "lag7"]
+FITUR_BULANAN = ["month", "year", "lag1", "lag2", "lag3", "lag6", "lag12"]
+
+# Fitur kalender dihitung dari tanggal langkah prediksi
+KALENDER = {
+    "dayofweek": lambda t: t.dayofweek,
+    "month": lambda t: t.month,
+    "year": lambda t: t.year,
+}
+
+
+def _booster(model):
+    """Booster mentah dari XGBRegressor (atau Booster itu sendiri), untuk inplace_predict tanpa DMatrix."""
+    return model.get_booster() if hasattr(model, "get_booster") else model
+
+
+def prediksi_rekursif(model, riwayat, langkah, fitur, minimum=0.0):
+    """
+    Prediksi rekursif banyak seri sekaligus (mis. semua SPKLU), satu panggilan model per langkah.
+
+    `riwayat`: array (n_seri, panjang) atau 1-D untuk satu seri, nilai terakhir = paling baru.
+    `langkah`: DatetimeIndex tanggal yang diprediksi (panjang = horizon).
+    `fitur`: nama kolom fitur model, berisi fitur KALENDER dan "lagN".
+
+    State lag disimpan di ring buffer NumPy berukuran lag terbesar, jadi tiap langkah hanya
+    mengindeks array. Bila riwayat lebih pendek dari N, lagN memakai nilai terakhir.
+    Hasil (n_seri, horizon) dipotong ke `minimum`, tetapi rekursi tetap memakai nilai mentah.
+    """
+    riwayat = np.atleast_2d(np.asarray(riwayat, dtype=np.float64))
+    n_seri = riwayat.shape[0]
+    booster = _booster(model)
+
+    lag = {j: int(nama[3:]) for j, nama in enumerate(fitur) if nama.startswith("lag")}
+    kalender = {j: KALENDER[nama] for j, nama in enumerate(fitur) if nama in KALENDER}
+    lebar = max(lag.values())
+
+    # Ring buffer: `lebar` nilai terakhir per seri, `ujung` = posisi tulis berikutnya
+    buffer = np.zeros((n_seri, lebar))
+    ada = min(riwayat.shape[1], lebar)
+    buffer[:, :ada] = riwayat[:, riwayat.shape[1] - ada:]
+    ujung = ada % lebar
+
+    X = np.empty((n_seri, len(fitur)))
+    hasil = np.empty((n_seri, len(langkah)))
+    for h, tanggal in enumerate(langkah):
+        for j, fungsi in kalender.items():
+            X[:, j] = fungsi(tanggal)
+        for j, L in lag.items():
+            X[:, j] = buffer[:, (ujung - (L if ada >= L else 1)) % lebar]
+
+        yhat = booster.inplace_predict(X)
+        buffer[:, ujung] = yhat
+        ujung = (ujung + 1) % lebar
+        ada = min(ada + 1, lebar)
+        hasil[:, h] = yhat
+
+    return np.maximum(hasil, minimum) if minimum is not None else hasil
+
+
+# ==== Deret Transaksi & Ramalan Horizon Maksimum ====
+# Ramalan dihitung sekali sampai batas slider; slider di halaman hanya memotong hasilnya
+HORIZON_HARIAN = 30     # batas "Pilih Prediksi Harian"
+HORIZON_BULANAN = 24    # batas "Pilih Prediksi Bulan Kedepan"
+MIN_HARI = 14
+MIN_BULAN = 6
+
+
+def _bertanggal(df5):
+    """Baris df5 dengan TGL BAYAR valid, ditambah kolom Tanggal (hari) dan Periode (awal bulan)."""
+    df = df5.dropna(subset=["TGL BAYAR"]).copy()
+    df["TGL BAYAR"] = pd.to_datetime(df["TGL BAYAR"], errors="coerce")
+    df = df.dropna(subset=["TGL BAYAR"])
+    df["Tanggal"] = df["TGL BAYAR"].dt.normalize()
+    df["Periode"] = df["TGL BAYAR"].dt.to_period("M").dt.to_timestamp(how="start")
+    return df
+
+
+def deret_transaksi(df5):
+    """
+    Jumlah transaksi unik ("No") per hari dan per bulan dari df5.
+    Hasil: `harian` (Tanggal, y) hanya hari yang ada datanya, `s` deret harian lengkap
+    (hari kosong = 0) dan `bulanan` (Periode awal bulan, y).
+    """
+    df = _bertanggal(df5)
+
+    harian = df.groupby("Tanggal")["No"].nunique().rename("y").reset_index()
+    s = harian.set_index("Tanggal")["y"].asfreq("D").fillna(0)
+    bulanan = df.groupby("Periode")["No"].nunique().rename("y").reset_index()
+    return harian, s, bulanan
+
+
+def ramal_harian(model, s, horizon=HORIZON_HARIAN):
+    """Ramalan harian (Tanggal, Prediksi) sampai `horizon`; lag dari hari yang semua lag-nya lengkap."""
+    riwayat = s.to_numpy()[7:]
+    langkah = pd.date_range(s.index[-1] + pd.Timedelta(days=1), periods=horizon, freq="D")
+    yhat = prediksi_rekursif(model, riwayat, langkah, FITUR_HARIAN)[0]
+    return pd.DataFrame({"Tanggal": langkah, "Prediksi": yhat})
+
+
+def ramal_bulanan(model, bulanan, horizon=HORIZON_BULANAN):
+    """
+    Ramalan bulanan (Periode, Forecast) sampai `horizon`; lag dari bulan yang semua lag-nya lengkap.
+    None bila riwayat belum cukup untuk lag 12 bulan.
+    """
+    riwayat = bulanan["y"].to_numpy()[12:]
+    if len(riwayat) == 0:
+        return None
+    langkah = pd.date_range(bulanan["Periode"].iloc[-1] + pd.offsets.MonthBegin(1), periods=horizon, freq="MS")
+    yhat = prediksi_rekursif(model, riwayat, langkah, FITUR_BULANAN)[0]
+    return pd.DataFrame({"Periode": langkah, "Forecast": yhat})
+
+
+def ramalan(df5, model_harian, model_bulanan):
+    """Deret transaksi dan ramalan horizon maksimum (None bila data terlalu sedikit)."""
+    harian, s, bulanan = deret_transaksi(df5)
+    return {
+        "harian": harian,
+        "s": s,
+        "bulanan": bulanan,
+        "pred_harian": ramal_harian(model_harian, s) if len(harian) >= MIN_HARI else None,
+        "pred_bulanan": ramal_bulanan(model_bulanan, bulanan) if len(bulanan) >= MIN_BULAN else None,
+    }
+
+
+# ==== Ramalan per SPKLU / ULP ====
+# Model dilatih pada deret jaringan, jadi deret satu entitas tidak boleh langsung dimasukkan: tiap deret
+# diskalakan ke level total (dibagi porsinya), diramal bersama dalam satu batch (satu panggilan booster per
+# langkah untuk seluruh baris), dikalikan kembali porsinya, lalu direkonsiliasi sehingga jumlah semua entitas
+# per langkah sama dengan ramalan deret totalnya.
+ENTITAS = {"Nama SPKLU": "NAMA_SPKLU", "ULP": "UNITUP"}
+JENDELA_PORSI_HARIAN = 28    # hari terakhir untuk porsi entitas
+JENDELA_PORSI_BULANAN = 12   # bulan terakhir untuk porsi entitas
+
+
+def matriks_transaksi(df5, kolom="NAMA_SPKLU"):
+    """
+    Transaksi unik per entitas (`kolom`) per hari dan per bulan, pada sumbu waktu yang sama dengan
+    deret jaringan (hari tanpa transaksi = 0; bulan = bulan yang ada datanya di jaringan).
+    Hasil: (entitas, tanggal, harian (n_entitas, n_hari), periode, bulanan (n_entitas, n_bulan)).
+    """
+    df = _bertanggal(df5).dropna(subset=[kolom])
+    tanggal = pd.date_range(df["Tanggal"].min(), df["Tanggal"].max(), freq="D")
+    periode = pd.DatetimeIndex(np.sort(df["Periode"].unique()))
+
+    def pivot(waktu, sumbu):
+        tabel = df.groupby([kolom, waktu], observed=True)["No"].nunique().unstack(fill_value=0)
+        return tabel.reindex(columns=sumbu, fill_value=0)
+
+    harian = pivot("Tanggal", tanggal)
+    bulanan = pivot("Periode", periode).reindex(harian.index, fill_value=0)
+    return harian.index, tanggal, harian.to_numpy(dtype=np.float64), periode, bulanan.to_numpy(dtype=np.float64)
+
+
+def ramal_porsi(model, riwayat, langkah, fitur, jendela):
+    """
+    Ramalan (n_entitas, horizon) untuk baris `riwayat` yang jumlahnya membentuk deret total, beserta
+    ramalan deret total itu sendiri. Porsi entitas = bagiannya dari total pada `jendela` langkah terakhir
+    (seluruh riwayat bila jendela itu kosong); entitas berporsi 0 diramal 0.
+    """
+    total = riwayat.sum(axis=0)
+    bobot = riwayat[:, -jendela:].sum(axis=1)
+    if bobot.sum() <= 0:
+        bobot = riwayat.sum(axis=1)
+    hasil = np.zeros((riwayat.shape[0], len(langkah)))
+    if bobot.sum() <= 0:
+        return hasil, prediksi_rekursif(model, total, langkah, fitur)[0]
+
+    porsi = bobot / bobot.sum()
+    ada = porsi > 0
+    yhat = prediksi_rekursif(model, np.vstack([total, riwayat[ada] / porsi[ada, None]]), langkah, fitur)
+    hasil[ada] = yhat[1:] * porsi[ada, None]
+
+    # Rekonsiliasi: model tidak linear, jadi jumlah ramalan berskala disamakan ke ramalan total per langkah
+    jumlah = hasil.sum(axis=0)
+    hasil *= np.divide(yhat[0], jumlah, out=np.zeros_like(jumlah), where=jumlah > 0)
+    return hasil, yhat[0]
+
+
+def ramalan_entitas(df5, model_harian, model_bulanan, kolom="NAMA_SPKLU"):
+    """
+    Ramalan horizon maksimum untuk setiap entitas sekaligus (lihat ramal_porsi), dengan aturan lag yang
+    sama dengan ramal_harian / ramal_bulanan. "total_harian" / "total_bulanan" = ramalan deret jumlah semua
+    entitas (sama dengan ramalan jaringan bila tiap transaksi punya entitas) dan sama dengan jumlah kolom
+    prediksi entitas. Prediksi None bila riwayat jaringan terlalu pendek.
+    """
+    entitas, tanggal, harian, periode, bulanan = matriks_transaksi(df5, kolom)
+    hasil = {
+        "entitas": entitas, "tanggal": tanggal, "harian": harian, "periode": periode, "bulanan": bulanan,
+        "langkah_harian": None, "pred_harian": None, "total_harian": None,
+        "langkah_bulanan": None, "pred_bulanan": None, "total_bulanan": None,
+    }
+    if len(entitas) == 0:
+        return hasil
+
+    if int((harian.sum(axis=0) > 0).sum()) >= MIN_HARI:
+        hasil["langkah_harian"] = pd.date_range(tanggal[-1] + pd.Timedelta(days=1), periods=HORIZON_HARIAN, freq="D")
+        hasil["pred_harian"], hasil["total_harian"] = ramal_porsi(
+            model_harian, harian[:, 7:], hasil["langkah_harian"], FITUR_HARIAN, JENDELA_PORSI_HARIAN
+        )
+    if len(periode) >= MIN_BULAN and bulanan.shape[1] > 12:
+        hasil["langkah_bulanan"] = pd.date_range(periode[-1] + pd.offsets.MonthBegin(1), periods=HORIZON_BULANAN, freq="MS")
+        hasil["pred_bulanan"], hasil["total_bulanan"] = ramal_porsi(
+            model_bulanan, bulanan[:, 12:], hasil["langkah_bulanan"], FITUR_BULANAN, JENDELA_PORSI_BULANAN
+        )
+    return hasil
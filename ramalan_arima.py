@@ -0,0 +1,197 @@
+import hashlib
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+# ==== ARIMA Inkremental dengan Cache ====
+ORDER_DEFAULT = (5, 1, 0)
+MAKS_CACHE = 16
+
+# Dibagi semua sesi dalam satu proses:
+# (sidik deret, order) -> HasilARIMA, dan per order fit terakhir (nilai deret, HasilARIMA) untuk append
+_cache = OrderedDict()
+_terakhir = {}
+_kunci = threading.Lock()
+
+
+@dataclass(frozen=True)
+class HasilARIMA:
+    """
+    Hasil fit ARIMA beserta cara memperolehnya.
+    `mode`: "fit" (fit penuh) atau "append" (fit sebelumnya diperbarui dengan observasi baru,
+    parameter lama sebagai titik awal optimasi); `baru` = banyak observasi yang ditambahkan;
+    `detik` = lama fit/append.
+    """
+    hasil: object
+    order: tuple
+    mode: str
+    baru: int
+    detik: float
+
+
+def sidik_deret(nilai):
+    """Sidik (sha256) isi deret; sama selama datanya tidak berubah."""
+    nilai = np.ascontiguousarray(nilai, dtype=np.float64)
+    return hashlib.sha256(nilai.tobytes()).hexdigest()[:16]
+
+
+def _fit(nilai, order):
+    """
+    Fit penuh, atau append dari fit terakhir bila deret hanya bertambah di ujung
+    (riwayat lama sama persis).
+    """
+    lama = _terakhir.get(order)
+    mulai = time.perf_counter()
+    if lama is not None and len(nilai) > len(lama[0]) and np.array_equal(nilai[:len(lama[0])], lama[0]):
+        baru = nilai[len(lama[0]):]
+        hasil = lama[1].hasil.append(baru, refit=True)
+        mode = "append"
+    else:
+        # Deret tanpa index tanggal (posisi 0..n-1): tanggal yang bolong tidak membuat predict gagal
+        baru = nilai
+        hasil = ARIMA(nilai, order=order).fit()
+        mode = "fit"
+    return HasilARIMA(hasil, order, mode, len(baru), time.perf_counter() - mulai)
+
+
+def fit_arima(nilai, order=ORDER_DEFAULT):
+    """
+    Hasil ARIMA untuk deret `nilai` (urut waktu), di-cache per sidik deret dan order.
+    Mengembalikan (HasilARIMA, dari_cache).
+    """
+    nilai = np.asarray(nilai, dtype=np.float64)
+    order = tuple(order)
+    kunci = (sidik_deret(nilai), order)
+    with _kunci:
+        if kunci in _cache:
+            _cache.move_to_end(kunci)
+            return _cache[kunci], True
+        hasil = _fit(nilai, order)
+        _simpan(kunci, nilai, hasil)
+    return hasil, False
+
+
+def _simpan(kunci, nilai, hasil):
+    """Masukkan fit ke cache dan jadikan titik awal append untuk order-nya (dipanggil dengan _kunci)."""
+    _cache[kunci] = hasil
+    _cache.move_to_end(kunci)
+    while len(_cache) > MAKS_CACHE:
+        _cache.popitem(last=False)
+    _terakhir[hasil.order] = (nilai, hasil)
+
+
+def ramal(hasil, langkah):
+    """Ramalan `langkah` titik setelah observasi terakhir (array)."""
+    return np.asarray(hasil.hasil.forecast(langkah))
+
+
+# ==== Pencarian Order Otomatis (AIC/BIC) ====
+GRID_P = range(0, 6)
+GRID_D = range(0, 3)
+GRID_Q = range(0, 3)
+KRITERIA = ("aic", "bic")
+
+# (sidik deret, grid) -> HasilOrder; tabel memuat AIC & BIC sekaligus, jadi ganti kriteria tanpa cari ulang.
+# _kunci_order hanya menjaga dict; pencarian dikunci per (sidik deret, grid), jadi sesi dengan deret lain
+# tidak ikut menunggu.
+_cache_order = OrderedDict()
+_kunci_cari = {}
+_kunci_order = threading.Lock()
+
+
+@dataclass(frozen=True)
+class HasilOrder:
+    """
+    Skor semua kandidat order: `tabel` = daftar (order, aic, bic) dengan skor inf untuk kandidat
+    yang gagal di-fit, `detik` = lama pencarian, `proses` = banyak proses yang dipakai.
+    """
+    tabel: tuple
+    detik: float
+    proses: int
+
+    def terbaik(self, kriteria="aic"):
+        """(order, skor) dengan skor `kriteria` terkecil; order None bila semua kandidat gagal."""
+        kolom = 1 + KRITERIA.index(kriteria)
+        baris = min(self.tabel, key=lambda b: b[kolom])
+        return (baris[0], baris[kolom]) if math.isfinite(baris[kolom]) else (None, math.inf)
+
+
+def grid_order(p=GRID_P, d=GRID_D, q=GRID_Q):
+    """Semua kandidat (p, d, q) dari rentang p, d, q."""
+    return tuple(itertools.product(p, d, q))
+
+
+def _skor_order(nilai, order):
+    """
+    Fit satu kandidat dan kembalikan (order, aic, bic, hasil fit, detik); dijalankan di proses pekerja.
+    Hasil fit None bila gagal.
+    """
+    mulai = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            hasil = ARIMA(nilai, order=order).fit()
+        return order, float(hasil.aic), float(hasil.bic), hasil, time.perf_counter() - mulai
+    except Exception:
+        return order, math.inf, math.inf, None, time.perf_counter() - mulai
+
+
+def cari_order(nilai, grid=None, max_workers=None):
+    """
+    Evaluasi semua kandidat order di process pool (satu fit per kandidat, paralel antar core).
+    Hasil di-cache per sidik deret dan grid, jadi pencarian hanya diulang saat data berubah. Fit order
+    terbaik (AIC dan BIC) dari pekerja langsung masuk cache fit_arima, sehingga tidak di-fit ulang.
+    Pool memakai proses "spawn": fork dari server Streamlit yang multi-thread bisa deadlock.
+    Mengembalikan (HasilOrder, dari_cache).
+    """
+    nilai = np.asarray(nilai, dtype=np.float64)
+    grid = tuple(grid or grid_order())
+    sidik = sidik_deret(nilai)
+    kunci = (sidik, grid)
+    with _kunci_order:
+        if kunci in _cache_order:
+            _cache_order.move_to_end(kunci)
+            return _cache_order[kunci], True
+        kunci_cari = _kunci_cari.setdefault(kunci, threading.Lock())
+
+    with kunci_cari:
+        # Sesi lain dengan deret yang sama mungkin baru selesai mencari selagi kita menunggu
+        with _kunci_order:
+            if kunci in _cache_order:
+                _cache_order.move_to_end(kunci)
+                return _cache_order[kunci], True
+
+        proses = max(1, min(max_workers or os.cpu_count() or 1, len(grid)))
+        mulai = time.perf_counter()
+        tabel, terbaik = [], {}
+        with ProcessPoolExecutor(max_workers=proses, mp_context=multiprocessing.get_context("spawn")) as pool:
+            hasil_grid = pool.map(
+                _skor_order, itertools.repeat(nilai), grid, chunksize=max(1, len(grid) // (proses * 4))
+            )
+            # Hanya fit terbaik per kriteria yang disimpan; fit kandidat lain langsung dilepas
+            for order, aic, bic, fit, detik in hasil_grid:
+                tabel.append((order, aic, bic))
+                for kolom, skor in enumerate((aic, bic)):
+                    if fit is not None and skor < terbaik.get(kolom, (math.inf,))[0]:
+                        terbaik[kolom] = (skor, HasilARIMA(fit, order, "fit", len(nilai), detik))
+        hasil = HasilOrder(tuple(tabel), time.perf_counter() - mulai, proses)
+
+        with _kunci_order:
+            _cache_order[kunci] = hasil
+            while len(_cache_order) > MAKS_CACHE:
+                _cache_order.popitem(last=False)
+            _kunci_cari.pop(kunci, None)
+        with _kunci:
+            for _, fit in terbaik.values():
+                _simpan((sidik, fit.order), nilai, fit)
+    return hasil, False
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import xgboost as xgb
+
+import prediksi
+
+logger = logging.getLogger(__name__)
+
+# ==== Registri Model Prediksi ====
+# Model disimpan dalam format native XGBoost (UBJ) beserta metadata JSON berversi.
+# File .pkl hanya sumber ekspor: format native lebih cepat dimuat dan aman lintas versi XGBoost.
+VERSI_FORMAT = 1
+MODEL = {
+    "harian": {"file": "model_daily", "fitur": prediksi.FITUR_HARIAN},
+    "bulanan": {"file": "model_monthly", "fitur": prediksi.FITUR_BULANAN},
+}
+DIR_MODEL = os.environ.get("SPKLU_MODEL_DIR", ".")
+
+# Model dimuat sekali per proses dan dibagi semua sesi: nama -> {"booster", "meta"}
+_model = {}
+_kunci = {nama: threading.Lock() for nama in MODEL}
+_penghangat = None   # thread hangatkan() yang terakhir dijalankan
+
+
+def _path(nama):
+    dasar = os.path.join(DIR_MODEL, MODEL[nama]["file"])
+    return dasar + ".ubj", dasar + ".meta.json", dasar + ".pkl"
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def ekspor(nama):
+    """
+    Ekspor model pickle (XGBRegressor via joblib) ke UBJ + metadata.
+    Cukup dijalankan sekali setiap model dilatih ulang: `python registri_model.py`.
+    """
+    import joblib
+
+    path_ubj, path_meta, path_pkl = _path(nama)
+    fitur = MODEL[nama]["fitur"]
+    booster = joblib.load(path_pkl).get_booster()
+    if booster.feature_names and list(booster.feature_names) != fitur:
+        raise ValueError(f"Fitur model {nama} {booster.feature_names} tidak sama dengan {fitur}")
+    booster.feature_names = fitur
+    booster.save_model(path_ubj)
+
+    meta = {
+        "format": VERSI_FORMAT,
+        "versi": _hash_file(path_ubj),
+        "fitur": fitur,
+        "xgboost": xgb.__version__,
+        "sumber": os.path.basename(path_pkl),
+    }
+    with open(path_meta, "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _muat(nama):
+    """Muat booster native beserta metadatanya; diekspor dulu dari .pkl bila belum ada."""
+    path_ubj, path_meta, _ = _path(nama)
+    if not (os.path.exists(path_ubj) and os.path.exists(path_meta)):
+        logger.info("Model %s belum ada dalam format native, ekspor dari pickle", nama)
+        ekspor(nama)
+    with open(path_meta) as f:
+        meta = json.load(f)
+    if meta.get("format") != VERSI_FORMAT:
+        raise ValueError(f"Format metadata model {nama} tidak dikenal: {meta.get('format')}")
+    if meta["fitur"] != MODEL[nama]["fitur"]:
+        raise ValueError(f"Fitur model {nama} {meta['fitur']} tidak sama dengan {MODEL[nama]['fitur']}")
+
+    booster = xgb.Booster(model_file=path_ubj)
+    if booster.feature_names and list(booster.feature_names) != meta["fitur"]:
+        raise ValueError(f"Fitur booster {nama} tidak sesuai metadata")
+    return {"booster": booster, "meta": meta}
+
+
+def _entri(nama):
+    with _kunci[nama]:
+        if nama not in _model:
+            _model[nama] = _muat(nama)
+        return _model[nama]
+
+
+def model(nama):
+    """Booster untuk model `nama` ("harian" / "bulanan"), dimuat sekali per proses."""
+    return _entri(nama)["booster"]
+
+
+def metadata(nama):
+    """Metadata model: format, versi (hash file UBJ), fitur, versi XGBoost saat ekspor, sumber."""
+    return _entri(nama)["meta"]
+
+
+def versi(nama_list=None):
+    """Versi gabungan model-model (untuk kunci cache ramalan)."""
+    return "-".join(metadata(nama)["versi"] for nama in (nama_list or MODEL))
+
+
+def hangatkan():
+    """
+    Muat semua model di thread latar supaya ramalan pertama tidak menunggu pemuatan model.
+    Tidak melakukan apa-apa bila semua model sudah dimuat atau pemuatan sebelumnya masih berjalan.
+    """
+    global _penghangat
+    nama_list = [n for n in MODEL if n not in _model]
+    if not nama_list or (_penghangat is not None and _penghangat.is_alive()):
+        return
+
+    def _coba():
+        for nama in nama_list:
+            try:
+                _entri(nama)
+            except Exception as e:
+                logger.warning("Model %s gagal dihangatkan: %s", nama, e)
+
+    _penghangat = threading.Thread(target=_coba, daemon=True)
+    _penghangat.start()
+
+
+if __name__ == "__main__":
+    for nama in MODEL:
+        print(nama, ekspor(nama))
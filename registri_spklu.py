@@ -0,0 +1,125 @@
+import difflib
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ==== Registri Lokasi SPKLU ====
+# Satu sumber koordinat untuk semua halaman: spklu_lokasi.csv (id, nama, lat, lon).
+# Nama dari sheet dicocokkan ke id lewat nama ternormalisasi, lalu (bila tidak ada) kemiripan teks.
+FILE_LOKASI = os.environ.get("SPKLU_LOKASI", "spklu_lokasi.csv")
+KATA_UMUM = {"spklu", "pln"}   # ada di hampir semua nama, tidak membedakan SPKLU
+BATAS_MIRIP = 0.85             # rasio difflib minimum untuk pencocokan fuzzy
+SELISIH_MIRIP = 0.05           # kandidat terbaik harus unggul sejauh ini dari kandidat kedua
+RADIUS_BUMI_KM = 6371.0
+
+_registri = None   # (waktu modifikasi file, RegistriSPKLU)
+_kunci = threading.Lock()
+
+
+def normalisasi(nama):
+    """Nama tanpa beda huruf besar/kecil, tanda baca, spasi berlebih dan kata umum (SPKLU, PLN)."""
+    kata = re.sub(r"[^0-9a-z]+", " ", str(nama).casefold()).split()
+    return " ".join(k for k in kata if k not in KATA_UMUM)
+
+
+def _xyz(lat, lon):
+    """Koordinat derajat -> titik pada bola satuan (jarak Euclid monoton terhadap jarak lingkaran besar)."""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class RegistriSPKLU:
+    """
+    Lokasi SPKLU beserta indeks pencarian:
+    `lokasi` = DataFrame (index "ID Lokasi"; NAMA_SPKLU, LAT, LON), `indeks` = nama ternormalisasi -> id,
+    dan KD-tree koordinat untuk SPKLU terdekat. `versi` = hash isi file (kunci cache turunan registri).
+    """
+
+    def __init__(self, lokasi, versi=None):
+        from scipy.spatial import cKDTree
+
+        self.lokasi = lokasi
+        self.versi = versi
+        self.indeks = {normalisasi(n): i for i, n in zip(lokasi.index, lokasi["NAMA_SPKLU"])}
+        if len(self.indeks) != len(lokasi):
+            raise ValueError("Nama SPKLU di registri lokasi tidak unik setelah normalisasi")
+        self._kunci_nama = list(self.indeks)
+        self._pohon = cKDTree(_xyz(lokasi["LAT"], lokasi["LON"]))
+        self._cocok = {}
+        self._kunci = threading.Lock()
+
+    def _cari(self, kunci):
+        if kunci in self.indeks:
+            return self.indeks[kunci]
+        skor = sorted(
+            ((difflib.SequenceMatcher(None, kunci, k).ratio(), k) for k in self._kunci_nama), reverse=True
+        )
+        terbaik = skor[0] if skor else (0.0, None)
+        kedua = skor[1][0] if len(skor) > 1 else 0.0
+        if terbaik[0] >= BATAS_MIRIP and terbaik[0] - kedua >= SELISIH_MIRIP:
+            logger.info("Nama SPKLU %r dicocokkan ke %r (rasio %.2f)", kunci, terbaik[1], terbaik[0])
+            return self.indeks[terbaik[1]]
+        logger.warning("Nama SPKLU %r tidak ada di registri lokasi", kunci)
+        return -1
+
+    def cari_id(self, nama):
+        """ID lokasi untuk `nama` dari sheet; -1 bila tidak ada yang cocok. Hasil diingat per nama."""
+        kunci = normalisasi(nama)
+        with self._kunci:
+            if kunci not in self._cocok:
+                self._cocok[kunci] = self._cari(kunci)
+            return self._cocok[kunci]
+
+    def id_kolom(self, s):
+        """ID lokasi per baris kolom nama (dicocokkan sekali per nama unik), -1 untuk kosong/tidak cocok."""
+        kat = pd.Categorical(s)
+        kode = np.array([self.cari_id(n) for n in kat.categories] + [-1], dtype=np.int64)
+        return kode[kat.codes]
+
+    def koordinat(self, s):
+        """(lat, lon) per baris kolom nama SPKLU, NaN bila nama tidak ada di registri."""
+        posisi = self.lokasi.index.get_indexer(self.id_kolom(s))
+        lat = np.append(self.lokasi["LAT"].to_numpy(), np.nan)[posisi]
+        lon = np.append(self.lokasi["LON"].to_numpy(), np.nan)[posisi]
+        return lat, lon
+
+    def terdekat(self, lat, lon, k=1):
+        """
+        `k` SPKLU terdekat dari titik (lat, lon): (jarak_km, id), masing-masing array panjang k.
+        """
+        k = min(k, len(self.lokasi))
+        tali, posisi = self._pohon.query(_xyz([lat], [lon])[0], k=k)
+        jarak = 2 * np.arcsin(np.minimum(np.atleast_1d(tali) / 2, 1.0)) * RADIUS_BUMI_KM
+        return jarak, self.lokasi.index.to_numpy()[np.atleast_1d(posisi)]
+
+
+def _muat(path):
+    with open(path, "rb") as f:
+        versi = hashlib.sha256(f.read()).hexdigest()[:16]
+    lokasi = pd.read_csv(
+        path, dtype={"id": np.int64, "nama": str, "lat": np.float64, "lon": np.float64}, float_precision="round_trip"
+    )
+    if lokasi["id"].duplicated().any():
+        raise ValueError(f"ID ganda di {path}")
+    lokasi = lokasi.rename(columns={"nama": "NAMA_SPKLU", "lat": "LAT", "lon": "LON"})
+    return RegistriSPKLU(lokasi.set_index("id").rename_axis("ID Lokasi"), versi)
+
+
+def registri():
+    """
+    Registri lokasi SPKLU, dimuat sekali per proses dan dibagi semua sesi;
+    dimuat ulang bila file registri diubah (waktu modifikasi berbeda).
+    """
+    global _registri
+    waktu = os.path.getmtime(FILE_LOKASI)
+    with _kunci:
+        if _registri is None or _registri[0] != waktu:
+            _registri = (waktu, _muat(FILE_LOKASI))
+        return _registri[1]
@@ -0,0 +1,337 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow.feather as feather
+import requests
+from requests.adapters import HTTPAdapter
+
+import olah_data
+
+logger = logging.getLogger(__name__)
+
+# ==== Sumber Data Google Sheets ====
+# Semua sheet berasal dari satu spreadsheet, dibedakan oleh gid.
+# Alamat dasar bisa diganti lewat env SPKLU_SHEET_URL (mis. server HTTP lokal untuk pengujian).
+SHEET_URL = os.environ.get(
+    "SPKLU_SHEET_URL",
+    "https://docs.google.com/spreadsheets/d/16cyvXwvucVb7EM1qiikZpbK8J8isbktuiw-MR1EJDEY/export?format=csv",
+)
+SHEET_GID = {
+    "data2": "829004516",    # transaksi bulanan per SPKLU
+    "data4": "1731077450",   # kapasitas & kategori charger
+    "data5": "2075790964",   # transaksi harian (untuk prediksi)
+}
+
+# Persiapan (normalisasi) yang dijalankan sekali setiap kali sheet selesai dimuat
+PERSIAPAN = {
+    "data2": olah_data.siapkan_data2,
+    "data4": olah_data.siapkan_data4,
+}
+
+# Umur cache dalam detik sebelum sheet divalidasi ulang (default 10 menit)
+TTL_DETIK = int(os.environ.get("SPKLU_TTL_DETIK", "600"))
+TIMEOUT_DETIK = 30
+
+# Snapshot Feather terakhir yang berhasil diambil, dipakai saat start dan saat sheet tidak bisa diakses
+DIR_SNAPSHOT = os.environ.get("SPKLU_CACHE_DIR", ".cache")
+
+# Cache dibagi oleh semua sesi dalam satu proses:
+# nama -> {"df", "versi", "dicek", "etag", "last_modified"}
+_cache = {}
+_kunci = {nama: threading.RLock() for nama in SHEET_GID}
+_sedang_revalidasi = set()
+_kunci_revalidasi = threading.Lock()
+
+
+# Satu koneksi HTTP ber-pool untuk semua sheet, supaya pengambilan paralel memakai ulang koneksi TLS
+_sesi = requests.Session()
+_sesi.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=len(SHEET_GID)))
+_sesi.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=len(SHEET_GID)))
+
+
+def _siapkan(nama, df, versi):
+    df = PERSIAPAN.get(nama, lambda d: d)(df)
+    df.attrs["versi"] = versi
+    return df
+
+
+def url_sheet(nama):
+    """URL ekspor CSV untuk sheet `nama`."""
+    pemisah = "&" if "?" in SHEET_URL else "?"
+    return f"{SHEET_URL}{pemisah}gid={SHEET_GID[nama]}"
+
+
+def parse_sheet(isi, skema=None):
+    """
+    Parse isi CSV (bytes) menjadi DataFrame dengan nama kolom yang sudah di-strip.
+    Dengan `skema` (lihat olah_data.SKEMA) hanya kolom yang dipakai yang dibaca,
+    kolom teks berulang langsung menjadi category dan angka diturunkan tipenya.
+    """
+    argumen = {}
+    if skema:
+        header = pd.read_csv(io.BytesIO(isi), nrows=0).columns
+        argumen = olah_data.argumen_pembaca(skema, header)
+    df = pd.read_csv(io.BytesIO(isi), **argumen)
+    df.columns = df.columns.str.strip()
+    if skema:
+        df = olah_data.terapkan_skema(df, skema)
+    return df
+
+
+def ambil_sheet(nama):
+    """Unduh dan parse satu sheet tanpa cache."""
+    resp = _sesi.get(url_sheet(nama), timeout=TIMEOUT_DETIK)
+    resp.raise_for_status()
+    return parse_sheet(resp.content, olah_data.SKEMA.get(nama))
+
+
+# ==== Snapshot di Disk ====
+def _path_snapshot(nama):
+    return os.path.join(DIR_SNAPSHOT, f"{nama}.feather"), os.path.join(DIR_SNAPSHOT, f"{nama}.json")
+
+
+def _baca_snapshot(nama):
+    """Baca snapshot (memory-mapped) beserta metadatanya; None bila belum ada atau rusak."""
+    path_data, path_meta = _path_snapshot(nama)
+    if not (os.path.exists(path_data) and os.path.exists(path_meta)):
+        return None
+    try:
+        with open(path_meta) as f:
+            meta = json.load(f)
+        df = feather.read_table(path_data, memory_map=True).to_pandas()
+    except Exception as e:
+        logger.warning("Snapshot %s tidak bisa dibaca: %s", nama, e)
+        return None
+    if nama in olah_data.SKEMA:
+        df = olah_data.terapkan_skema(df, olah_data.SKEMA[nama])
+    return {**meta, "df": _siapkan(nama, df, meta.get("versi"))}
+
+
+def _tulis_snapshot(nama, df, meta):
+    """Tulis snapshot data mentah secara atomik (file sementara lalu rename)."""
+    path_data, path_meta = _path_snapshot(nama)
+    try:
+        os.makedirs(DIR_SNAPSHOT, exist_ok=True)
+        # Tanpa kompresi agar bisa dibaca langsung lewat memory map
+        df.to_feather(path_data + ".tmp", compression="uncompressed")
+        os.replace(path_data + ".tmp", path_data)
+        with open(path_meta + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path_meta + ".tmp", path_meta)
+    except Exception as e:
+        logger.warning("Snapshot %s gagal ditulis: %s", nama, e)
+
+
+def _simpan_meta(nama, entri):
+    path_meta = _path_snapshot(nama)[1]
+    if os.path.exists(path_meta):
+        try:
+            with open(path_meta, "w") as f:
+                json.dump({k: v for k, v in entri.items() if k != "df"}, f)
+        except OSError as e:
+            logger.warning("Metadata snapshot %s gagal ditulis: %s", nama, e)
+
+
+# ==== Validasi Ulang ====
+def revalidasi(nama):
+    """
+    Ambil ulang sheet secara kondisional (ETag / Last-Modified, lalu hash isi).
+    Snapshot dan cache hanya diganti bila isinya benar-benar berubah.
+    """
+    lama = _cache.get(nama) or _baca_snapshot(nama) or {}
+    header = {}
+    if lama.get("etag"):
+        header["If-None-Match"] = lama["etag"]
+    if lama.get("last_modified"):
+        header["If-Modified-Since"] = lama["last_modified"]
+
+    resp = _sesi.get(url_sheet(nama), headers=header, timeout=TIMEOUT_DETIK)
+    if resp.status_code == 304 and "df" in lama:
+        isi = None
+    else:
+        resp.raise_for_status()
+        isi = resp.content
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    if isi is not None:
+        versi = hashlib.sha256(isi).hexdigest()[:16]
+        if "df" in lama and versi == lama.get("versi"):
+            # Isi sama persis, tidak perlu parse ulang; cukup simpan validator terbaru
+            lama = {**lama, "etag": etag, "last_modified": last_modified}
+            isi = None
+        else:
+            df = parse_sheet(isi, olah_data.SKEMA.get(nama))
+            meta = {"versi": versi, "dicek": time.time(),
+                    "etag": etag, "last_modified": last_modified}
+            _tulis_snapshot(nama, df, meta)
+            entri = {**meta, "df": _siapkan(nama, df, versi)}
+
+    if isi is None:
+        entri = {**lama, "dicek": time.time()}
+        _simpan_meta(nama, entri)
+
+    with _kunci[nama]:
+        _cache[nama] = entri
+    return entri
+
+
+def _revalidasi_latar(nama):
+    try:
+        revalidasi(nama)
+    except Exception as e:
+        logger.warning("Revalidasi %s gagal, tetap memakai data lama: %s", nama, e)
+    finally:
+        with _kunci_revalidasi:
+            _sedang_revalidasi.discard(nama)
+
+
+def _mulai_revalidasi(nama):
+    """Jalankan revalidasi di thread latar, maksimal satu per sheet."""
+    with _kunci_revalidasi:
+        if nama in _sedang_revalidasi:
+            return
+        _sedang_revalidasi.add(nama)
+    threading.Thread(target=_revalidasi_latar, args=(nama,), daemon=True).start()
+
+
+def _entri(nama, ttl):
+    """
+    Entri cache untuk sheet `nama` (stale-while-revalidate).
+    Bila cache kosong, snapshot di disk langsung dipakai; bila umurnya melewati TTL,
+    data lama tetap dikembalikan sementara validasi ulang berjalan di latar.
+    Hanya saat belum ada snapshot sama sekali pengambilan dilakukan secara sinkron,
+    dan sesi lain yang meminta sheet yang sama menunggu hasil pengambilan itu.
+    """
+    with _kunci[nama]:
+        entri = _cache.get(nama)
+        if entri is None:
+            entri = _baca_snapshot(nama)
+            if entri is not None:
+                _cache[nama] = entri
+            else:
+                entri = revalidasi(nama)
+    if time.time() - entri["dicek"] > ttl:
+        _mulai_revalidasi(nama)
+    return entri
+
+
+def muat_sheet(nama, ttl=None):
+    """
+    Ambil sheet dari cache bersama.
+    Hasilnya salinan, jadi halaman boleh menambah kolom tanpa mengganggu sesi lain.
+    """
+    ttl = TTL_DETIK if ttl is None else ttl
+    return _entri(nama, ttl)["df"].copy()
+
+
+def hangatkan(nama_list=None, ttl=None):
+    """
+    Isi cache semua sheet sekaligus secara paralel, sehingga waktu tunggu pertama
+    sebesar sheet paling lambat, bukan jumlah semuanya. Sheet yang gagal dilewati
+    (dicatat di log) dan akan dicoba lagi saat halaman memintanya.
+    """
+    ttl = TTL_DETIK if ttl is None else ttl
+    nama_list = [n for n in (nama_list or SHEET_GID) if n not in _cache]
+    if not nama_list:
+        return
+
+    def _coba(nama):
+        try:
+            _entri(nama, ttl)
+        except Exception as e:
+            logger.warning("Sheet %s gagal dihangatkan: %s", nama, e)
+
+    with ThreadPoolExecutor(max_workers=len(nama_list)) as pool:
+        list(pool.map(_coba, nama_list))
+
+
+def info_memori():
+    """Memori (byte) tiap sheet di cache: nama -> (perkiraan tanpa skema, dengan skema)."""
+    return {nama: entri["df"].attrs.get("memori") for nama, entri in _cache.items()}
+
+
+def waktu_ambil(nama):
+    """Waktu (epoch) sheet terakhir divalidasi, atau None bila belum pernah."""
+    entri = _cache.get(nama)
+    return entri["dicek"] if entri else None
+
+
+def segarkan(nama=None):
+    """Validasi ulang satu sheet (atau semua, paralel) sekarang juga, tanpa menunggu TTL."""
+    nama_list = [nama] if nama else list(SHEET_GID)
+    with ThreadPoolExecutor(max_workers=len(nama_list)) as pool:
+        list(pool.map(revalidasi, nama_list))
+
+
+# ==== File Excel Transaksi ====
+# path -> (kunci stat file, DataFrame siap pakai)
+_cache_excel = {}
+# Naikkan bila skema/persiapan berubah agar cache Feather lama tidak dipakai
+_VERSI_CACHE_EXCEL = "v2"
+_kunci_excel = threading.Lock()
+
+
+def _baca_excel(path):
+    """
+    Baca workbook dengan engine calamine (Rust) bila tersedia, selain itu openpyxl read-only.
+    Hanya kolom di skema "excel" yang dibaca, dengan tipe yang sudah ditentukan.
+    """
+    skema = olah_data.SKEMA["excel"]
+    try:
+        engine = "calamine"
+        header = pd.read_excel(path, engine=engine, nrows=0).columns
+    except ImportError:
+        engine = "openpyxl"
+        header = pd.read_excel(path, engine=engine, nrows=0).columns
+    df = pd.read_excel(path, engine=engine, **olah_data.argumen_pembaca(skema, header))
+    return olah_data.terapkan_skema(df, skema)
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 20), b""):
+            h.update(blok)
+    return h.hexdigest()[:16]
+
+
+def muat_transaksi_excel(path):
+    """
+    Muat file transaksi (mis. 'Coba kp.xlsx') sekali, lengkap dengan parsing
+    TGL BAYAR dan kolom Efisiensi. Hasil disimpan sebagai Feather yang dikunci
+    hash isi file, dan di memori yang dikunci mtime + ukuran file, sehingga
+    rerun berikutnya tidak mem-parse workbook lagi.
+    """
+    info = os.stat(path)
+    kunci_stat = (info.st_mtime_ns, info.st_size)
+    with _kunci_excel:
+        tersimpan = _cache_excel.get(path)
+        if tersimpan is None or tersimpan[0] != kunci_stat:
+            versi = _hash_file(path)
+            nama = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+            path_cache = os.path.join(DIR_SNAPSHOT, f"{nama}-{versi}-{_VERSI_CACHE_EXCEL}.feather")
+            if os.path.exists(path_cache):
+                df = feather.read_table(path_cache, memory_map=True).to_pandas()
+                df = olah_data.terapkan_skema(df, olah_data.SKEMA["excel"])
+            else:
+                df = _baca_excel(path)
+                df['TGL BAYAR'] = pd.to_datetime(df['TGL BAYAR'], format='%d/%m/%Y', errors='coerce')
+                df['Efisiensi'] = df['RPKWH'] / df['PEMKWH']
+                try:
+                    os.makedirs(DIR_SNAPSHOT, exist_ok=True)
+                    df.to_feather(path_cache + ".tmp", compression="uncompressed")
+                    os.replace(path_cache + ".tmp", path_cache)
+                except Exception as e:
+                    logger.warning("Cache %s gagal ditulis: %s", path, e)
+            df.attrs["versi"] = versi
+            tersimpan = (kunci_stat, df)
+            _cache_excel[path] = tersimpan
+    return tersimpan[1].copy()
@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+
+import olah_data
+import sumber_data
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+# Jalur pandas yang sudah dijadwalkan untuk dihapus (mis. Categorical dengan nilai di luar kategori)
+# harus langsung terlihat di sini, bukan tersembunyi di balik filterwarnings aplikasi
+pytestmark = pytest.mark.filterwarnings("error")
+
+
+def _sheet(nama):
+    with open(os.path.join(DATA, f"{nama}.csv"), "rb") as f:
+        df = sumber_data.parse_sheet(f.read(), olah_data.SKEMA[nama])
+    return sumber_data.PERSIAPAN[nama](df)
+
+
+def _referensi(df2, df4):
+    """Total per Wilayah dari groupby df2 yang digabung ke peta SPKLU -> Wilayah tanpa duplikat."""
+    wilayah = df4.drop_duplicates("Nama SPKLU").set_index("Nama SPKLU")["Wilayah"].astype(object)
+    df = df2.assign(Wilayah=df2["Nama SPKLU"].astype(object).map(wilayah))
+    return df.groupby("Wilayah")[["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]].sum().astype(float)
+
+
+def _total(df):
+    hasil = df.groupby("Wilayah", observed=True)[["Jumlah Transaksi", "Jumlah KWH", "Total Pendapatan"]].sum()
+    return hasil.astype(float).rename(index=str)
+
+
+@pytest.fixture
+def kecil():
+    """SPKLU A punya tiga charger (dua di antaranya baris ganda), B satu charger, C tidak ada di df4."""
+    df2 = pd.DataFrame({
+        "Nama SPKLU": ["A", "A", "B", "B", "C"],
+        "Bulan & Tahun": ["Januari 2025", "Februari 2025", "Januari 2025", "Februari 2025", "Januari 2025"],
+        "Jumlah Transaksi": [10, 20, 5, 7, 3],
+        "Jumlah KWH": [100.0, 200.0, 50.0, 70.0, 30.0],
+        "Total Pendapatan": [1000.0, 2000.0, 500.0, 700.0, 300.0],
+    })
+    df4 = pd.DataFrame({
+        "Nama SPKLU": ["A", "A", "A", "B"],
+        "Wilayah": ["ULP X", "ULP X", "ULP X", "ULP Y"],
+        "Kategori": ["Fast", "Medium", "Medium", "Ultra Fast"],
+        "Kapasitas": ["50kW", "22kW", "22kW", "200kW"],
+    })
+    df2 = olah_data.siapkan_data2(olah_data.terapkan_skema(df2, olah_data.SKEMA["data2"]))
+    df4 = olah_data.siapkan_data4(df4)
+    return df2, df4
+
+
+def test_dimensi_satu_baris_per_spklu(kecil):
+    _, df4 = kecil
+    dim = olah_data.dimensi_spklu(df4)
+    assert dim.index.name == "ID SPKLU"
+    assert list(dim["Nama SPKLU"]) == ["A", "B"]
+    assert list(dim["Wilayah"]) == ["ULP X", "ULP Y"]
+
+
+def test_gabung_tidak_menggandakan_baris(kecil):
+    df2, df4 = kecil
+    hasil = olah_data.gabung_dimensi(df2, olah_data.dimensi_spklu(df4), ["Wilayah"])
+    assert len(hasil) == len(df2)
+    assert list(hasil["ID SPKLU"]) == [0, 0, 1, 1, -1]
+    assert hasil["Wilayah"].isna().tolist() == [False, False, False, False, True]
+
+
+def test_total_wilayah_sama_dengan_groupby(kecil):
+    df2, df4 = kecil
+    hasil = olah_data.gabung_dimensi(df2, olah_data.dimensi_spklu(df4), ["Wilayah"])
+    pd.testing.assert_frame_equal(_total(hasil), _referensi(df2, df4), check_names=False)
+    assert _total(hasil).loc["ULP X", "Jumlah Transaksi"] == 30
+
+
+def test_total_wilayah_snapshot():
+    df2, df4 = _sheet("data2"), _sheet("data4")
+    assert df4["Nama SPKLU"].value_counts().max() > 1   # ada SPKLU dengan beberapa charger
+    hasil = olah_data.gabung_dimensi(df2, olah_data.dimensi_spklu(df4), ["Wilayah"])
+    assert len(hasil) == len(df2)
+
+    total = _total(hasil)
+    pd.testing.assert_frame_equal(total, _referensi(df2, df4), check_names=False)
+    # Merge banyak-ke-banyak lama menghasilkan 21475 (tiap baris bulanan dihitung sekali per charger)
+    assert total.loc["ULP BANDUNG BARAT", "Jumlah Transaksi"] == 10724
+
+
+def test_normalisasi_periode_buang_label_tidak_valid(caplog):
+    df = pd.DataFrame({
+        "Bulan & Tahun": ["Februari 2025", "Bulan 20xx", "Januari 2025", None, "Desember 2024"],
+        "Jumlah Transaksi": [1, 2, 3, 4, 5],
+    })
+    hasil = olah_data.normalisasi_periode(df)
+
+    assert list(hasil["Jumlah Transaksi"]) == [1, 3, 5]   # urutan baris tetap
+    assert "2 baris" in caplog.text
+    label = hasil["Bulan & Tahun"]
+    assert label.cat.ordered
+    assert list(label.cat.categories) == ["Desember 2024", "Januari 2025", "Februari 2025"]
+    assert list(hasil["BulanNum"]) == [2, 1, 12]
+    assert list(hasil["Tahun"]) == [2025, 2025, 2024]
+    assert list(hasil["Periode"].astype(str)) == ["2025-02", "2025-01", "2024-12"]
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import olah_data
+import prediksi
+import registri_model
+import sumber_data
+
+AKAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+@pytest.fixture(scope="module")
+def ramalan():
+    with open(os.path.join(DATA, "data5.csv"), "rb") as f:
+        df5 = sumber_data.parse_sheet(f.read(), olah_data.SKEMA["data5"])
+    dir_lama = os.getcwd()
+    os.chdir(AKAR)   # file model dicari relatif terhadap direktori kerja
+    try:
+        mh, mb = registri_model.model("harian"), registri_model.model("bulanan")
+    finally:
+        os.chdir(dir_lama)
+    return df5, mh, mb, prediksi.ramalan(df5, mh, mb)
+
+
+@pytest.mark.parametrize("kolom", list(prediksi.ENTITAS.values()))
+def test_jumlah_entitas_sama_dengan_jaringan(ramalan, kolom):
+    df5, mh, mb, jaringan = ramalan
+    hasil = prediksi.ramalan_entitas(df5, mh, mb, kolom)
+
+    harian = jaringan["pred_harian"]["Prediksi"].to_numpy()
+    bulanan = jaringan["pred_bulanan"]["Forecast"].to_numpy()
+    np.testing.assert_allclose(hasil["pred_harian"].sum(axis=0), harian, rtol=1e-6)
+    np.testing.assert_allclose(hasil["pred_bulanan"].sum(axis=0), bulanan, rtol=1e-6)
+    # Angka jaringan pada data contoh (30 hari & bulan pertama)
+    assert harian.sum() == pytest.approx(149.6, abs=0.1)
+    assert bulanan[0] == pytest.approx(41.9, abs=0.1)
+    assert (hasil["pred_harian"] >= 0).all() and (hasil["pred_bulanan"] >= 0).all()
+
+
+def test_porsi_nol_diramal_nol(ramalan):
+    _, mh, _, _ = ramalan
+    riwayat = np.array([[3.0, 4.0, 5.0, 2.0, 6.0, 4.0, 5.0, 3.0], [0.0] * 8])
+    langkah = pd.date_range("2025-01-01", periods=5, freq="D")
+    hasil, total = prediksi.ramal_porsi(mh, riwayat, langkah, prediksi.FITUR_HARIAN, 7)
+    assert (hasil[1] == 0).all()
+    np.testing.assert_allclose(hasil[0], total)
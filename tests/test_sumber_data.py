@@ -0,0 +1,112 @@
+import os
+
+import pytest
+import requests
+
+import sumber_data
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def _isi(nama):
+    with open(os.path.join(DATA, f"{nama}.csv"), "rb") as f:
+        return f.read()
+
+
+def _respons(status, isi=b"", etag=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = isi
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+class SesiPalsu(requests.Session):
+    """Session yang menjawab dari antrean `jawaban` (Response atau exception) dan mencatat header permintaan."""
+
+    def __init__(self):
+        super().__init__()
+        self.jawaban = []
+        self.header = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.header.append(dict(headers or {}))
+        jawab = self.jawaban.pop(0)
+        if isinstance(jawab, Exception):
+            raise jawab
+        return jawab
+
+
+@pytest.fixture
+def sesi(monkeypatch, tmp_path):
+    """Sesi HTTP palsu, cache memori kosong dan direktori snapshot sementara."""
+    palsu = SesiPalsu()
+    monkeypatch.setattr(sumber_data, "_sesi", palsu)
+    monkeypatch.setattr(sumber_data, "_cache", {})
+    monkeypatch.setattr(sumber_data, "DIR_SNAPSHOT", str(tmp_path))
+    return palsu
+
+
+def test_304_memakai_frame_cache(sesi):
+    sesi.jawaban.append(_respons(200, _isi("data2"), etag='"v1"'))
+    sumber_data.segarkan("data2")
+    lama = sumber_data._cache["data2"]
+
+    sesi.jawaban.append(_respons(304))
+    sumber_data.segarkan("data2")
+    baru = sumber_data._cache["data2"]
+
+    assert sesi.header[-1]["If-None-Match"] == '"v1"'
+    assert baru["df"] is lama["df"]          # tidak di-parse ulang
+    assert baru["versi"] == lama["versi"]
+    assert baru["dicek"] >= lama["dicek"]
+
+
+def test_hash_berubah_mengganti_frame_dan_snapshot(sesi):
+    isi = _isi("data2")
+    sesi.jawaban.append(_respons(200, isi, etag='"v1"'))
+    sumber_data.segarkan("data2")
+    lama = sumber_data._cache["data2"]
+
+    # Isi sama dengan ETag baru: frame tetap, hanya validator yang diperbarui
+    sesi.jawaban.append(_respons(200, isi, etag='"v2"'))
+    sumber_data.segarkan("data2")
+    assert sumber_data._cache["data2"]["df"] is lama["df"]
+    assert sumber_data._cache["data2"]["etag"] == '"v2"'
+
+    # Isi berubah (baris terakhir dibuang): versi, frame dan snapshot diganti
+    berubah = isi.rstrip(b"\r\n").rsplit(b"\n", 1)[0] + b"\n"
+    sesi.jawaban.append(_respons(200, berubah, etag='"v3"'))
+    sumber_data.segarkan("data2")
+    baru = sumber_data._cache["data2"]
+
+    assert baru["versi"] != lama["versi"]
+    assert len(baru["df"]) == len(lama["df"]) - 1
+    assert baru["df"].attrs["versi"] == baru["versi"]
+    assert sumber_data._baca_snapshot("data2")["versi"] == baru["versi"]
+
+
+def test_gangguan_jaringan_memakai_snapshot(sesi, monkeypatch, caplog):
+    sesi.jawaban.append(_respons(200, _isi("data2"), etag='"v1"'))
+    sumber_data.segarkan("data2")
+    versi = sumber_data._cache["data2"]["versi"]
+    n_baris = len(sumber_data._cache["data2"]["df"])
+
+    # Proses baru: cache memori kosong, sheet tidak bisa diakses. Snapshot dipakai tanpa menunggu jaringan,
+    # dan revalidasi latar yang gagal tidak mengganti data lama.
+    monkeypatch.setattr(sumber_data, "_cache", {})
+    monkeypatch.setattr(sumber_data, "_mulai_revalidasi", sumber_data._revalidasi_latar)
+    n_permintaan = len(sesi.header)
+    sumber_data.hangatkan(["data2"], ttl=3600)
+    assert len(sesi.header) == n_permintaan   # snapshot masih segar: tidak ada permintaan
+    assert sumber_data._cache["data2"]["versi"] == versi
+
+    sesi.jawaban.append(requests.ConnectionError("jaringan putus"))
+    df = sumber_data.muat_sheet("data2", ttl=0)
+
+    assert len(df) == n_baris
+    assert df.attrs["versi"] == versi
+    assert sumber_data._cache["data2"]["versi"] == versi
+    assert "tetap memakai data lama" in caplog.text
+    assert not sesi.jawaban   # revalidasi memang dicoba
@@ -5,16 +5,18 @@ import seaborn as sns
 import warnings
 import base64
 import plotly.graph_objects as go
-import folium
 import json
 import plotly.express as px
-from streamlit_folium import folium_static
 from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster
-from statsmodels.tsa.arima.model import ARIMA
 from streamlit_option_menu import option_menu
 from sklearn.preprocessing import MinMaxScaler
 
+import agregasi
+import peta
+import ramalan_arima
+import registri_spklu
+import sumber_data
+
 
 # Optional: use wide layout
 st.set_page_config(layout="wide")
@@ -33,6 +35,11 @@ def get_base64_image(image_path):
 # Ambil gambar logo dan ubah ke base64
 logo_base64 = get_base64_image("logo spklu.png")
 
+# Peta dasar (semua marker + popup) per bulan & versi registri lokasi, dibagi semua sesi
+@st.cache_resource(show_spinner=False, max_entries=32)
+def peta_data(versi, versi_lokasi, bulan, _df_map):
+    return peta.peta_dasar(_df_map, f"Bulan : {bulan}", format_kwh="{:.0f}")
+
 
 # Koordinat bounding box tiap UNITUP (lat_min, lon_min, lat_max, lon_max)
 unitup_bounds = {
@@ -117,11 +124,10 @@ with st.sidebar:
 
 # Load file
 try:
-    df = pd.read_excel('Coba kp.xlsx')
+    # Workbook hanya di-parse sekali per perubahan file; rerun memakai cache
+    df = sumber_data.muat_transaksi_excel('Coba kp.xlsx')
     #url_data3 = "https://docs.google.com/spreadsheets/d/16cyvXwvucVb7EM1qiikZpbK8J8isbktuiw-MR1EJDEY/export?format=csv&gid=1874488223"
     #df = pd.read_csv(url_data3)
-    df['TGL BAYAR'] = pd.to_datetime(df['TGL BAYAR'], format='%d/%m/%Y', errors='coerce')
-    df['Efisiensi'] = df['RPKWH'] / df['PEMKWH']
 except Exception as e:
     st.error(f"Gagal memuat file: {e}")
     st.stop()
@@ -256,12 +262,17 @@ if selected == "Menu Utama":
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader("Ranking SPKLU Berdasarkan KWH Terjual")
 
-    # Ambil data SPKLU dengan total KWH berdasarkan bulan yang dipilih (df_filter)
-    spklu_ranking_kwh = df_filter.groupby('NAMA_SPKLU')['PEMKWH'].sum().reset_index()
-    spklu_ranking_kwh = spklu_ranking_kwh.sort_values(by='PEMKWH', ascending=False)
-
+    # Total KWH, pendapatan & jumlah transaksi per SPKLU (bulan terpilih) dalam satu groupby,
+    # lalu top-10 ketiga metrik sekaligus untuk tiga grafik ranking di bawah
     top_n = 10
-    top_spklu = spklu_ranking_kwh.head(top_n)
+    ringkasan_spklu = df_filter.groupby('NAMA_SPKLU', observed=True).agg(
+        PEMKWH=('PEMKWH', 'sum'),
+        RPKWH=('RPKWH', 'sum'),
+        JUMLAH_TRANSAKSI=('PEMKWH', 'size'),
+    )
+    peringkat = agregasi.ranking(ringkasan_spklu, k=top_n)
+
+    top_spklu = peringkat['PEMKWH']['atas'].reset_index()
 
     fig = go.Figure(go.Bar(
         x=top_spklu['PEMKWH'],
@@ -287,12 +298,8 @@ if selected == "Menu Utama":
  # -------------------------
     st.subheader("Ranking SPKLU Berdasarkan Pendapatan Terjual")
 
-    # Ambil data SPKLU dengan total KWH berdasarkan bulan yang dipilih (df_filter)
-    spklu_ranking_kwh = df_filter.groupby('NAMA_SPKLU')['RPKWH'].sum().reset_index()
-    spklu_ranking_kwh = spklu_ranking_kwh.sort_values(by='RPKWH', ascending=False)
-
-    top_n = 10
-    top_spklu = spklu_ranking_kwh.head(top_n)
+    # Top-10 pendapatan dari ranking bersama di atas
+    top_spklu = peringkat['RPKWH']['atas'].reset_index()
 
     fig = go.Figure(go.Bar(
         x=top_spklu['RPKWH'],
@@ -320,15 +327,8 @@ if selected == "Menu Utama":
      # -------------------------
     st.subheader("Ranking SPKLU Berdasarkan Jumlah Transaksi")
 
-    # Hitung jumlah transaksi untuk setiap SPKLU
-    spklurank_transaksi = df_filter.groupby('NAMA_SPKLU').size().reset_index(name='JUMLAH_TRANSAKSI')
-
-    # Urutkan dari yang terbesar
-    spklurank_transaksi = spklurank_transaksi.sort_values(by='JUMLAH_TRANSAKSI', ascending=False)
-
-    # Ambil 10 SPKLU teratas
-    top_n = 10
-    top_spklu = spklurank_transaksi.head(top_n)
+    # 10 SPKLU dengan transaksi terbanyak (dari ranking bersama di atas)
+    top_spklu = peringkat['JUMLAH_TRANSAKSI']['atas'].reset_index()
 
     # Plot horizontal bar chart
     fig = go.Figure(go.Bar(
@@ -357,29 +357,8 @@ if selected == "Menu Utama":
     # Judul
     st.title("Peta Lokasi SPKLU di Bandung")
 
-    # Data lokasi SPKLU
-    spklu_locations = [
-        ["SPKLU PLN UP3 BANDUNG", -6.948691482456584, 107.61219619688617],
-        ["SPKLU PLN ULP BANDUNG UTARA", -6.920962, 107.608129],
-        ["SPKLU PLN ULP BANDUNG BARAT", -6.933869, 107.57143],
-        ["SPKLU PLN ULP BANDUNG TIMUR", -6.899030, 107.641179],
-        ["SPKLU PLN ULP CIJAWURA", -6.898929, 107.641115],
-        ["SPKLU PLN ULP UJUNGBERUNG", -6.2528476, 107.0104015],
-        ["SPKLU PLN ULP KOPO", -6.954014, 107.640576],
-        ["SPKLU PLN TRANS STUDIO MALL BANDUNG", -6.9254, 107.6365],
-        ["SPKLU PLN UID JAWA BARAT", -6.919962, 107.60901],
-        ["SPKLU POLDA JABAR", -6.936625, 107.7033697],
-        ["SPKLU PLN ICON HUB (BRAGA HERITAGE)", -6.9199358706829255, 107.6098682273523],
-        ["SPKLU PLN UIP JBT", -6.938285, 107.627942],
-        ["SPKLU (ARISTA POWER) BYD BANDUNG", -6.93866, 107.6759],
-        ["SPKLU PLN GEOWISATA INN", -6.91758, 107.57838],
-    ]
-
-    # Buat DataFrame dari lokasi SPKLU
-    df_lokasi = pd.DataFrame(spklu_locations, columns=["NAMA_SPKLU", "LAT", "LON"])
-
     # Buat ringkasan data per SPKLU
-    summary = df_filter.groupby('NAMA_SPKLU').agg({
+    summary = df_filter.groupby('NAMA_SPKLU', observed=True).agg({
         'No': 'count',
         'PEMKWH': 'sum',
         'RPKWH': 'sum'
@@ -389,41 +368,13 @@ if selected == "Menu Utama":
         'RPKWH': 'Total Pendapatan'
     })
 
-    # Gabungkan lokasi dan data summary
-    df_map = pd.merge(df_lokasi, summary, on="NAMA_SPKLU", how="left")
-
-    # Isi NaN dengan 0 agar tetap ditampilkan
-    df_map[['Jumlah Transaksi', 'Total kWh', 'Total Pendapatan']] = df_map[[
-        'Jumlah Transaksi', 'Total kWh', 'Total Pendapatan'
-    ]].fillna(0)
-
-    # Inisialisasi peta
-    m = folium.Map(location=[-6.92, 107.62], zoom_start=12)
-    marker_cluster = MarkerCluster().add_to(m)
-
-    # Tambahkan marker
-    for _, row in df_map.iterrows():
-        popup_html = f"""
-        <div style="font-family: Arial; font-size: 13px; line-height: 1.5">
-            <strong>{row['NAMA_SPKLU']}</strong><br>
-            Bulan : {pilihan_bulan_display}<br><br>
-            <table style="width: 250px">
-                <tr><td>🔁 Jumlah Transaksi:</td><td><strong>{int(row['Jumlah Transaksi']):,}</strong></td></tr>
-                <tr><td>⚡ Total kWh:</td><td><strong>{row['Total kWh']:.0f}</strong></td></tr>
-                <tr><td>💰 Total Pendapatan:</td><td><strong>Rp {row['Total Pendapatan']:,.0f}</strong></td></tr>
-            </table>
-        </div>
-        """
-
-        folium.Marker(
-            location=[row['LAT'], row['LON']],
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=row['NAMA_SPKLU'],
-            icon=folium.Icon(color="green", icon="bolt", prefix="fa")
-        ).add_to(marker_cluster)
+    # Gabungkan lokasi registri dan data summary lewat ID lokasi (SPKLU tanpa transaksi tetap ditampilkan dengan nilai 0)
+    registri = registri_spklu.registri()
+    df_map = peta.gabung_lokasi(registri, summary)
 
-    # Tampilkan peta di Streamlit
-    folium_static(m, width=1100, height=700)
+    # Peta dasar di-cache per bulan & versi registri; rerun tanpa ganti bulan tidak membangun dan mengirim ulang peta
+    m = peta_data(df.attrs.get("versi"), registri.versi, pilihan_bulan_display, df_map)
+    st_folium(peta.salinan(m), returned_objects=[], width=1100, height=700, key="peta_spklu")
 
 
 
@@ -440,7 +391,7 @@ elif selected == "Analisis":
 
     if selected_unit_analysis:
         df_unit_analysis = df[df['UNITUP'] == selected_unit_analysis]
-        spklu_unit_analysis = df_unit_analysis.groupby('NAMA_SPKLU')['No'].nunique().reset_index()
+        spklu_unit_analysis = df_unit_analysis.groupby('NAMA_SPKLU', observed=True)['No'].nunique().reset_index()
         spklu_unit_analysis = spklu_unit_analysis.sort_values(by='No', ascending=False).rename(columns={'No': 'Jumlah Transaksi', 'NAMA_SPKLU': 'SPKLU'})
         st.write(f'Jumlah Transaksi SPKLU di UNIT {selected_unit_analysis}:')
         st.dataframe(spklu_unit_analysis, use_container_width=True, hide_index=True)
@@ -460,7 +411,7 @@ elif selected == "Analisis":
 
 
     st.subheader('Ranking SPKLU Berdasarkan Total KWH dan Pendapatan')
-    spklu_summary = df.groupby('NAMA_SPKLU').agg({
+    spklu_summary = df.groupby('NAMA_SPKLU', observed=True).agg({
         'PEMKWH': 'sum',
         'RPKWH': 'sum'
     }).reset_index()
@@ -477,7 +428,7 @@ elif selected == "Analisis":
         st.dataframe(ranking_spklu_pendapatan)
 
     st.subheader('Visualisasi Total KWH dan Pendapatan per SPKLU')
-    ranking_unit = df.groupby('UNITUP').agg({'PEMKWH': 'sum', 'RPKWH': 'sum'}).reset_index()
+    ranking_unit = df.groupby('UNITUP', observed=True).agg({'PEMKWH': 'sum', 'RPKWH': 'sum'}).reset_index()
     fig, axes = plt.subplots(1, 2, figsize=(18, 6))
 
     sns.barplot(ax=axes[0], x='NAMA_SPKLU', y='total_kwh', data=ranking_spklu_kwh, palette='viridis')
@@ -497,7 +448,7 @@ elif selected == "Analisis":
     plt.close(fig)
 
     st.subheader('Proporsi KWH dan Pendapatan per Unit')
-    ranking_unit = df.groupby('UNITUP').agg({'PEMKWH': 'sum', 'RPKWH': 'sum'}).reset_index()
+    ranking_unit = df.groupby('UNITUP', observed=True).agg({'PEMKWH': 'sum', 'RPKWH': 'sum'}).reset_index()
     fig, axes = plt.subplots(1, 2, figsize=(16, 8))
 
     axes[0].pie(ranking_unit['PEMKWH'], labels=ranking_unit['UNITUP'], autopct='%1.1f%%', startangle=90, colors=sns.color_palette('viridis', len(ranking_unit)))
@@ -546,17 +497,42 @@ elif selected == "Prediksi":
         if len(transaksi_per_hari) >= 2:
             time_series_data = transaksi_per_hari.set_index('Tanggal')['jumlah_transaksi']
 
-            p, d, q = 5, 1, 0
+            mode_order = st.radio(
+                'Order ARIMA', ['Manual (5, 1, 0)', 'Otomatis (AIC)', 'Otomatis (BIC)'], horizontal=True
+            )
+            p, d, q = ramalan_arima.ORDER_DEFAULT
+            if mode_order.startswith('Otomatis'):
+                kriteria = 'bic' if 'BIC' in mode_order else 'aic'
+                # Grid (p,d,q) dinilai paralel di process pool; hasilnya di-cache per sidik deret,
+                # jadi pencarian hanya diulang saat data berubah
+                with st.spinner('Mencari order ARIMA terbaik...'):
+                    hasil_order, order_dari_cache = ramalan_arima.cari_order(time_series_data.to_numpy())
+                order_terbaik, skor = hasil_order.terbaik(kriteria)
+                if order_terbaik is None:
+                    st.warning(f"Tidak ada kandidat order yang berhasil di-fit; memakai ARIMA{(p, d, q)}.")
+                else:
+                    p, d, q = order_terbaik
+                    sumber = "dari cache" if order_dari_cache else (
+                        f"{len(hasil_order.tabel)} kandidat, {hasil_order.proses} proses, {hasil_order.detik:.2f} detik"
+                    )
+                    st.caption(f"Order terpilih ARIMA{order_terbaik}, {kriteria.upper()} = {skor:,.2f} ({sumber}).")
             days_to_predict = st.slider('Pilih jumlah hari ke depan untuk diprediksi', 1, 30, 7)
 
             try:
-                model = ARIMA(time_series_data, order=(p, d, q))
-                model_fit = model.fit()
+                # Fit di-cache per sidik deret; bila hanya ada hari baru di ujung, fit lama cukup diperbarui
+                model_fit, dari_cache = ramalan_arima.fit_arima(time_series_data.to_numpy(), order=(p, d, q))
+                if dari_cache:
+                    st.caption(f"Model ARIMA{model_fit.order} diambil dari cache (fit sebelumnya {model_fit.detik:.2f} detik).")
+                elif model_fit.mode == "append":
+                    st.caption(f"Model ARIMA{model_fit.order} diperbarui dengan {model_fit.baru} data baru dalam {model_fit.detik:.2f} detik.")
+                else:
+                    st.caption(f"Model ARIMA{model_fit.order} di-fit dalam {model_fit.detik:.2f} detik.")
 
                 last_date = time_series_data.index[-1]
                 forecast_index = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=days_to_predict, freq='D')
-                forecast = model_fit.predict(start=len(time_series_data), end=len(time_series_data) + days_to_predict - 1)
-                forecast.index = forecast_index
+                forecast = pd.Series(
+                    ramalan_arima.ramal(model_fit, days_to_predict), index=forecast_index, name='predicted_mean'
+                )
 
                 st.write(f"Prediksi Jumlah Transaksi untuk {days_to_predict} Hari ke Depan:")
                 st.dataframe(forecast.reset_index().rename(columns={'index': 'Tanggal', 'predicted_mean': 'Jumlah Prediksi'}))
@@ -575,7 +551,8 @@ elif selected == "Prediksi":
 
             except Exception as e:
                 st.error(f"Terjadi kesalahan saat fitting atau forecasting model ARIMA: {e}")
-                st.warning("Kemungkinan data tidak cocok untuk order ARIMA ini atau jumlah data terlalu sedikit.")
+                st.warning("Kemungkinan data tidak cocok untuk order ARIMA ini atau jumlah data terlalu sedikit. "
+                           "Coba mode order Otomatis.")
 
         else:
             st.warning("Data transaksi harian yang valid tidak cukup untuk melakukan prediksi (dibutuhkan minimal 2 data point).")